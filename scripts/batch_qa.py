@@ -0,0 +1,159 @@
+# scripts/batch_qa.py
+"""Answer a JSONL file of questions through the RAG pipeline and write the results as JSONL.
+
+    python scripts/batch_qa.py questions.jsonl --output answers.jsonl --concurrency 8
+
+Each input line is {"question": "..."} with optional "id", "k", "llm" and
+retrieval options ("search_type", "rerank", ...) overriding the command line.
+Each output line holds the answer, sources, chunk IDs and per-stage timings.
+"""
+import argparse
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, Any, List
+
+# Add project root to Python path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.config import Config
+from src.services import get_services
+from src.rag.generator import RAGGenerator
+from src.utils.logger import setup_logging
+from src.utils.metrics import LatencyHistogram
+
+RETRIEVAL_OPTIONS = ["search_type", "mmr_lambda", "fetch_multiplier", "rerank", "rerank_candidates", "adaptive"]
+
+STAGES = ["retrieval_ms", "rerank_ms", "ttft_ms", "generation_ms", "total_ms"]
+
+
+def load_questions(path: Path) -> List[Dict[str, Any]]:
+    """Read questions, giving each an id (its line number unless set)"""
+    questions = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            if isinstance(item, str):
+                item = {"question": item}
+            item.setdefault("id", line_number)
+            questions.append(item)
+    return questions
+
+
+def answer_question(generator: RAGGenerator, item: Dict[str, Any], defaults: Dict[str, Any]) -> Dict[str, Any]:
+    """Run one question through retrieval and generation"""
+    options = dict(defaults)
+    options.update({key: item[key] for key in ["k", "llm"] + RETRIEVAL_OPTIONS if key in item})
+    
+    retrieval_options = {key: options[key] for key in RETRIEVAL_OPTIONS if options.get(key) is not None}
+    question = item.get("question") or item.get("query", "")
+    
+    # Streamed so the timings include time to first token; the response is completed in place
+    start = time.perf_counter()
+    response = generator.generate_response_stream(
+        query=question,
+        llm_name=options.get("llm"),
+        k=options["k"],
+        use_cache=options["use_cache"],
+        **retrieval_options
+    )
+    for _ in response.get("answer_stream") or []:
+        pass
+    
+    timings = dict(response.get("timings") or {})
+    timings["total_ms"] = (time.perf_counter() - start) * 1000
+    
+    return {
+        "id": item["id"],
+        "question": question,
+        "answer": response.get("answer"),
+        "sources": response.get("sources", []),
+        "chunk_ids": [chunk.get("id") for chunk in response.get("chunks", [])],
+        "timings": timings,
+        "usage": response.get("usage"),
+        "cached": bool(response.get("cached")),
+        "error": response.get("error")
+    }
+
+
+def print_summary(results: List[Dict[str, Any]], elapsed: float):
+    """Print throughput, error count and latency percentiles per stage"""
+    print(f"\n{len(results)} questions in {elapsed:.1f} s: {len(results) / elapsed:.2f} questions/s")
+    print(f"errors {sum(1 for result in results if result['error'])}, "
+          f"cached {sum(1 for result in results if result['cached'])}")
+    
+    print(f"\n{'stage':<15}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for stage in STAGES:
+        histogram = LatencyHistogram(window=max(1, len(results)))
+        for result in results:
+            if result["timings"].get(stage) is not None:
+                histogram.record(result["timings"][stage])
+        
+        stats = histogram.snapshot()
+        if stats["count"]:
+            print(f"{stage[:-3]:<15}{stats['count']:>7}{stats['p50']:>10.0f}{stats['p95']:>10.0f}{stats['p99']:>10.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("input", type=Path, help="JSONL file of questions")
+    parser.add_argument("--output", type=Path, help="Where to write answers (default: <input>.answers.jsonl)")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--llm", help="LLM handler to use (default: the configured default)")
+    parser.add_argument("-k", type=int, default=5, help="Chunks to retrieve per question")
+    parser.add_argument("--search-type", choices=["hybrid", "vector", "mmr"], default=Config.RETRIEVAL_SEARCH_TYPE)
+    parser.add_argument("--rerank", action="store_true", default=None, help="Rerank with the cross-encoder")
+    parser.add_argument("--use-cache", action="store_true", help="Allow cached answers (off so every question is regenerated)")
+    parser.add_argument("--save-history", action="store_true", help="Also record the answers in the chat history")
+    args = parser.parse_args()
+    
+    setup_logging("WARNING")
+    output = args.output or args.input.with_suffix(".answers.jsonl")
+    questions = load_questions(args.input)
+    
+    services = get_services()
+    generator = RAGGenerator(
+        llm_manager=services.rag_generator.llm_manager,
+        retriever=services.rag_generator.retriever,
+        document_store=services.document_store,
+        save_history=args.save_history
+    )
+    defaults = {
+        "k": args.k,
+        "llm": args.llm,
+        "use_cache": args.use_cache,
+        "search_type": args.search_type,
+        "rerank": args.rerank
+    }
+    
+    print(f"Answering {len(questions)} questions with concurrency {args.concurrency}, writing {output}")
+    results = []
+    
+    start = time.perf_counter()
+    with open(output, "w", encoding="utf-8") as f, ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        futures = {executor.submit(answer_question, generator, item, defaults): item for item in questions}
+        
+        # Lines are written as answers complete; sort by id afterwards if order matters
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except Exception as e:
+                item = futures[future]
+                result = {"id": item["id"], "question": item.get("question"), "answer": None, "sources": [],
+                          "chunk_ids": [], "timings": {}, "usage": None, "cached": False, "error": str(e)}
+            
+            f.write(json.dumps(result, ensure_ascii=False, default=str) + "\n")
+            f.flush()
+            results.append(result)
+            print(f"\r{len(results)}/{len(questions)} answered", end="", flush=True)
+    
+    print_summary(results, time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+# scripts/benchmark_connection_pool.py
+"""Measure per-request overhead of fresh vs pooled LLM HTTP clients against a local stub.
+
+    python scripts/benchmark_connection_pool.py --requests 200
+"""
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import requests
+from openai import OpenAI
+
+# Add project root to Python path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+sys.path.insert(0, str(Path(__file__).parent))
+
+from src.models.llm_handler import get_http_session, get_openai_client
+from stub_llm_server import StubLLMServer
+
+
+def time_requests(label: str, send, n: int) -> float:
+    """Run send() n times and print latency stats; returns the mean in ms"""
+    send()  # warm-up
+    samples = []
+    for _ in range(n):
+        start = time.perf_counter()
+        send()
+        samples.append((time.perf_counter() - start) * 1000)
+    
+    samples.sort()
+    mean = statistics.mean(samples)
+    print(f"{label:<34} mean {mean:7.3f} ms   p50 {samples[len(samples) // 2]:7.3f} ms   "
+          f"p95 {samples[int(len(samples) * 0.95) - 1]:7.3f} ms")
+    return mean
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+    
+    server = StubLLMServer().start()
+    payload = {"model": "llama2", "prompt": "ping", "stream": False}
+    messages = [{"role": "user", "content": "ping"}]
+    
+    try:
+        print(f"Stub server at {server.url}, {args.requests} sequential requests each\n")
+        
+        fresh = time_requests(
+            "Ollama: requests.post per call",
+            lambda: requests.post(f"{server.url}/api/generate", json=payload, timeout=10),
+            args.requests
+        )
+        session = get_http_session()
+        pooled = time_requests(
+            "Ollama: pooled Session",
+            lambda: session.post(f"{server.url}/api/generate", json=payload, timeout=10),
+            args.requests
+        )
+        print(f"{'':<34} saved {fresh - pooled:.3f} ms/request\n")
+        
+        fresh = time_requests(
+            "OpenAI: new client per call",
+            lambda: OpenAI(base_url=f"{server.url}/v1", api_key="stub").chat.completions.create(
+                model="stub", messages=messages
+            ),
+            args.requests
+        )
+        client = get_openai_client("stub", f"{server.url}/v1")
+        pooled = time_requests(
+            "OpenAI: shared pooled client",
+            lambda: client.chat.completions.create(model="stub", messages=messages),
+            args.requests
+        )
+        print(f"{'':<34} saved {fresh - pooled:.3f} ms/request")
+    
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
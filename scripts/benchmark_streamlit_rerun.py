@@ -0,0 +1,81 @@
+# scripts/benchmark_streamlit_rerun.py
+"""Measure Streamlit rerun time with shared pipeline services vs services rebuilt on every rerun.
+
+    STORAGE_TYPE=memory python scripts/benchmark_streamlit_rerun.py --reruns 20
+
+Runs ui/streamlit_app.py headless with streamlit.testing AppTest, with Ollama
+pointed at the local stub server. The rebuilt case clears the cached services
+before each rerun, which is what every rerun paid before they were shared.
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+# Add project root to Python path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+sys.path.insert(0, str(Path(__file__).parent))
+
+from stub_llm_server import StubLLMServer
+
+APP_PATH = str(project_root / "ui" / "streamlit_app.py")
+
+
+def time_reruns(label: str, app: AppTest, n: int, before_rerun=None) -> float:
+    """Rerun the app n times and print latency stats; returns the mean in ms"""
+    samples = []
+    for _ in range(n):
+        if before_rerun:
+            before_rerun()
+        start = time.perf_counter()
+        app.run(timeout=120)
+        samples.append((time.perf_counter() - start) * 1000)
+        if app.exception:
+            raise RuntimeError(f"App raised: {app.exception[0].message}")
+    
+    samples.sort()
+    mean = sum(samples) / len(samples)
+    print(f"{label:<28} mean {mean:8.1f} ms   p50 {samples[len(samples) // 2]:8.1f} ms   "
+          f"min {samples[0]:8.1f} ms   max {samples[-1]:8.1f} ms")
+    return mean
+
+
+def rebuild_services():
+    """Drop the cached services so the next rerun builds them again"""
+    import src.services as services_module
+    
+    st.cache_resource.clear()
+    services_module._services = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--reruns", type=int, default=20)
+    args = parser.parse_args()
+    
+    # Config reads the environment on import, so point it at the stub first
+    server = StubLLMServer().start()
+    os.environ["OLLAMA_BASE_URL"] = server.url
+    
+    try:
+        app = AppTest.from_file(APP_PATH, default_timeout=120)
+        
+        start = time.perf_counter()
+        app.run()
+        print(f"First run (builds services)   {(time.perf_counter() - start) * 1000:8.1f} ms\n")
+        
+        shared = time_reruns("Shared services", app, args.reruns)
+        rebuilt = time_reruns("Services rebuilt per rerun", app, args.reruns, rebuild_services)
+        print(f"{'':<28} saved {rebuilt - shared:.1f} ms/rerun")
+    
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
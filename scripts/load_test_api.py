@@ -0,0 +1,106 @@
+# scripts/load_test_api.py
+"""Load test the headless HTTP API, by default against an in-process server backed by a stub LLM.
+
+    python scripts/load_test_api.py --requests 500 --concurrency 32 --latency-ms 200
+    python scripts/load_test_api.py --url http://127.0.0.1:8000 --stream
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import requests
+
+# Add project root to Python path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+sys.path.insert(0, str(Path(__file__).parent))
+
+from stub_llm_server import StubLLMServer
+
+
+def start_local_api(latency_ms: float, workers: int):
+    """Start a stub LLM and an API server wired to it; returns (api, stub)"""
+    stub = StubLLMServer(latency_ms=latency_ms).start()
+    
+    # Config reads the environment on import, so point it at the stub first
+    os.environ["OLLAMA_BASE_URL"] = stub.url
+    os.environ["OPENROUTER_API_KEY"] = ""
+    # The stub has no real capacity limit, so keep the per-backend limiter out of the way unless set explicitly
+    os.environ.setdefault("OLLAMA_MAX_CONCURRENT", str(workers))
+    os.environ.setdefault("OLLAMA_MAX_QUEUE", str(workers * 4))
+    
+    from src.api.server import create_server
+    
+    api = create_server(port=0, workers=workers).start()
+    return api, stub
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="API to test; by default one is started in-process")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--workers", type=int, default=16, help="API worker pool size for the in-process server")
+    parser.add_argument("--latency-ms", type=float, default=200, help="Stub LLM latency for the in-process server")
+    parser.add_argument("--question", default="What is this document about?")
+    parser.add_argument("--stream", action="store_true", help="Request NDJSON streaming responses")
+    parser.add_argument("--use-cache", action="store_true", help="Allow cached answers (off so every request reaches the LLM)")
+    args = parser.parse_args()
+    
+    api = stub = None
+    url = args.url
+    if not url:
+        api, stub = start_local_api(args.latency_ms, args.workers)
+        url = api.url
+    
+    from src.utils.metrics import LatencyHistogram
+    
+    latencies = LatencyHistogram(window=args.requests)
+    statuses = Counter()
+    local = threading.local()
+    payload = {"query": args.question, "stream": args.stream, "use_cache": args.use_cache}
+    
+    def send(_):
+        # One keep-alive session per client thread
+        if not hasattr(local, "session"):
+            local.session = requests.Session()
+        session = local.session
+        start = time.perf_counter()
+        try:
+            response = session.post(f"{url}/query", json=payload, timeout=120, stream=args.stream)
+            for _ in response.iter_lines():
+                pass
+            statuses[response.status_code] += 1
+        except requests.RequestException as e:
+            statuses[type(e).__name__] += 1
+        latencies.record((time.perf_counter() - start) * 1000)
+    
+    try:
+        print(f"API at {url}: {args.requests} requests, {args.concurrency} concurrent, stream={args.stream}\n")
+        requests.post(f"{url}/query", json=payload, timeout=120)  # warm-up
+        
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+            list(executor.map(send, range(args.requests)))
+        elapsed = time.perf_counter() - start
+        
+        stats = latencies.snapshot()
+        print(f"throughput {args.requests / elapsed:8.1f} req/s over {elapsed:.1f} s")
+        print(f"latency    p50 {stats['p50']:7.0f} ms   p95 {stats['p95']:7.0f} ms   p99 {stats['p99']:7.0f} ms")
+        print(f"statuses   {dict(statuses)}")
+    
+    finally:
+        if api:
+            api.shutdown()
+            api.server_close()
+        if stub:
+            stub.stop()
+
+
+if __name__ == "__main__":
+    main()
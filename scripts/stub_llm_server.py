@@ -0,0 +1,146 @@
+# scripts/stub_llm_server.py
+"""Local stand-in for Ollama and OpenAI-compatible APIs, for benchmarks and load tests.
+
+Run standalone and point the app at it:
+
+    python scripts/stub_llm_server.py --port 11500 --latency-ms 200
+    OLLAMA_BASE_URL=http://127.0.0.1:11500 streamlit run ui/streamlit_app.py
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+STUB_ANSWER = "This is a stub answer generated for testing purposes."
+
+
+class StubLLMRequestHandler(BaseHTTPRequestHandler):
+    """Answer Ollama /api/* and OpenAI /v1/chat/completions requests with canned text"""
+    
+    # Keep-alive needs HTTP/1.1 and explicit Content-Length; without TCP_NODELAY
+    # the split header/body writes hit the 40 ms delayed-ACK stall on reused sockets
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    
+    def log_message(self, format, *args):
+        pass
+    
+    def do_GET(self):
+        if self.path == "/api/tags":
+            self._send_json({"models": [{"name": self.server.model_name}]})
+        else:
+            self._send_json({"error": "not found"}, status=404)
+    
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length) or b"{}")
+        
+        if self.server.latency_s:
+            time.sleep(self.server.latency_s)
+        
+        if self.path == "/api/generate":
+            if body.get("stream"):
+                lines = [{"response": word + " ", "done": False} for word in STUB_ANSWER.split()]
+                lines.append({"response": "", "done": True})
+                self._send_chunked([json.dumps(line) + "\n" for line in lines], "application/x-ndjson")
+            else:
+                self._send_json({"model": body.get("model"), "response": STUB_ANSWER, "done": True})
+        
+        elif self.path.endswith("/chat/completions"):
+            if body.get("stream"):
+                events = []
+                for word in STUB_ANSWER.split():
+                    chunk = {
+                        "id": "stub",
+                        "object": "chat.completion.chunk",
+                        "created": int(time.time()),
+                        "model": body.get("model", "stub"),
+                        "choices": [{"index": 0, "delta": {"content": word + " "}, "finish_reason": None}]
+                    }
+                    events.append(f"data: {json.dumps(chunk)}\n\n")
+                events.append("data: [DONE]\n\n")
+                self._send_chunked(events, "text/event-stream")
+            else:
+                self._send_json({
+                    "id": "stub",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": body.get("model", "stub"),
+                    "choices": [{
+                        "index": 0,
+                        "message": {"role": "assistant", "content": STUB_ANSWER},
+                        "finish_reason": "stop"
+                    }],
+                    "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+                })
+        else:
+            self._send_json({"error": "not found"}, status=404)
+    
+    def _send_json(self, payload, status: int = 200):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+    
+    def _send_chunked(self, pieces, content_type: str):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for piece in pieces:
+            data = piece.encode("utf-8")
+            self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+            self.wfile.flush()
+        self.wfile.write(b"0\r\n\r\n")
+
+
+class StubLLMServer(ThreadingHTTPServer):
+    """Threaded stub server; use start()/stop() to run it in the background"""
+    
+    daemon_threads = True
+    
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency_ms: float = 0,
+                 model_name: str = "llama2"):
+        super().__init__((host, port), StubLLMRequestHandler)
+        self.latency_s = latency_ms / 1000
+        self.model_name = model_name
+        self._thread = None
+    
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+    
+    def start(self) -> "StubLLMServer":
+        self._thread = threading.Thread(target=self.serve_forever, name="stub-llm", daemon=True)
+        self._thread.start()
+        return self
+    
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a stub Ollama/OpenAI-compatible LLM server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11500)
+    parser.add_argument("--latency-ms", type=float, default=0, help="Artificial delay per generation request")
+    parser.add_argument("--model", default="llama2", help="Model name reported by /api/tags")
+    args = parser.parse_args()
+    
+    server = StubLLMServer(args.host, args.port, args.latency_ms, args.model)
+    print(f"Stub LLM server listening on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
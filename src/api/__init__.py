@@ -0,0 +1,4 @@
+# src/api/__init__.py
+from .server import RAGAPIServer, create_server
+
+__all__ = ["RAGAPIServer", "create_server"]
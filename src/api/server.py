@@ -0,0 +1,331 @@
+# src/api/server.py
+"""Headless HTTP API over the RAG pipeline, for other services and load tests.
+
+    python -m src.api.server --port 8000 --workers 16
+
+Endpoints:
+    GET    /health             available LLMs and worker pool load
+    POST   /query              {"query": ..., "llm": ..., "k": 5, "stream": false, ...}
+    POST   /ingest?name=a.pdf  raw PDF bytes as the request body
+    GET    /documents          document metadata keyed by name
+    DELETE /documents/<name>   remove a document and its chunks
+
+Each request is traced under the caller's X-Request-ID header, or a new ID,
+which is echoed back in the X-Request-ID response header.
+"""
+import argparse
+import json
+import logging
+import sys
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, Any
+from urllib.parse import urlsplit, parse_qs, unquote
+
+# Add project root to Python path
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.config import Config
+from src.services import Services, get_services
+from src.processing.ingestion import UploadedBytes
+from src.utils.concurrency import ConcurrencyLimiter
+from src.utils.tracing import span, annotate, current_request_id
+
+logger = logging.getLogger(__name__)
+
+# Request fields passed through to the retriever
+RETRIEVAL_OPTIONS = ["search_type", "mmr_lambda", "fetch_multiplier", "rerank", "rerank_candidates", "adaptive"]
+
+INGEST_STATUS_CODES = {"ingested": 201, "duplicate": 409, "error": 422}
+
+class APIError(Exception):
+    """Error answered with a JSON body and an HTTP status code"""
+    
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+class RAGRequestHandler(BaseHTTPRequestHandler):
+    """Route API requests to the shared pipeline services"""
+    
+    # Keep-alive needs HTTP/1.1; idle connections time out so their threads exit
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    timeout = Config.API_KEEPALIVE_TIMEOUT
+    
+    def log_message(self, format, *args):
+        logger.debug(f"{self.address_string()} {format % args}")
+    
+    @property
+    def services(self) -> Services:
+        return self.server.services
+    
+    def do_GET(self):
+        self._dispatch({
+            "/health": self._handle_health,
+            "/documents": self._handle_list_documents
+        })
+    
+    def do_POST(self):
+        self._dispatch({
+            "/query": self._handle_query,
+            "/ingest": self._handle_ingest
+        })
+    
+    def do_DELETE(self):
+        self._dispatch({}, prefix_routes={"/documents/": self._handle_delete_document})
+    
+    def _dispatch(self, routes: Dict[str, Any], prefix_routes: Dict[str, Any] = None):
+        """Call the handler for the request path, answering errors as JSON"""
+        url = urlsplit(self.path)
+        request_id = (self.headers.get("X-Request-ID") or "")[:64] or None
+        
+        with span(f"api.{self.command.lower()}", request_id=request_id, path=url.path):
+            try:
+                handler = routes.get(url.path)
+                argument = None
+                
+                for prefix, prefix_handler in (prefix_routes or {}).items():
+                    if url.path.startswith(prefix) and len(url.path) > len(prefix):
+                        handler, argument = prefix_handler, unquote(url.path[len(prefix):])
+                
+                if handler is None:
+                    raise APIError(404, f"No route for {self.command} {url.path}")
+                
+                query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+                if argument is not None:
+                    handler(argument)
+                else:
+                    handler(query)
+            
+            # The request body may be unread, so the connection cannot be reused
+            except APIError as e:
+                self._send_json({"error": str(e)}, status=e.status, close=True)
+            
+            except Exception as e:
+                logger.error(f"Error handling {self.command} {url.path}: {str(e)}", exc_info=True)
+                self._send_json({"error": str(e)}, status=500, close=True)
+    
+    def send_response(self, code, message=None):
+        annotate(status=code)
+        super().send_response(code, message)
+    
+    def end_headers(self):
+        if current_request_id():
+            self.send_header("X-Request-ID", current_request_id())
+        super().end_headers()
+    
+    def _handle_health(self, query: Dict[str, str]):
+        self._send_json({
+            "status": "ok",
+            "llms": self.services.rag_generator.get_available_llms(),
+            "workers": self.server.limiter.get_stats()
+        })
+    
+    def _handle_list_documents(self, query: Dict[str, str]):
+        self._send_json({"documents": self.services.document_store.load_documents()})
+    
+    def _handle_delete_document(self, name: str):
+        if not self.services.document_store.has_document(name):
+            raise APIError(404, f"Document not found: {name}")
+        
+        self.services.vector_store.delete_by_document(name)
+        self.services.document_store.remove_document(name)
+        self._send_json({"deleted": name})
+    
+    def _handle_query(self, query: Dict[str, str]):
+        body = self._read_json()
+        
+        question = body.get("query")
+        if not isinstance(question, str) or not question.strip():
+            raise APIError(400, "\"query\" must be a non-empty string")
+        
+        k = body.get("k", 5)
+        if isinstance(k, str) and k.isdigit():
+            k = int(k)
+        if not isinstance(k, int) or isinstance(k, bool) or k <= 0:
+            raise APIError(400, "\"k\" must be a positive integer")
+        
+        use_cache = body.get("use_cache", True)
+        if not isinstance(use_cache, bool):
+            raise APIError(400, "\"use_cache\" must be true or false")
+        
+        retrieval_options = {key: body[key] for key in RETRIEVAL_OPTIONS if body.get(key) is not None}
+        request = dict(
+            query=question,
+            llm_name=body.get("llm"),
+            k=k,
+            use_cache=use_cache,
+            **retrieval_options
+        )
+        
+        with self._worker_slot():
+            if not body.get("stream"):
+                response = self.services.rag_generator.generate_response(**request)
+                status = 200
+                if response.get("error"):
+                    status = 503 if response["error"] == "No LLM available" else 500
+                self._send_json(response, status=status)
+                return
+            
+            # NDJSON: one {"token": ...} line per answer piece, then the completed response
+            # A failure once the 200 headers are out is reported as a final {"error": ...} line
+            response = self.services.rag_generator.generate_response_stream(**request)
+            answer_stream = response.get("answer_stream") or iter(())
+            self._start_chunked("application/x-ndjson")
+            
+            try:
+                for piece in answer_stream:
+                    self._write_chunk(json.dumps({"token": piece}) + "\n")
+                
+                response.pop("answer_stream", None)
+                last_line = {"response": response}
+            
+            except ConnectionError:
+                # The client went away; closing the stream stops the LLM request
+                self.close_connection = True
+                return
+            
+            except Exception as e:
+                logger.error(f"Error streaming answer: {str(e)}", exc_info=True)
+                annotate(error=f"{type(e).__name__}: {str(e)}")
+                last_line = {"error": str(e)}
+            
+            finally:
+                if hasattr(answer_stream, "close"):
+                    answer_stream.close()
+            
+            self._write_chunk(json.dumps(last_line, default=str) + "\n")
+            self._end_chunked()
+    
+    def _handle_ingest(self, query: Dict[str, str]):
+        name = query.get("name") or self.headers.get("X-Filename")
+        if not name:
+            raise APIError(400, "Pass the file name as ?name= or an X-Filename header")
+        
+        length = int(self.headers.get("Content-Length", 0))
+        if length <= 0:
+            raise APIError(400, "Request body must contain the PDF")
+        if length > Config.MAX_FILE_SIZE_MB * 1024 * 1024:
+            raise APIError(413, f"File exceeds {Config.MAX_FILE_SIZE_MB} MB")
+        
+        data = self.rfile.read(length)
+        with self._worker_slot():
+            result = self.services.ingestion.ingest(UploadedBytes(data, name))
+        self._send_json(result, status=INGEST_STATUS_CODES[result["status"]])
+    
+    @contextmanager
+    def _worker_slot(self):
+        """Hold one of the server's worker slots for the duration of the block"""
+        if not self.server.limiter.acquire(Config.API_QUEUE_TIMEOUT):
+            raise APIError(503, "Server is at capacity, retry later")
+        try:
+            yield
+        finally:
+            self.server.limiter.release()
+    
+    def _read_json(self) -> Dict[str, Any]:
+        """Parse the request body as a JSON object"""
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except json.JSONDecodeError as e:
+            raise APIError(400, f"Invalid JSON: {str(e)}")
+        
+        if not isinstance(body, dict):
+            raise APIError(400, "Request body must be a JSON object")
+        return body
+    
+    def _send_json(self, payload: Any, status: int = 200, close: bool = False):
+        data = json.dumps(payload, default=str).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        if close:
+            self.send_header("Connection", "close")
+        self.end_headers()
+        self.wfile.write(data)
+    
+    def _start_chunked(self, content_type: str):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+    
+    def _write_chunk(self, text: str):
+        data = text.encode("utf-8")
+        self.wfile.write(f"{len(data):X}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+    
+    def _end_chunked(self):
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+class RAGAPIServer(ThreadingHTTPServer):
+    """HTTP server whose pipeline work runs on a bounded pool of workers
+    
+    Connections get cheap threads so idle keep-alive clients cannot starve
+    the pool; /query and /ingest then take one of the worker slots, waiting
+    in a bounded FIFO queue and getting 503 when it is full.
+    """
+    
+    daemon_threads = True
+    
+    def __init__(self, address, services: Services, workers: int):
+        self.services = services
+        self.workers = workers
+        # Not the process-wide registry, which would keep the first server's worker count
+        self.limiter = ConcurrencyLimiter("api", workers, Config.API_MAX_QUEUE)
+        super().__init__(address, RAGRequestHandler)
+    
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+    
+    def start(self) -> "RAGAPIServer":
+        """Serve from a background thread (for load tests); returns self"""
+        threading.Thread(target=self.serve_forever, name="rag-api", daemon=True).start()
+        return self
+
+
+def create_server(host: str = None, port: int = None, workers: int = None,
+                  services: Services = None) -> RAGAPIServer:
+    """Create the API server over the process-wide pipeline services"""
+    return RAGAPIServer(
+        (host or Config.API_HOST, Config.API_PORT if port is None else port),
+        services or get_services(),
+        workers or Config.API_WORKERS
+    )
+
+
+def main():
+    from src.utils.logger import setup_logging
+    
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default=Config.API_HOST)
+    parser.add_argument("--port", type=int, default=Config.API_PORT)
+    parser.add_argument("--workers", type=int, default=Config.API_WORKERS)
+    args = parser.parse_args()
+    
+    setup_logging()
+    if not Config.validate_config():
+        logger.warning("Configuration validation failed; the API will start but some endpoints may not work")
+    
+    server = create_server(args.host, args.port, args.workers)
+    logger.info(f"RAG API listening on {server.url} with {args.workers} workers")
+    print(f"RAG API listening on {server.url} with {args.workers} workers")
+    
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -21,12 +21,68 @@ class Config:
     
     # LLM Configuration
     OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY", "")
+    OPENROUTER_MODEL = os.getenv("OPENROUTER_MODEL", "google/gemini-2.0-flash-exp:free")
     OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
     OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "llama2")
     
+    # LLM health checks run in the background; request paths read the cached status
+    LLM_HEALTH_CHECK_INTERVAL = float(os.getenv("LLM_HEALTH_CHECK_INTERVAL", "15"))
+    LLM_HEALTH_STATUS_TTL = float(os.getenv("LLM_HEALTH_STATUS_TTL", "60"))
+    LLM_HEALTH_PROBE_TIMEOUT = float(os.getenv("LLM_HEALTH_PROBE_TIMEOUT", "2"))
+    
+    # Pooled HTTP clients shared by the LLM handlers
+    LLM_POOL_SIZE = int(os.getenv("LLM_POOL_SIZE", "10"))
+    LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "5"))
+    LLM_READ_TIMEOUT = float(os.getenv("LLM_READ_TIMEOUT", "60"))
+    
+    # Per-backend concurrency limits; callers beyond max concurrent wait in a bounded FIFO queue
+    OLLAMA_MAX_CONCURRENT = int(os.getenv("OLLAMA_MAX_CONCURRENT", "2"))
+    OLLAMA_MAX_QUEUE = int(os.getenv("OLLAMA_MAX_QUEUE", "8"))
+    OPENROUTER_MAX_CONCURRENT = int(os.getenv("OPENROUTER_MAX_CONCURRENT", "8"))
+    OPENROUTER_MAX_QUEUE = int(os.getenv("OPENROUTER_MAX_QUEUE", "32"))
+    LLM_QUEUE_TIMEOUT = float(os.getenv("LLM_QUEUE_TIMEOUT", "30"))
+    
+    # Retries for rate-limited or failing OpenRouter calls, and per-handler circuit breakers
+    LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+    LLM_RETRY_BASE_DELAY = float(os.getenv("LLM_RETRY_BASE_DELAY", "1"))
+    LLM_RETRY_MAX_DELAY = float(os.getenv("LLM_RETRY_MAX_DELAY", "20"))
+    LLM_CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("LLM_CIRCUIT_FAILURE_THRESHOLD", "5"))
+    LLM_CIRCUIT_RESET_TIMEOUT = float(os.getenv("LLM_CIRCUIT_RESET_TIMEOUT", "30"))
+    
+    # Hedging (opt-in): when the default handler is slower than its recent p95, race a backup
+    LLM_HEDGE_ENABLED = os.getenv("LLM_HEDGE_ENABLED", "false").lower() == "true"
+    LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "95"))
+    LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+    LLM_HEDGE_DEFAULT_DELAY = float(os.getenv("LLM_HEDGE_DEFAULT_DELAY", "10"))
+    LLM_HEDGE_MIN_DELAY = float(os.getenv("LLM_HEDGE_MIN_DELAY", "1"))
+    
+    # Model context windows and the tokens reserved in them for the answer
+    OPENROUTER_CONTEXT_WINDOW = int(os.getenv("OPENROUTER_CONTEXT_WINDOW", "1048576"))
+    OPENROUTER_MAX_OUTPUT_TOKENS = int(os.getenv("OPENROUTER_MAX_OUTPUT_TOKENS", "8192"))
+    OLLAMA_CONTEXT_WINDOW = int(os.getenv("OLLAMA_CONTEXT_WINDOW", "4096"))
+    OLLAMA_MAX_OUTPUT_TOKENS = int(os.getenv("OLLAMA_MAX_OUTPUT_TOKENS", "1024"))
+    
+    # Maximum tokens of retrieved context sent to each LLM
+    OPENROUTER_CONTEXT_TOKEN_BUDGET = int(os.getenv("OPENROUTER_CONTEXT_TOKEN_BUDGET", "8000"))
+    OLLAMA_CONTEXT_TOKEN_BUDGET = int(os.getenv("OLLAMA_CONTEXT_TOKEN_BUDGET", "2500"))
+    
     # Storage Configuration
     STORAGE_TYPE: Literal["memory", "local"] = os.getenv("STORAGE_TYPE", "local")
     
+    # Chat history: older messages are rotated into gzip archive segments once the log
+    # is SLACK messages past MAX_MESSAGES or larger than ROTATE_BYTES
+    CHAT_HISTORY_MAX_MESSAGES = int(os.getenv("CHAT_HISTORY_MAX_MESSAGES", "1000"))
+    CHAT_HISTORY_COMPACT_SLACK = int(os.getenv("CHAT_HISTORY_COMPACT_SLACK", "250"))
+    CHAT_HISTORY_ROTATE_BYTES = int(os.getenv("CHAT_HISTORY_ROTATE_BYTES", str(4 * 1024 * 1024)))
+    CHAT_HISTORY_ARCHIVE_DIR = CHAT_HISTORY_DIR / "archive"
+    # Messages rendered in the chat view before "Load earlier messages" is needed
+    CHAT_HISTORY_PAGE_SIZE = int(os.getenv("CHAT_HISTORY_PAGE_SIZE", "20"))
+    
+    # Document metadata and chat history backend: "sqlite" (WAL, safe across sessions) or "json" files.
+    # Only "json" reads documents.json through the in-memory DocumentCatalog; SQLite queries the database
+    DOCUMENT_STORE_BACKEND: Literal["sqlite", "json"] = os.getenv("DOCUMENT_STORE_BACKEND", "sqlite")
+    DOCUMENT_DB_PATH = CHAT_HISTORY_DIR / "documents.sqlite3"
+    
     # Processing Configuration
     CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", "500"))
     CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", "50"))
@@ -36,9 +92,66 @@ class Config:
     PAGE_TITLE = os.getenv("PAGE_TITLE", "RAG PDF Pipeline")
     PAGE_ICON = os.getenv("PAGE_ICON", "📚")
     
+    # Status tab latency dashboard: requests slower than these are listed, and
+    # the panel refreshes itself every METRICS_REFRESH_SECONDS
+    SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "5000"))
+    SLOW_INGEST_MS = float(os.getenv("SLOW_INGEST_MS", "30000"))
+    METRICS_REFRESH_SECONDS = float(os.getenv("METRICS_REFRESH_SECONDS", "5"))
+    
+    # Tracing spans are appended to TRACE_FILE as JSON Lines of Chrome trace events
+    # (`jq -s` turns it into an array ui.perfetto.dev opens); rotated past TRACE_MAX_BYTES
+    TRACING_ENABLED = os.getenv("TRACING_ENABLED", "true").lower() == "true"
+    TRACE_FILE = Path(os.getenv("TRACE_FILE", str(PROJECT_ROOT / "logs" / "traces.jsonl")))
+    TRACE_MAX_BYTES = int(os.getenv("TRACE_MAX_BYTES", str(50 * 1024 * 1024)))
+    
+    # Headless HTTP API (python -m src.api.server): at most API_WORKERS queries or
+    # ingests run at once, the rest wait in a FIFO queue of API_MAX_QUEUE
+    API_HOST = os.getenv("API_HOST", "127.0.0.1")
+    API_PORT = int(os.getenv("API_PORT", "8000"))
+    API_WORKERS = int(os.getenv("API_WORKERS", "16"))
+    API_MAX_QUEUE = int(os.getenv("API_MAX_QUEUE", "64"))
+    API_QUEUE_TIMEOUT = float(os.getenv("API_QUEUE_TIMEOUT", "30"))
+    API_KEEPALIVE_TIMEOUT = float(os.getenv("API_KEEPALIVE_TIMEOUT", "5"))
+    
     # Embedding Configuration
     EMBEDDING_MODEL = "all-MiniLM-L6-v2"  # Default ChromaDB embedding
     
+    # Retrieval Configuration
+    RETRIEVAL_SEARCH_TYPE = os.getenv("RETRIEVAL_SEARCH_TYPE", "hybrid")
+    KEYWORD_INDEX_PATH = VECTOR_DB_PATH / "keyword_index.json.gz"
+    HYBRID_VECTOR_WEIGHT = float(os.getenv("HYBRID_VECTOR_WEIGHT", "1.0"))
+    HYBRID_KEYWORD_WEIGHT = float(os.getenv("HYBRID_KEYWORD_WEIGHT", "1.0"))
+    HYBRID_RRF_K = int(os.getenv("HYBRID_RRF_K", "60"))
+    HYBRID_CANDIDATE_MULTIPLIER = int(os.getenv("HYBRID_CANDIDATE_MULTIPLIER", "3"))
+    MMR_LAMBDA = float(os.getenv("MMR_LAMBDA", "0.5"))
+    MMR_FETCH_MULTIPLIER = int(os.getenv("MMR_FETCH_MULTIPLIER", "4"))
+    
+    # Adaptive k: k becomes a maximum and weak candidates are cut
+    ADAPTIVE_K_ENABLED = os.getenv("ADAPTIVE_K_ENABLED", "false").lower() == "true"
+    ADAPTIVE_FETCH_MULTIPLIER = int(os.getenv("ADAPTIVE_FETCH_MULTIPLIER", "2"))
+    ADAPTIVE_MAX_DISTANCE = float(os.getenv("ADAPTIVE_MAX_DISTANCE", "1.5"))
+    ADAPTIVE_GAP_RATIO = float(os.getenv("ADAPTIVE_GAP_RATIO", "3.0"))
+    
+    # Reranking Configuration
+    RERANK_ENABLED = os.getenv("RERANK_ENABLED", "false").lower() == "true"
+    RERANKER_MODEL = os.getenv("RERANKER_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+    RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", "20"))
+    RERANK_MAX_CANDIDATES = int(os.getenv("RERANK_MAX_CANDIDATES", "50"))
+    RERANK_BATCH_SIZE = int(os.getenv("RERANK_BATCH_SIZE", "16"))
+    RERANK_CACHE_SIZE = int(os.getenv("RERANK_CACHE_SIZE", "10000"))
+    
+    # Semantic Cache Configuration
+    SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "true").lower() == "true"
+    SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95"))
+    SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "500"))
+    SEMANTIC_CACHE_TTL_SECONDS = float(os.getenv("SEMANTIC_CACHE_TTL_SECONDS", "3600"))
+    
+    # LLM Response Cache: exact matches on handler, model, prompt and context
+    RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() == "true"
+    RESPONSE_CACHE_PATH = DATA_DIR / "response_cache.sqlite3"
+    RESPONSE_CACHE_TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "86400"))
+    RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "5000"))
+    
     @classmethod
     def create_directories(cls):
         """Create necessary directories if they don't exist"""
@@ -51,7 +164,7 @@ class Config:
         
         for directory in directories:
             directory.mkdir(parents=True, exist_ok=True)
-            
+        
         # Create .gitkeep files
         for directory in [cls.UPLOAD_DIR, cls.VECTOR_DB_PATH, cls.CHAT_HISTORY_DIR]:
             gitkeep = directory / ".gitkeep"
@@ -78,24 +191,93 @@ class Config:
         if cls.CHUNK_OVERLAP < 0:
             errors.append("CHUNK_OVERLAP must be non-negative.")
         
+        if cls.CHAT_HISTORY_MAX_MESSAGES <= 0 or cls.CHAT_HISTORY_COMPACT_SLACK < 0:
+            errors.append("CHAT_HISTORY_MAX_MESSAGES must be positive and CHAT_HISTORY_COMPACT_SLACK non-negative.")
+        
+        if cls.CHAT_HISTORY_ROTATE_BYTES <= 0:
+            errors.append("CHAT_HISTORY_ROTATE_BYTES must be positive.")
+        
+        if cls.CHAT_HISTORY_PAGE_SIZE <= 0:
+            errors.append("CHAT_HISTORY_PAGE_SIZE must be positive.")
+        
+        if cls.DOCUMENT_STORE_BACKEND not in ["sqlite", "json"]:
+            errors.append(f"Invalid DOCUMENT_STORE_BACKEND: {cls.DOCUMENT_STORE_BACKEND}. Must be 'sqlite' or 'json'.")
+        
         if cls.MAX_FILE_SIZE_MB <= 0:
             errors.append("MAX_FILE_SIZE_MB must be positive.")
-            
+        
+        if cls.SLOW_QUERY_MS <= 0 or cls.SLOW_INGEST_MS <= 0 or cls.METRICS_REFRESH_SECONDS <= 0:
+            errors.append("SLOW_QUERY_MS, SLOW_INGEST_MS and METRICS_REFRESH_SECONDS must be positive.")
+        
+        if cls.TRACE_MAX_BYTES <= 0:
+            errors.append("TRACE_MAX_BYTES must be positive.")
+        
+        if cls.API_WORKERS <= 0 or cls.API_MAX_QUEUE < 0 or cls.API_QUEUE_TIMEOUT <= 0 or cls.API_KEEPALIVE_TIMEOUT <= 0:
+            errors.append("API_WORKERS, API_QUEUE_TIMEOUT and API_KEEPALIVE_TIMEOUT must be positive and API_MAX_QUEUE non-negative.")
+        
+        if cls.OPENROUTER_CONTEXT_TOKEN_BUDGET <= 0 or cls.OLLAMA_CONTEXT_TOKEN_BUDGET <= 0:
+            errors.append("Context token budgets must be positive.")
+        
+        if (cls.OPENROUTER_MAX_OUTPUT_TOKENS >= cls.OPENROUTER_CONTEXT_WINDOW
+                or cls.OLLAMA_MAX_OUTPUT_TOKENS >= cls.OLLAMA_CONTEXT_WINDOW):
+            errors.append("MAX_OUTPUT_TOKENS must be smaller than the model's CONTEXT_WINDOW.")
+        
+        # Check retrieval settings
+        if cls.RETRIEVAL_SEARCH_TYPE not in ["vector", "hybrid", "mmr"]:
+            errors.append(f"Invalid RETRIEVAL_SEARCH_TYPE: {cls.RETRIEVAL_SEARCH_TYPE}. Must be 'vector', 'hybrid' or 'mmr'.")
+        
+        if not 0 <= cls.MMR_LAMBDA <= 1:
+            errors.append("MMR_LAMBDA must be between 0 and 1.")
+        
+        if cls.MMR_FETCH_MULTIPLIER < 1:
+            errors.append("MMR_FETCH_MULTIPLIER must be at least 1.")
+        
+        if cls.ADAPTIVE_FETCH_MULTIPLIER < 1 or cls.ADAPTIVE_GAP_RATIO <= 0:
+            errors.append("ADAPTIVE_FETCH_MULTIPLIER must be at least 1 and ADAPTIVE_GAP_RATIO positive.")
+        
+        if cls.RERANK_CANDIDATES <= 0 or cls.RERANK_MAX_CANDIDATES <= 0:
+            errors.append("RERANK_CANDIDATES and RERANK_MAX_CANDIDATES must be positive.")
+        
+        if not 0 < cls.SEMANTIC_CACHE_THRESHOLD <= 1:
+            errors.append("SEMANTIC_CACHE_THRESHOLD must be in (0, 1].")
+        
+        if cls.OLLAMA_MAX_CONCURRENT <= 0 or cls.OPENROUTER_MAX_CONCURRENT <= 0:
+            errors.append("OLLAMA_MAX_CONCURRENT and OPENROUTER_MAX_CONCURRENT must be positive.")
+        
+        if cls.OLLAMA_MAX_QUEUE < 0 or cls.OPENROUTER_MAX_QUEUE < 0:
+            errors.append("OLLAMA_MAX_QUEUE and OPENROUTER_MAX_QUEUE must be non-negative.")
+        
+        if cls.LLM_MAX_RETRIES < 0 or cls.LLM_CIRCUIT_FAILURE_THRESHOLD <= 0:
+            errors.append("LLM_MAX_RETRIES must be non-negative and LLM_CIRCUIT_FAILURE_THRESHOLD positive.")
+        
+        if not 0 < cls.LLM_HEDGE_PERCENTILE <= 100:
+            errors.append("LLM_HEDGE_PERCENTILE must be in (0, 100].")
+        
+        if cls.RESPONSE_CACHE_MAX_ENTRIES <= 0:
+            errors.append("RESPONSE_CACHE_MAX_ENTRIES must be positive.")
+        
+        if cls.HYBRID_VECTOR_WEIGHT < 0 or cls.HYBRID_KEYWORD_WEIGHT < 0:
+            errors.append("HYBRID_VECTOR_WEIGHT and HYBRID_KEYWORD_WEIGHT must be non-negative.")
+        
         if errors:
             print("Configuration errors:")
             for error in errors:
                 print(f"  - {error}")
             return False
-            
+        
         return True
     
     @classmethod
     def _is_ollama_available(cls) -> bool:
-        """Check if Ollama is available"""
+        """Check if Ollama is available (cached status from the background health monitor)"""
         try:
-            import requests
-            response = requests.get(f"{cls.OLLAMA_BASE_URL}/api/tags", timeout=5)
-            return response.status_code == 200
+            from src.models.llm_handler import OllamaHandler, get_health_monitor
+            monitor = get_health_monitor()
+            
+            # The first handler created registers the probe; later calls only read the status
+            if not monitor.is_registered(OllamaHandler.health_key):
+                OllamaHandler()
+            return monitor.is_available(OllamaHandler.health_key)
         except:
             return False
     
@@ -106,10 +288,10 @@ class Config:
         
         if cls.OPENROUTER_API_KEY:
             available.append("openAi")
-            
+        
         if cls._is_ollama_available():
             available.append("ollama")
-            
+        
         return available
 
 # Initialize configuration on import
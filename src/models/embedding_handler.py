@@ -1,11 +1,28 @@
 # src/models/embedding_handler.py
 import logging
+import threading
 from typing import List, Optional
 import chromadb
+from chromadb.utils import embedding_functions
 from src.config import Config
+from src.utils.tracing import traced, annotate
 
 logger = logging.getLogger(__name__)
 
+# Loading the embedding model is expensive, so one instance is shared per process
+_embedding_function = None
+_embedding_function_lock = threading.Lock()
+
+
+def _get_embedding_function():
+    """Return the process-wide ChromaDB default embedding function"""
+    global _embedding_function
+    
+    with _embedding_function_lock:
+        if _embedding_function is None:
+            _embedding_function = embedding_functions.DefaultEmbeddingFunction()
+        return _embedding_function
+
 class EmbeddingHandler:
     """Handle embeddings for ChromaDB"""
     
@@ -13,16 +30,25 @@ class EmbeddingHandler:
         # ChromaDB uses sentence-transformers by default
         self.model_name = Config.EMBEDDING_MODEL
     
+    @traced("embedding.embed")
     def embed_texts(self, texts: List[str]) -> Optional[List[List[float]]]:
-        """Embed a list of texts (handled by ChromaDB automatically)"""
-        # ChromaDB handles embeddings automatically, so we just return None
-        # This method is here for potential future custom embedding logic
-        return None
+        """Embed a list of texts with the same model ChromaDB uses for the collection"""
+        if not texts:
+            return []
+        
+        annotate(texts=len(texts), chars=sum(len(text) for text in texts))
+        
+        try:
+            return list(_get_embedding_function()(texts))
+            
+        except Exception as e:
+            logger.error(f"Error embedding texts: {str(e)}")
+            return None
     
     def embed_query(self, query: str) -> Optional[List[float]]:
-        """Embed a query (handled by ChromaDB automatically)"""
-        # ChromaDB handles query embeddings automatically
-        return None
+        """Embed a single query"""
+        embeddings = self.embed_texts([query])
+        return embeddings[0] if embeddings else None
     
     def get_model_info(self) -> dict:
         """Get information about the embedding model"""
@@ -1,12 +1,28 @@
 
 # src/models/llm_handler.py
+import asyncio
 import logging
-from typing import Optional, Dict, Any, List
+import queue
+import socket
+import threading
+import time
+import weakref
+from typing import Optional, Dict, Any, List, Callable, Iterator, Tuple
 from abc import ABC, abstractmethod
+from contextlib import contextmanager, nullcontext
+from concurrent.futures import ThreadPoolExecutor
 import requests
+from requests.adapters import HTTPAdapter
+import httpx
 import json
 from src.config import Config
-from openai import OpenAI
+from src.models.response_cache import get_response_cache
+from src.utils.metrics import get_histogram
+from src.utils.concurrency import ConcurrencyLimiter, get_concurrency_limiter
+from src.utils.tokens import count_tokens, truncate_to_tokens
+from src.utils.resilience import CircuitBreaker, get_circuit_breaker, backoff_delay, parse_retry_after
+from src.utils.tracing import span, start_span, activate, traced, annotate, trace_stream, run_in_context
+from openai import OpenAI, AsyncOpenAI, APIConnectionError, APIStatusError
 import os
 
 
@@ -14,18 +30,381 @@ import os
 
 logger = logging.getLogger(__name__)
 
+class HealthMonitor:
+    """Track LLM handler availability with a background checker and TTL-cached status"""
+    
+    def __init__(self, interval: float = None, status_ttl: float = None, first_check_timeout: float = None):
+        self.interval = interval or Config.LLM_HEALTH_CHECK_INTERVAL
+        self.status_ttl = status_ttl or Config.LLM_HEALTH_STATUS_TTL
+        self.first_check_timeout = first_check_timeout or Config.LLM_HEALTH_PROBE_TIMEOUT + 1
+        
+        self._checks: Dict[str, Callable[[], bool]] = {}
+        # name -> (available, checked_at)
+        self._status: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+        self._status_changed = threading.Condition(self._lock)
+        self._wake = threading.Event()
+        self._thread = None
+    
+    def register(self, name: str, check: Callable[[], bool]):
+        """Register (or replace) the probe for a handler and schedule an immediate check"""
+        with self._lock:
+            self._checks[name] = check
+            
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="llm-health", daemon=True)
+                self._thread.start()
+        
+        self._wake.set()
+    
+    def is_registered(self, name: str) -> bool:
+        """Whether a probe has been registered for the handler"""
+        with self._lock:
+            return name in self._checks
+    
+    def is_available(self, name: str) -> bool:
+        """Return the cached status without probing
+        
+        Callers only block on the very first check of a handler after startup,
+        bounded by first_check_timeout.
+        """
+        with self._lock:
+            if name not in self._status and name in self._checks:
+                self._status_changed.wait_for(lambda: name in self._status, timeout=self.first_check_timeout)
+            
+            available, checked_at = self._status.get(name, (False, 0.0))
+            expired = time.monotonic() - checked_at > self.status_ttl
+        
+        if expired:
+            # The checker fell behind; treat the status as unknown and ask for a refresh
+            self._wake.set()
+            return False
+        
+        return available
+    
+    def report_failure(self, name: str):
+        """Mark a handler unavailable after a failed request and re-check it soon"""
+        with self._lock:
+            self._status[name] = (False, time.monotonic())
+        
+        logger.warning(f"LLM handler {name} reported a failure, scheduling health check")
+        self._wake.set()
+    
+    def get_status(self) -> Dict[str, Dict[str, Any]]:
+        """Get the cached status and age of every handler"""
+        now = time.monotonic()
+        with self._lock:
+            return {
+                name: {"available": available, "age_seconds": now - checked_at}
+                for name, (available, checked_at) in self._status.items()
+            }
+    
+    def _run(self):
+        """Probe every registered handler, then sleep until the interval passes or a refresh is requested"""
+        while True:
+            self._wake.clear()
+            
+            with self._lock:
+                checks = list(self._checks.items())
+            
+            for name, check in checks:
+                try:
+                    available = bool(check())
+                except Exception as e:
+                    logger.debug(f"Health check for {name} failed: {str(e)}")
+                    available = False
+                
+                with self._lock:
+                    previous = self._status.get(name, (None, 0.0))[0]
+                    self._status[name] = (available, time.monotonic())
+                    self._status_changed.notify_all()
+                
+                if previous is not None and previous != available:
+                    logger.info(f"LLM handler {name} is now {'available' if available else 'unavailable'}")
+            
+            self._wake.wait(self.interval)
+
+# A single checker serves every handler instance in the process
+_health_monitor = None
+_health_monitor_lock = threading.Lock()
+
+
+def get_health_monitor() -> HealthMonitor:
+    """Return the process-wide health monitor"""
+    global _health_monitor
+    
+    with _health_monitor_lock:
+        if _health_monitor is None:
+            _health_monitor = HealthMonitor()
+        return _health_monitor
+
+# Pooled HTTP clients are shared by every handler instance in the process so
+# connections (and TLS sessions) survive Streamlit reruns
+_http_clients: Dict[Any, Any] = {}
+_http_clients_lock = threading.Lock()
+
+
+def get_http_session() -> requests.Session:
+    """Return the process-wide keep-alive session used for Ollama"""
+    with _http_clients_lock:
+        session = _http_clients.get("requests")
+        if session is None:
+            adapter = HTTPAdapter(
+                pool_connections=Config.LLM_POOL_SIZE,
+                pool_maxsize=Config.LLM_POOL_SIZE
+            )
+            session = requests.Session()
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _http_clients["requests"] = session
+        return session
+
+
+def get_openai_client(api_key: str, base_url: str) -> OpenAI:
+    """Return the process-wide OpenAI client for an API key and endpoint"""
+    key = ("openai", api_key, base_url)
+    
+    with _http_clients_lock:
+        client = _http_clients.get(key)
+        if client is None:
+            http_client = httpx.Client(
+                limits=httpx.Limits(
+                    max_connections=Config.LLM_POOL_SIZE,
+                    max_keepalive_connections=Config.LLM_POOL_SIZE
+                ),
+                timeout=httpx.Timeout(Config.LLM_READ_TIMEOUT, connect=Config.LLM_CONNECT_TIMEOUT)
+            )
+            # Retries are done by OpenAIHandler so they can honour Retry-After and feed the circuit breaker
+            client = OpenAI(base_url=base_url, api_key=api_key, http_client=http_client, max_retries=0)
+            _http_clients[key] = client
+        return client
+
+# httpx.AsyncClient is bound to the event loop it was first used on, so async
+# clients are pooled per loop and dropped together with it
+_async_clients: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+
+def _get_loop_clients() -> Dict[Any, Any]:
+    """Return the async client registry of the running event loop"""
+    loop = asyncio.get_running_loop()
+    with _http_clients_lock:
+        return _async_clients.setdefault(loop, {})
+
+
+def _new_async_http_client() -> httpx.AsyncClient:
+    """Create a pooled async HTTP client with the configured limits and timeouts"""
+    return httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=Config.LLM_POOL_SIZE,
+            max_keepalive_connections=Config.LLM_POOL_SIZE
+        ),
+        timeout=httpx.Timeout(Config.LLM_READ_TIMEOUT, connect=Config.LLM_CONNECT_TIMEOUT)
+    )
+
+
+def get_async_http_client() -> httpx.AsyncClient:
+    """Return the pooled async HTTP client for the running event loop"""
+    clients = _get_loop_clients()
+    if "httpx" not in clients:
+        clients["httpx"] = _new_async_http_client()
+    return clients["httpx"]
+
+
+def get_async_openai_client(api_key: str, base_url: str) -> AsyncOpenAI:
+    """Return the async OpenAI client for the running event loop"""
+    clients = _get_loop_clients()
+    key = ("openai", api_key, base_url)
+    if key not in clients:
+        clients[key] = AsyncOpenAI(
+            base_url=base_url, api_key=api_key, http_client=_new_async_http_client(), max_retries=0
+        )
+    return clients[key]
+
+class StreamCancellation:
+    """Cancel a streaming request from another thread
+    
+    Works like a threading.Event, and also runs the callbacks registered by
+    the request when set, so a response blocked in a read is aborted instead
+    of running on until the backend finishes.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cancelled = False
+        self._callbacks: List[Callable[[], None]] = []
+    
+    def is_set(self) -> bool:
+        """Whether the request has been cancelled"""
+        return self._cancelled
+    
+    def set(self) -> None:
+        """Cancel the request; later calls do nothing"""
+        with self._lock:
+            if self._cancelled:
+                return
+            self._cancelled = True
+            
+            for callback in self._callbacks:
+                try:
+                    callback()
+                except Exception as e:
+                    logger.debug(f"Error cancelling request: {str(e)}")
+    
+    @contextmanager
+    def on_cancel(self, callback: Callable[[], None]) -> Iterator[None]:
+        """Run callback if the request is cancelled while the block runs (or was already)"""
+        with self._lock:
+            if self._cancelled:
+                callback()
+            else:
+                self._callbacks.append(callback)
+        
+        try:
+            yield
+        finally:
+            # Under the lock, so a connection is never aborted after it went back to the pool
+            with self._lock:
+                if callback in self._callbacks:
+                    self._callbacks.remove(callback)
+
+
+def _abort_response(response: Any) -> None:
+    """Shut down the socket of a requests or httpx response, unblocking the thread reading it
+    
+    Closing the response from another thread would leave that read blocked
+    until the backend sends more data; the reading thread closes it itself.
+    """
+    try:
+        if isinstance(response, requests.Response):
+            sock = response.raw.connection.sock
+        else:
+            sock = response.extensions["network_stream"].get_extra_info("socket")
+    except (AttributeError, KeyError):
+        return
+    
+    if sock is not None:
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+
+def _call_once(func: Callable[[], None]) -> Callable[[], None]:
+    """Wrap func so that only the first call, from any thread, runs it"""
+    lock = threading.Lock()
+    called = []
+    
+    def wrapper():
+        with lock:
+            if called:
+                return
+            called.append(True)
+        func()
+    
+    return wrapper
+
+
+@contextmanager
+def _aborted_on_cancel(cancellation: Optional[StreamCancellation], response: Any) -> Iterator[None]:
+    """Abort response if the request is cancelled while the block runs"""
+    if cancellation is None:
+        yield
+        return
+    
+    with cancellation.on_cancel(lambda: _abort_response(response)):
+        yield
+
 class BaseLLMHandler(ABC):
     """Base class for LLM handlers"""
     
+    # Key under which the handler's health is tracked
+    health_key: str = None
+    
+    # Model name sent to the backend; part of the response cache key
+    model: str = None
+    
+    # Shared cap on in-flight requests to the backend
+    limiter: ConcurrencyLimiter = None
+    
+    # Opens after repeated failures so requests are routed elsewhere
+    breaker: CircuitBreaker = None
+    
+    # Model context window and the part of it kept free for the answer
+    context_window: int = None
+    max_output_tokens: int = None
+    
+    # Maximum tokens of retrieved context to put in the prompt
+    context_token_budget: Optional[int] = None
+    
     @abstractmethod
     def generate_response(self, prompt: str, context: str = "", **kwargs) -> Optional[str]:
         """Generate response from the LLM"""
         pass
     
+    async def agenerate_response(self, prompt: str, context: str = "", **kwargs) -> Optional[str]:
+        """Generate response without blocking the event loop
+        
+        Handlers without a native async client run generate_response in a worker thread.
+        """
+        return await asyncio.to_thread(self.generate_response, prompt, context, **kwargs)
+    
+    def stream_response(self, prompt: str, context: str = "",
+                        cancellation: Optional[StreamCancellation] = None, **kwargs) -> Iterator[str]:
+        """Yield the response in pieces as the LLM produces them
+        
+        Setting cancellation from another thread aborts the request. Handlers
+        without native streaming yield the complete response once.
+        """
+        response = self.generate_response(prompt, context, **kwargs)
+        if response:
+            yield response
+    
+    def prompt_token_limit(self) -> int:
+        """Maximum prompt tokens that leave room for the answer in the context window"""
+        return self.context_window - self.max_output_tokens
+    
+    def count_prompt_tokens(self, question: str, context: str = "") -> int:
+        """Count the tokens of the prompt that would be sent, locally and without a tokenizer"""
+        return count_tokens(self._build_prompt(context, question))
+    
+    def context_budget(self, question: str = "") -> int:
+        """Tokens of context that fit next to the prompt template and question"""
+        # Any non-empty context selects the RAG template; a blank one counts as zero tokens
+        overhead = self.count_prompt_tokens(question, " ")
+        return max(0, min(self.context_token_budget, self.prompt_token_limit() - overhead))
+    
+    def _fit_prompt(self, question: str, context: str) -> str:
+        """Build the prompt, cutting the context if the whole would overflow the context window
+        
+        Retrieval already sizes the context with context_budget, dropping the
+        lowest-ranked chunks first; this is the last line of defence for
+        callers that pass their own context.
+        """
+        prompt = self._build_prompt(context, question)
+        prompt_tokens = count_tokens(prompt)
+        
+        if prompt_tokens <= self.prompt_token_limit():
+            return prompt
+        
+        budget = self.context_budget(question)
+        logger.warning(
+            f"Prompt of ~{prompt_tokens} tokens exceeds the {self.prompt_token_limit()} token limit of "
+            f"{self.model}, cutting context to {budget} tokens"
+        )
+        return self._build_prompt(truncate_to_tokens(context, budget), question)
+    
     @abstractmethod
-    def is_available(self) -> bool:
-        """Check if the LLM is available"""
+    def check_health(self) -> bool:
+        """Probe the LLM backend; only the background health monitor calls this"""
         pass
+    
+    def is_available(self) -> bool:
+        """Check if the LLM is available, using the monitor's cached status"""
+        return get_health_monitor().is_available(self.health_key)
+    
+    def _register_health_check(self):
+        """Hand this handler's probe to the background health monitor"""
+        get_health_monitor().register(self.health_key, self.check_health)
 
 
 
@@ -33,9 +412,22 @@ class BaseLLMHandler(ABC):
 class OpenAIHandler(BaseLLMHandler):
     """Handle OPENROUTER/OpenAI API interactions"""
     
+    health_key = "openAi"
+    
     def __init__(self):
         self.api_key = Config.OPENROUTER_API_KEY
         self.base_url = "https://openrouter.ai/api/v1",
+        self.model = Config.OPENROUTER_MODEL
+        self.context_token_budget = Config.OPENROUTER_CONTEXT_TOKEN_BUDGET
+        self.context_window = Config.OPENROUTER_CONTEXT_WINDOW
+        self.max_output_tokens = Config.OPENROUTER_MAX_OUTPUT_TOKENS
+        self.limiter = get_concurrency_limiter(
+            f"llm.{self.health_key}", Config.OPENROUTER_MAX_CONCURRENT, Config.OPENROUTER_MAX_QUEUE
+        )
+        self.breaker = get_circuit_breaker(
+            f"llm.{self.health_key}", Config.LLM_CIRCUIT_FAILURE_THRESHOLD, Config.LLM_CIRCUIT_RESET_TIMEOUT
+        )
+        self._register_health_check()
     
     def generate_response(self, prompt: str, context: str = "", **kwargs) -> Optional[str]:
         """Generate response using OpenAI/openrouter API"""
@@ -44,47 +436,168 @@ class OpenAIHandler(BaseLLMHandler):
             return None
         
         try:
-
-            client = OpenAI(
-                base_url="https://openrouter.ai/api/v1",
-                api_key=self.api_key,
-                )
-            completion = client.chat.completions.create(
-            # model="moonshotai/kimi-dev-72b:free",
-            model="google/gemini-2.0-flash-exp:free",
+        
+            client = self._create_client()
+            completion = self._with_retries(lambda: client.chat.completions.create(
+            model=self.model,
             messages=[
                         {
                         "role": "user",
-                        "content": self._build_prompt(context, prompt)
+                        "content": self._fit_prompt(prompt, context)
                         }
                     ]
-            )
-
+            ))
+            
             if completion.choices[0].message.content:
                 return completion.choices[0].message.content
-                
+            
             else:
                 logger.error("Empty response from OpenAi/Openrouter")
                 return None
-                
+        
         except Exception as e:
             logger.error(f"Error with OpenAI/openrouter API: {str(e)}")
             return None
     
-    def is_available(self) -> bool:
+    async def agenerate_response(self, prompt: str, context: str = "", **kwargs) -> Optional[str]:
+        """Generate response using the async OpenAI/openrouter client"""
+        if not self.is_available():
+            logger.error("Openrouter/OpenAI API key not configured")
+            return None
+        
+        try:
+            client = get_async_openai_client(self.api_key, "https://openrouter.ai/api/v1")
+            completion = await self._awith_retries(lambda: client.chat.completions.create(
+                model=self.model,
+                messages=[
+                    {
+                        "role": "user",
+                        "content": self._fit_prompt(prompt, context)
+                    }
+                ]
+            ))
+            
+            if completion.choices[0].message.content:
+                return completion.choices[0].message.content
+            
+            logger.error("Empty response from OpenAi/Openrouter")
+            return None
+        
+        except Exception as e:
+            logger.error(f"Error with OpenAI/openrouter API: {str(e)}")
+            return None
+    
+    def stream_response(self, prompt: str, context: str = "",
+                        cancellation: Optional[StreamCancellation] = None, **kwargs) -> Iterator[str]:
+        """Stream response tokens from OpenAI/openrouter API"""
+        if not self.is_available():
+            logger.error("Openrouter/OpenAI API key not configured")
+            return
+        
+        try:
+            client = self._create_client()
+            # Rate limits surface when the stream is opened, before any token is relayed
+            stream = self._with_retries(lambda: client.chat.completions.create(
+                model=self.model,
+                messages=[
+                    {
+                        "role": "user",
+                        "content": self._fit_prompt(prompt, context)
+                    }
+                ],
+                stream=True
+            ))
+            
+            with stream, _aborted_on_cancel(cancellation, stream.response):
+                for chunk in stream:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        yield chunk.choices[0].delta.content
+        
+        except Exception as e:
+            if cancellation is None or not cancellation.is_set():
+                logger.error(f"Error streaming from OpenAI/openrouter API: {str(e)}")
+    
+    def check_health(self) -> bool:
         """Check if OPENROUTER API is configured"""
         return bool(self.api_key)
     
+    def _create_client(self) -> OpenAI:
+        """Get the pooled API client for OpenRouter"""
+        return get_openai_client(self.api_key, "https://openrouter.ai/api/v1")
+    
+    def _with_retries(self, request: Callable[[], Any]) -> Any:
+        """Run an API call, retrying rate limits and transient errors with backoff"""
+        attempt = 0
+        while True:
+            try:
+                return request()
+            except Exception as e:
+                delay = self._retry_delay(e, attempt)
+                if delay is None:
+                    raise
+            
+            time.sleep(delay)
+            attempt += 1
+    
+    async def _awith_retries(self, request: Callable[[], Any]) -> Any:
+        """Async variant of _with_retries"""
+        attempt = 0
+        while True:
+            try:
+                return await request()
+            except Exception as e:
+                delay = self._retry_delay(e, attempt)
+                if delay is None:
+                    raise
+            
+            await asyncio.sleep(delay)
+            attempt += 1
+    
+    def _retry_delay(self, error: Exception, attempt: int) -> Optional[float]:
+        """Seconds to wait before retrying after an error, or None to give up
+        
+        429s, 5xx responses and connection errors are retried with exponential
+        backoff and jitter; a Retry-After header overrides the backoff, and a
+        wait longer than LLM_RETRY_MAX_DELAY is not worth holding the user for.
+        """
+        if attempt >= Config.LLM_MAX_RETRIES:
+            return None
+        
+        if isinstance(error, APIStatusError):
+            if error.status_code not in (408, 409, 429) and error.status_code < 500:
+                return None
+            retry_after = parse_retry_after(error.response.headers)
+            reason = f"HTTP {error.status_code}"
+        elif isinstance(error, APIConnectionError):
+            retry_after = None
+            reason = type(error).__name__
+        else:
+            return None
+        
+        if retry_after is not None:
+            if retry_after > Config.LLM_RETRY_MAX_DELAY:
+                logger.warning(f"OpenRouter asked to retry after {retry_after:.0f}s, giving up")
+                return None
+            delay = retry_after
+        else:
+            delay = backoff_delay(attempt, Config.LLM_RETRY_BASE_DELAY, Config.LLM_RETRY_MAX_DELAY)
+        
+        logger.warning(
+            f"OpenRouter request failed ({reason}), retrying in {delay:.1f}s "
+            f"(retry {attempt + 1} of {Config.LLM_MAX_RETRIES})"
+        )
+        return delay
+    
     def _build_prompt(self, context: str, question: str) -> str:
         """Build the prompt for OpenAi"""
         if context:
             return f"""You are a helpful assistant that answers questions based on the provided context.
-
+            
                     Context:
                     {context}
-
+                    
                     Question: {question}
-
+                    
                     Please provide a comprehensive answer based on the context above. If the context doesn't contain relevant information, please say so."""
         else:
             return question
@@ -92,9 +605,23 @@ class OpenAIHandler(BaseLLMHandler):
 class OllamaHandler(BaseLLMHandler):
     """Handle Ollama API interactions"""
     
+    health_key = "ollama"
+    
     def __init__(self):
         self.base_url = Config.OLLAMA_BASE_URL
         self.model = Config.OLLAMA_MODEL
+        self.context_token_budget = Config.OLLAMA_CONTEXT_TOKEN_BUDGET
+        self.context_window = Config.OLLAMA_CONTEXT_WINDOW
+        self.max_output_tokens = Config.OLLAMA_MAX_OUTPUT_TOKENS
+        self.limiter = get_concurrency_limiter(
+            f"llm.{self.health_key}", Config.OLLAMA_MAX_CONCURRENT, Config.OLLAMA_MAX_QUEUE
+        )
+        self.breaker = get_circuit_breaker(
+            f"llm.{self.health_key}", Config.LLM_CIRCUIT_FAILURE_THRESHOLD, Config.LLM_CIRCUIT_RESET_TIMEOUT
+        )
+        self.session = get_http_session()
+        self.timeout = (Config.LLM_CONNECT_TIMEOUT, Config.LLM_READ_TIMEOUT)
+        self._register_health_check()
     
     def generate_response(self, prompt: str, context: str = "", **kwargs) -> Optional[str]:
         """Generate response using Ollama API"""
@@ -104,17 +631,18 @@ class OllamaHandler(BaseLLMHandler):
         
         try:
             # Build the full prompt
-            full_prompt = self._build_prompt(context, prompt)
+            full_prompt = self._fit_prompt(prompt, context)
             
             # Make API request
-            response = requests.post(
+            response = self.session.post(
                 f"{self.base_url}/api/generate",
                 json={
                     "model": self.model,
                     "prompt": full_prompt,
-                    "stream": False
+                    "stream": False,
+                    "options": self._options()
                 },
-                timeout=60
+                timeout=self.timeout
             )
             
             if response.status_code == 200:
@@ -123,15 +651,106 @@ class OllamaHandler(BaseLLMHandler):
             else:
                 logger.error(f"Ollama API error: {response.status_code}")
                 return None
-                
+        
+        except requests.ConnectionError as e:
+            logger.error(f"Cannot reach Ollama: {str(e)}")
+            get_health_monitor().report_failure(self.health_key)
+            return None
+        
         except Exception as e:
             logger.error(f"Error with Ollama API: {str(e)}")
             return None
     
-    def is_available(self) -> bool:
+    async def agenerate_response(self, prompt: str, context: str = "", **kwargs) -> Optional[str]:
+        """Generate response using Ollama API over the async HTTP client"""
+        if not self.is_available():
+            logger.error("Ollama not available")
+            return None
+        
+        try:
+            response = await get_async_http_client().post(
+                f"{self.base_url}/api/generate",
+                json={
+                    "model": self.model,
+                    "prompt": self._fit_prompt(prompt, context),
+                    "stream": False,
+                    "options": self._options()
+                }
+            )
+            
+            if response.status_code == 200:
+                return response.json().get("response", "").strip()
+            
+            logger.error(f"Ollama API error: {response.status_code}")
+            return None
+        
+        except httpx.ConnectError as e:
+            logger.error(f"Cannot reach Ollama: {str(e)}")
+            get_health_monitor().report_failure(self.health_key)
+            return None
+        
+        except Exception as e:
+            logger.error(f"Error with Ollama API: {str(e)}")
+            return None
+    
+    def stream_response(self, prompt: str, context: str = "",
+                        cancellation: Optional[StreamCancellation] = None, **kwargs) -> Iterator[str]:
+        """Stream response tokens from Ollama API"""
+        if not self.is_available():
+            logger.error("Ollama not available")
+            return
+        
+        try:
+            full_prompt = self._fit_prompt(prompt, context)
+            
+            with self.session.post(
+                f"{self.base_url}/api/generate",
+                json={
+                    "model": self.model,
+                    "prompt": full_prompt,
+                    "stream": True,
+                    "options": self._options()
+                },
+                timeout=self.timeout,
+                stream=True
+            ) as response, _aborted_on_cancel(cancellation, response):
+                if response.status_code != 200:
+                    logger.error(f"Ollama API error: {response.status_code}")
+                    return
+                
+                # Ollama streams one JSON object per line
+                for line in response.iter_lines():
+                    if not line:
+                        continue
+                    
+                    chunk = json.loads(line)
+                    if chunk.get("response"):
+                        yield chunk["response"]
+                    if chunk.get("done"):
+                        break
+        
+        except Exception as e:
+            # An aborted request fails with a connection error that says nothing about Ollama
+            if cancellation is not None and cancellation.is_set():
+                return
+            
+            if isinstance(e, requests.ConnectionError):
+                logger.error(f"Cannot reach Ollama: {str(e)}")
+                get_health_monitor().report_failure(self.health_key)
+            else:
+                logger.error(f"Error streaming from Ollama API: {str(e)}")
+    
+    def _options(self) -> Dict[str, Any]:
+        """Model options; without num_ctx Ollama silently cuts prompts at its default window"""
+        return {
+            "num_ctx": self.context_window,
+            "num_predict": self.max_output_tokens
+        }
+    
+    def check_health(self) -> bool:
         """Check if Ollama is available"""
         try:
-            response = requests.get(f"{self.base_url}/api/tags", timeout=5)
+            response = self.session.get(f"{self.base_url}/api/tags", timeout=Config.LLM_HEALTH_PROBE_TIMEOUT)
             return response.status_code == 200
         except:
             return False
@@ -139,7 +758,7 @@ class OllamaHandler(BaseLLMHandler):
     def get_available_models(self) -> List[str]:
         """Get list of available models from Ollama"""
         try:
-            response = requests.get(f"{self.base_url}/api/tags", timeout=5)
+            response = self.session.get(f"{self.base_url}/api/tags", timeout=self.timeout)
             if response.status_code == 200:
                 models = response.json().get("models", [])
                 return [model["name"] for model in models]
@@ -160,6 +779,17 @@ Please provide a comprehensive answer based on the context above. If the context
         else:
             return question
 
+# Hedged attempts run on their own threads so the caller can race them; sized so
+# that every admitted or queued request can hold a worker
+_hedge_executor = ThreadPoolExecutor(
+    max_workers=Config.OLLAMA_MAX_CONCURRENT + Config.OLLAMA_MAX_QUEUE
+    + Config.OPENROUTER_MAX_CONCURRENT + Config.OPENROUTER_MAX_QUEUE,
+    thread_name_prefix="llm-hedge"
+)
+
+# Queued by an attempt when its stream ends, successfully or not
+_STREAM_END = object()
+
 class LLMManager:
     """Manage multiple LLM handlers"""
     
@@ -169,6 +799,7 @@ class LLMManager:
             "ollama": OllamaHandler()
         }
         self.default_handler = None
+        self.response_cache = get_response_cache() if Config.RESPONSE_CACHE_ENABLED else None
         self._initialize_default()
     
     def _initialize_default(self):
@@ -182,8 +813,443 @@ class LLMManager:
         if not self.default_handler:
             logger.warning("No LLM handlers available")
     
-    def generate_response(self, prompt: str, context: str = "", handler_name: str = None, **kwargs) -> Optional[str]:
-        """Generate response using specified or default handler"""
+    @traced("llm.generate")
+    def generate_response(self, prompt: str, context: str = "", handler_name: str = None,
+                          use_cache: bool = True, **kwargs) -> Optional[str]:
+        """Generate response using specified or default handler
+        
+        Identical prompts over identical context are served from the response
+        cache; with use_cache False the cache is not read but the fresh
+        response still replaces the cached one. With hedging enabled and no
+        handler_name, the request is hedged with another available handler
+        over the streaming APIs (see _hedged_stream), so the losing request
+        can be aborted; the pieces are joined into one response.
+        """
+        handler = self._resolve_handler(handler_name)
+        
+        if not handler:
+            return None
+        
+        cache_key = self._cache_key(handler, prompt, context)
+        if cache_key and use_cache:
+            cached = self.response_cache.get(cache_key)
+            if cached is not None:
+                annotate(handler=handler.health_key, cached=True)
+                return cached
+        
+        backup = self._pick_backup(handler, handler_name)
+        outcome = {"handler": handler}
+        
+        if backup:
+            response = "".join(self._hedged_stream(handler, backup, prompt, context, outcome, kwargs)).strip() or None
+        else:
+            response = self._timed_generate(handler, prompt, context, kwargs, outcome)
+        
+        if response and self.response_cache:
+            self._store_response(outcome["handler"], prompt, context, response)
+        
+        annotate(handler=outcome["handler"].health_key, hedged=bool(backup), response_chars=len(response or ""))
+        return response
+    
+    async def agenerate_response(self, prompt: str, context: str = "", handler_name: str = None,
+                                 use_cache: bool = True, **kwargs) -> Optional[str]:
+        """Async variant of generate_response; the losing hedged request is cancelled"""
+        handler = self._resolve_handler(handler_name)
+        
+        if not handler:
+            return None
+        
+        with span("llm.generate", handler=handler.health_key):
+            cache_key = self._cache_key(handler, prompt, context)
+            if cache_key and use_cache:
+                cached = await asyncio.to_thread(self.response_cache.get, cache_key)
+                if cached is not None:
+                    annotate(cached=True)
+                    return cached
+            
+            winner, response = await self._ahedged_generate(handler, handler_name, prompt, context, kwargs)
+            
+            if response and self.response_cache:
+                await asyncio.to_thread(self._store_response, winner, prompt, context, response)
+            
+            annotate(handler=winner.health_key, response_chars=len(response or ""))
+            return response
+    
+    def stream_response(self, prompt: str, context: str = "", handler_name: str = None,
+                        use_cache: bool = True, **kwargs) -> Optional[Iterator[str]]:
+        """Stream response pieces from the specified or default handler"""
+        handler = self._resolve_handler(handler_name)
+        
+        if not handler:
+            return None
+        
+        cache_key = self._cache_key(handler, prompt, context)
+        if cache_key and use_cache:
+            cached = self.response_cache.get(cache_key)
+            if cached is not None:
+                return iter([cached])
+        
+        backup = self._pick_backup(handler, handler_name)
+        outcome = {"handler": handler}
+        stream_span = start_span("llm.stream", handler=handler.health_key, hedged=bool(backup))
+        
+        if backup:
+            stream = self._hedged_stream(handler, backup, prompt, context, outcome, kwargs)
+        else:
+            with activate(stream_span):
+                stream = self._traced_stream(handler, prompt, context, kwargs, outcome=outcome)
+        
+        if self.response_cache:
+            stream = self._stream_and_cache(prompt, context, outcome, stream)
+        
+        return trace_stream(stream_span, stream)
+    
+    def _stream_and_cache(self, prompt: str, context: str, outcome: Dict[str, Any],
+                          stream: Iterator[str]) -> Iterator[str]:
+        """Relay a stream and cache the full response once it completes"""
+        pieces = []
+        for piece in stream:
+            pieces.append(piece)
+            yield piece
+        
+        response = "".join(pieces).strip()
+        if response:
+            self._store_response(outcome["handler"], prompt, context, response)
+    
+    def _store_response(self, handler: BaseLLMHandler, prompt: str, context: str, response: str):
+        """Cache a response under the key of the handler that produced it"""
+        cache_key = self._cache_key(handler, prompt, context)
+        self.response_cache.put(cache_key, handler.health_key, handler.model, response)
+    
+    def _hedged_stream(self, primary: BaseLLMHandler, backup: BaseLLMHandler, prompt: str, context: str,
+                       outcome: Dict[str, Any], kwargs: Dict[str, Any]) -> Iterator[str]:
+        """Stream from the primary, racing the backup if the first token is late
+        
+        The backup is started when the primary has produced nothing after its
+        p95 time to first token, or right away if the primary fails. The
+        attempt that yields first wins; the other is cancelled, which gives its
+        limiter slot back at once and aborts its HTTP response (a request still
+        waiting for response headers ends when they arrive, or at the read
+        timeout). outcome["handler"] is set to the winning handler.
+        """
+        pieces = queue.Queue()
+        attempts = []
+        
+        def start(handler: BaseLLMHandler):
+            cancel_event = StreamCancellation()
+            attempts.append((handler, cancel_event))
+            _hedge_executor.submit(run_in_context(
+                self._pump_stream, len(attempts) - 1, handler, prompt, context, kwargs, cancel_event, pieces
+            ))
+        
+        start(primary)
+        hedge_at = time.monotonic() + self._hedge_delay(primary, "ttft_ms")
+        finished = set()
+        winner = None
+        
+        try:
+            # Wait for the first piece from any attempt
+            while winner is None:
+                timeout = max(0.0, hedge_at - time.monotonic()) if len(attempts) == 1 else None
+                try:
+                    index, piece = pieces.get(timeout=timeout)
+                except queue.Empty:
+                    logger.info(f"{primary.health_key} has not answered in time, hedging with {backup.health_key}")
+                    start(backup)
+                    continue
+                
+                if piece is _STREAM_END:
+                    finished.add(index)
+                    if len(attempts) == 1:
+                        logger.warning(f"{primary.health_key} failed, falling back to {backup.health_key}")
+                        start(backup)
+                    elif len(finished) == len(attempts):
+                        return
+                    continue
+                
+                winner = index
+            
+            outcome["handler"] = attempts[winner][0]
+            for index, (handler, cancel_event) in enumerate(attempts):
+                if index != winner and index not in finished:
+                    logger.info(f"Cancelling hedged request to {handler.health_key}")
+                    cancel_event.set()
+            
+            yield piece
+            
+            while True:
+                index, piece = pieces.get()
+                if index != winner:
+                    continue
+                if piece is _STREAM_END:
+                    break
+                yield piece
+        
+        finally:
+            # Also reached when the consumer stops reading early
+            for handler, cancel_event in attempts:
+                cancel_event.set()
+    
+    def _pump_stream(self, index: int, handler: BaseLLMHandler, prompt: str, context: str,
+                     kwargs: Dict[str, Any], cancel_event: StreamCancellation, pieces: queue.Queue):
+        """Worker: move one attempt's pieces onto the shared queue until done or cancelled"""
+        stream = self._traced_stream(handler, prompt, context, kwargs, cancel_event)
+        try:
+            for piece in stream:
+                if cancel_event.is_set():
+                    break
+                pieces.put((index, piece))
+        except Exception as e:
+            logger.error(f"Error in hedged request to {handler.health_key}: {str(e)}")
+        finally:
+            stream.close()
+            pieces.put((index, _STREAM_END))
+    
+    def _traced_stream(self, handler: BaseLLMHandler, prompt: str, context: str, kwargs: Dict[str, Any],
+                       cancel_event: Optional[StreamCancellation] = None,
+                       outcome: Optional[Dict[str, Any]] = None) -> Iterator[str]:
+        """_timed_stream within an "llm.request" span for the attempt"""
+        return trace_stream(
+            start_span("llm.request", handler=handler.health_key, model=handler.model),
+            self._timed_stream(handler, prompt, context, kwargs, cancel_event, outcome)
+        )
+    
+    def _timed_stream(self, handler: BaseLLMHandler, prompt: str, context: str, kwargs: Dict[str, Any],
+                      cancel_event: Optional[StreamCancellation] = None,
+                      outcome: Optional[Dict[str, Any]] = None) -> Iterator[str]:
+        """Relay a handler's stream within its concurrency limit, recording time to first token and total latency
+        
+        With outcome given, a request the handler is too busy to admit is
+        rerouted (see _admit) and outcome["handler"] is set to the handler used.
+        """
+        start_time = time.perf_counter()
+        
+        handler = self._admit(handler, reroute=outcome is not None)
+        if handler is None:
+            return
+        if outcome is not None:
+            outcome["handler"] = handler
+        
+        # Cancelling a hedged attempt gives its slot back without waiting for the stream to unwind
+        release_slot = _call_once(handler.limiter.release)
+        
+        stream = None
+        produced = False
+        finished = False
+        try:
+            with cancel_event.on_cancel(release_slot) if cancel_event is not None else nullcontext():
+                # A hedged attempt may have lost while it was queued
+                if cancel_event is not None and cancel_event.is_set():
+                    return
+                
+                stream = handler.stream_response(prompt, context, cancellation=cancel_event, **kwargs)
+                
+                pieces = 0
+                for piece in stream:
+                    if not produced:
+                        produced = True
+                        ttft_ms = (time.perf_counter() - start_time) * 1000
+                        get_histogram(f"llm.{handler.health_key}.ttft_ms").record(ttft_ms)
+                        annotate(ttft_ms=round(ttft_ms, 1))
+                    pieces += 1
+                    yield piece
+                
+                finished = True
+                annotate(pieces=pieces)
+                if produced:
+                    get_histogram(f"llm.{handler.health_key}.latency_ms").record((time.perf_counter() - start_time) * 1000)
+        
+        finally:
+            # Closing the handler's generator closes its HTTP response
+            if hasattr(stream, "close"):
+                stream.close()
+            release_slot()
+            
+            # A stream cancelled before its first token says nothing about the backend
+            if produced:
+                handler.breaker.record_success()
+            elif finished:
+                handler.breaker.record_failure()
+    
+    def _timed_generate(self, handler: BaseLLMHandler, prompt: str, context: str,
+                        kwargs: Dict[str, Any], outcome: Dict[str, Any]) -> Optional[str]:
+        """Call a handler within its concurrency limit, recording its latency on success
+        
+        A request the handler is too busy to admit is rerouted (see _admit);
+        outcome["handler"] is set to the handler used.
+        """
+        with span("llm.request", handler=handler.health_key, model=handler.model):
+            start_time = time.perf_counter()
+            
+            handler = self._admit(handler, reroute=True)
+            if handler is None:
+                return None
+            outcome["handler"] = handler
+            
+            try:
+                response = handler.generate_response(prompt, context, **kwargs)
+            finally:
+                handler.limiter.release()
+            
+            self._record_outcome(handler, response, start_time)
+            annotate(response_chars=len(response or ""))
+            return response
+    
+    async def _ahedged_generate(self, primary: BaseLLMHandler, handler_name: Optional[str], prompt: str,
+                                context: str, kwargs: Dict[str, Any]) -> Tuple[BaseLLMHandler, Optional[str]]:
+        """Async hedging: race a backup after the primary's p95 latency, cancel the loser"""
+        async def attempt(handler: BaseLLMHandler, outcome: Optional[Dict[str, Any]] = None) -> Optional[str]:
+            with span("llm.request", handler=handler.health_key, model=handler.model):
+                start_time = time.perf_counter()
+                
+                # Only an unhedged request is rerouted; a hedged one already has its backup
+                handler = await self._aadmit(handler, reroute=outcome is not None)
+                if handler is None:
+                    return None
+                if outcome is not None:
+                    outcome["handler"] = handler
+                
+                try:
+                    response = await handler.agenerate_response(prompt, context, **kwargs)
+                finally:
+                    handler.limiter.release()
+                
+                self._record_outcome(handler, response, start_time)
+                annotate(response_chars=len(response or ""))
+                return response
+        
+        backup = self._pick_backup(primary, handler_name)
+        if not backup:
+            outcome = {"handler": primary}
+            response = await attempt(primary, outcome)
+            return outcome["handler"], response
+        
+        tasks = {asyncio.create_task(attempt(primary)): primary}
+        done, _ = await asyncio.wait(tasks, timeout=self._hedge_delay(primary, "latency_ms"))
+        
+        if done:
+            response = done.pop().result()
+            if response:
+                return primary, response
+            logger.warning(f"{primary.health_key} failed, falling back to {backup.health_key}")
+        else:
+            logger.info(f"{primary.health_key} has not answered in time, hedging with {backup.health_key}")
+        
+        tasks[asyncio.create_task(attempt(backup))] = backup
+        pending = {task for task in tasks if not task.done()}
+        
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    response = task.result()
+                    if response:
+                        return tasks[task], response
+            return primary, None
+        
+        finally:
+            for task in pending:
+                logger.info(f"Cancelling hedged request to {tasks[task].health_key}")
+                task.cancel()
+    
+    @staticmethod
+    def _record_outcome(handler: BaseLLMHandler, response: Optional[str], start_time: float):
+        """Feed a finished request into the handler's latency histogram and circuit breaker"""
+        if response:
+            get_histogram(f"llm.{handler.health_key}.latency_ms").record((time.perf_counter() - start_time) * 1000)
+            handler.breaker.record_success()
+        else:
+            handler.breaker.record_failure()
+    
+    def _admit(self, handler: BaseLLMHandler, reroute: bool) -> Optional[BaseLLMHandler]:
+        """Take a limiter slot on handler, or with reroute on another handler when it is saturated
+        
+        A full queue or a queue timeout means the backend is busy, not broken,
+        so it is not reported to the circuit breaker; like an open breaker in
+        _resolve_handler, it sends this one request elsewhere. Returns the
+        handler holding the slot, or None if no slot could be had.
+        """
+        if handler.limiter.acquire(Config.LLM_QUEUE_TIMEOUT):
+            return handler
+        
+        annotate(rejected=handler.health_key)
+        fallback = self._pick_fallback(handler) if reroute else None
+        
+        if fallback and fallback.limiter.acquire(Config.LLM_QUEUE_TIMEOUT):
+            logger.warning(f"{handler.health_key} is saturated, routing the request to {fallback.health_key}")
+            annotate(handler=fallback.health_key, model=fallback.model)
+            return fallback
+        return None
+    
+    async def _aadmit(self, handler: BaseLLMHandler, reroute: bool) -> Optional[BaseLLMHandler]:
+        """Async variant of _admit"""
+        if await self._aacquire(handler.limiter):
+            return handler
+        
+        annotate(rejected=handler.health_key)
+        fallback = self._pick_fallback(handler) if reroute else None
+        
+        if fallback and await self._aacquire(fallback.limiter):
+            logger.warning(f"{handler.health_key} is saturated, routing the request to {fallback.health_key}")
+            annotate(handler=fallback.health_key, model=fallback.model)
+            return fallback
+        return None
+    
+    @staticmethod
+    async def _aacquire(limiter: ConcurrencyLimiter) -> bool:
+        """Wait for a limiter slot in a worker thread without blocking the event loop"""
+        acquiring = asyncio.ensure_future(asyncio.to_thread(limiter.acquire, Config.LLM_QUEUE_TIMEOUT))
+        try:
+            return await asyncio.shield(acquiring)
+        except asyncio.CancelledError:
+            # The thread keeps waiting; give the slot back if it still gets one
+            acquiring.add_done_callback(lambda future: future.result() and limiter.release())
+            raise
+    
+    def _pick_backup(self, primary: BaseLLMHandler, handler_name: Optional[str] = None) -> Optional[BaseLLMHandler]:
+        """Return another available handler to hedge with, if hedging is enabled
+        
+        A handler the caller picked explicitly is never raced against another.
+        """
+        if not Config.LLM_HEDGE_ENABLED or handler_name:
+            return None
+        
+        return self._pick_fallback(primary)
+    
+    def _pick_fallback(self, primary: BaseLLMHandler) -> Optional[BaseLLMHandler]:
+        """Return another handler that is available and whose circuit is closed"""
+        for handler in self.handlers.values():
+            if handler is not primary and handler.is_available() and handler.breaker.allow_request():
+                return handler
+        return None
+    
+    def _hedge_delay(self, handler: BaseLLMHandler, metric: str) -> float:
+        """Seconds to wait for a handler before hedging, from its recent latency percentile"""
+        histogram = get_histogram(f"llm.{handler.health_key}.{metric}")
+        
+        if histogram.count() < Config.LLM_HEDGE_MIN_SAMPLES:
+            return Config.LLM_HEDGE_DEFAULT_DELAY
+        
+        return max(Config.LLM_HEDGE_MIN_DELAY, histogram.percentile(Config.LLM_HEDGE_PERCENTILE) / 1000)
+    
+    def _cache_key(self, handler: BaseLLMHandler, prompt: str, context: str) -> Optional[str]:
+        """Build the response cache key for a request, or None when caching is off"""
+        if not self.response_cache:
+            return None
+        
+        return self.response_cache.make_key(
+            handler.health_key,
+            handler.model,
+            handler._build_prompt(context, prompt),
+            context
+        )
+    
+    def _resolve_handler(self, handler_name: str = None) -> Optional[BaseLLMHandler]:
+        """Return the specified or default handler if it is available"""
+        if not handler_name and not self.default_handler:
+            # Availability may have changed since start-up; the check only reads cached status
+            self._initialize_default()
+        
         handler_name = handler_name or self.default_handler
         
         if not handler_name:
@@ -200,7 +1266,46 @@ class LLMManager:
             logger.error(f"Handler {handler_name} not available")
             return None
         
-        return handler.generate_response(prompt, context, **kwargs)
+        if not handler.breaker.allow_request():
+            # Route around a backend that keeps failing until its breaker half-opens
+            for name, other in self.handlers.items():
+                if other is not handler and other.is_available() and other.breaker.allow_request():
+                    logger.warning(f"Circuit for {handler_name} is open, routing to {name}")
+                    return other
+            
+            logger.error(f"Circuit for {handler_name} is open and no other handler is available")
+            return None
+        
+        return handler
+    
+    def get_context_budget(self, handler_name: str = None, question: str = "") -> Optional[int]:
+        """Get the context token budget of the specified or default handler for a question"""
+        handler = self.handlers.get(handler_name or self.default_handler)
+        return handler.context_budget(question) if handler else None
+    
+    def get_token_usage(self, question: str, context: str, answer: Optional[str],
+                        handler_name: str = None) -> Optional[Dict[str, Any]]:
+        """Count prompt and completion tokens of a request locally"""
+        handler = self.handlers.get(handler_name or self.default_handler)
+        if not handler:
+            return None
+        
+        prompt_tokens = handler.count_prompt_tokens(question, context)
+        completion_tokens = count_tokens(answer or "")
+        return {
+            "prompt_tokens": prompt_tokens,
+            "context_tokens": count_tokens(context),
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+            "context_window": handler.context_window
+        }
+    
+    def get_load_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Get in-flight, queue depth, queue wait and circuit breaker metrics per handler"""
+        return {
+            name: dict(handler.limiter.get_stats(), circuit=handler.breaker.get_stats())
+            for name, handler in self.handlers.items()
+        }
     
     def get_available_handlers(self) -> List[str]:
         """Get list of available handlers"""
@@ -0,0 +1,138 @@
+# src/models/response_cache.py
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Any, Optional
+from src.config import Config
+
+logger = logging.getLogger(__name__)
+
+class ResponseCache:
+    """Exact-match LLM response cache stored in SQLite"""
+    
+    def __init__(self, db_path: Path = None, ttl_seconds: float = None, max_entries: int = None):
+        self.db_path = Path(db_path or Config.RESPONSE_CACHE_PATH)
+        self.ttl_seconds = Config.RESPONSE_CACHE_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+        self.max_entries = max_entries or Config.RESPONSE_CACHE_MAX_ENTRIES
+        
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                handler TEXT NOT NULL,
+                model TEXT NOT NULL,
+                response TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_used REAL NOT NULL
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+        self._conn.commit()
+    
+    @staticmethod
+    def make_key(handler: str, model: str, prompt: str, context: str) -> str:
+        """Build the cache key from the handler, model and hashes of the built prompt and context"""
+        prompt_hash = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        context_hash = hashlib.sha256(context.encode("utf-8")).hexdigest()
+        return hashlib.sha256(f"{handler}\0{model}\0{prompt_hash}\0{context_hash}".encode("utf-8")).hexdigest()
+    
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached response for a key, or None if missing or expired"""
+        now = time.time()
+        
+        with self._lock:
+            try:
+                row = self._conn.execute(
+                    "SELECT response, created_at FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+                
+                if row is not None and self._is_expired(row[1], now):
+                    self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self._conn.commit()
+                    row = None
+                
+                if row is None:
+                    self.misses += 1
+                    return None
+                
+                self._conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+                self._conn.commit()
+                self.hits += 1
+            
+            except sqlite3.Error as e:
+                logger.error(f"Error reading response cache: {str(e)}")
+                self.misses += 1
+                return None
+        
+        logger.info("LLM response cache hit")
+        return row[0]
+    
+    def put(self, key: str, handler: str, model: str, response: str) -> None:
+        """Store a response, then evict expired and least recently used entries"""
+        now = time.time()
+        
+        with self._lock:
+            try:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, handler, model, response, created_at, last_used) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, handler, model, response, now, now)
+                )
+                
+                if self.ttl_seconds > 0:
+                    self._conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl_seconds,))
+                
+                self._conn.execute(
+                    "DELETE FROM responses WHERE key IN ("
+                    "SELECT key FROM responses ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,)
+                )
+                self._conn.commit()
+            
+            except sqlite3.Error as e:
+                logger.error(f"Error writing response cache: {str(e)}")
+    
+    def clear(self) -> None:
+        """Remove every entry"""
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache size and hit statistics"""
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            total = self.hits + self.misses
+            return {
+                "entries": entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0
+            }
+    
+    def _is_expired(self, created_at: float, now: float) -> bool:
+        """Check whether an entry is older than the TTL"""
+        return self.ttl_seconds > 0 and created_at < now - self.ttl_seconds
+
+# One connection and one set of counters per process
+_response_cache = None
+_response_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> ResponseCache:
+    """Return the process-wide response cache"""
+    global _response_cache
+    
+    with _response_cache_lock:
+        if _response_cache is None:
+            _response_cache = ResponseCache()
+        return _response_cache
@@ -0,0 +1,125 @@
+# src/processing/ingestion.py
+import io
+import logging
+import time
+from typing import Dict, Any
+
+from src.config import Config
+from src.utils.metrics import get_histogram, get_throughput, get_slow_request_log
+from src.utils.tracing import traced, annotate, current_request_id
+
+logger = logging.getLogger(__name__)
+
+class UploadedBytes(io.BytesIO):
+    """In-memory PDF with the name and size attributes of a Streamlit upload"""
+    
+    def __init__(self, data: bytes, name: str):
+        super().__init__(data)
+        self.name = name
+        self.size = len(data)
+
+class IngestionPipeline:
+    """Extract, chunk, index and record one uploaded PDF
+    
+    Shared by the Streamlit upload form and the HTTP API so both ingest
+    documents the same way.
+    """
+    
+    def __init__(self, pdf_processor, text_chunker, vector_store, document_store):
+        self.pdf_processor = pdf_processor
+        self.text_chunker = text_chunker
+        self.vector_store = vector_store
+        self.document_store = document_store
+    
+    @traced("ingest")
+    def ingest(self, uploaded_file) -> Dict[str, Any]:
+        """Ingest a file-like upload with name and size attributes
+        
+        Returns a result with "status" set to "ingested", "duplicate" or
+        "error", and a human-readable "message".
+        """
+        name = uploaded_file.name
+        annotate(document=name, bytes=uploaded_file.size)
+        timings = {}
+        start = time.perf_counter()
+        
+        try:
+            if self.document_store.has_document(name):
+                return self._result(name, "duplicate", f"{name} already exists. Skipping.")
+            
+            # Extract text from PDF
+            stage_start = time.perf_counter()
+            text = self.pdf_processor.extract_text_from_uploaded_file(uploaded_file)
+            timings["extract_ms"] = (time.perf_counter() - stage_start) * 1000
+            if not text:
+                return self._result(name, "error", f"Failed to extract text from {name}")
+            
+            # Save file to uploads directory
+            saved_path = self.pdf_processor.save_uploaded_file(uploaded_file)
+            if not saved_path:
+                return self._result(name, "error", f"Failed to save {name}")
+            
+            # Chunk the text
+            stage_start = time.perf_counter()
+            chunks = self.text_chunker.chunk_document(
+                text=text,
+                document_name=name,
+                file_path=str(saved_path)
+            )
+            timings["chunk_ms"] = (time.perf_counter() - stage_start) * 1000
+            if not chunks:
+                return self._result(name, "error", f"Failed to chunk {name}")
+            
+            # Add to vector store
+            if not self.vector_store.add_documents(chunks):
+                return self._result(name, "error", f"Failed to add {name} to vector store")
+            
+            # Save document metadata
+            file_info = self.pdf_processor.get_file_info(saved_path)
+            doc_metadata = {
+                "name": name,
+                "file_path": str(saved_path),
+                "size_mb": round(uploaded_file.size / (1024 * 1024), 2),
+                "num_pages": file_info.get("num_pages", 0),
+                "num_chunks": len(chunks),
+                "chunk_size": self.text_chunker.chunk_size,
+                "chunk_overlap": self.text_chunker.chunk_overlap
+            }
+            
+            if not self.document_store.save_document_metadata(doc_metadata):
+                return self._result(name, "error", f"Failed to save metadata for {name}")
+            
+            timings["total_ms"] = (time.perf_counter() - start) * 1000
+            self._record_metrics(name, timings, doc_metadata["num_pages"], len(chunks))
+            annotate(pages=doc_metadata["num_pages"], chunks=len(chunks))
+            
+            result = self._result(name, "ingested", f"Processed {name} ({len(chunks)} chunks)")
+            result["num_chunks"] = len(chunks)
+            result["timings"] = timings
+            return result
+        
+        except Exception as e:
+            logger.error(f"Error processing {name}: {str(e)}")
+            return self._result(name, "error", f"Error processing {name}: {str(e)}")
+    
+    @staticmethod
+    def _record_metrics(name: str, timings: Dict[str, float], num_pages: int, num_chunks: int):
+        """Record stage latencies and throughput for the Status tab
+        
+        Embedding and index insert are timed by the vector store itself.
+        """
+        for stage in ["extract_ms", "chunk_ms", "total_ms"]:
+            get_histogram(f"ingest.{stage}").record(timings[stage])
+        
+        seconds = timings["total_ms"] / 1000
+        get_throughput("ingest.pages").record(num_pages, seconds)
+        get_throughput("ingest.chunks").record(num_chunks, seconds)
+        
+        if timings["total_ms"] >= Config.SLOW_INGEST_MS:
+            get_slow_request_log().record("ingest", name, timings["total_ms"], timings, current_request_id())
+    
+    @staticmethod
+    def _result(name: str, status: str, message: str) -> Dict[str, Any]:
+        """Build an ingestion result"""
+        annotate(status=status)
+        return {"name": name, "status": status, "message": message, "request_id": current_request_id()}
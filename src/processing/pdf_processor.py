@@ -5,6 +5,7 @@ from pathlib import Path
 from typing import List, Optional, Union
 import PyPDF2
 from src.config import Config
+from src.utils.tracing import traced, annotate
 
 logger = logging.getLogger(__name__)
 
@@ -14,6 +15,7 @@ class PDFProcessor:
     def __init__(self):
         self.max_file_size = Config.MAX_FILE_SIZE_MB * 1024 * 1024  # Convert to bytes
     
+    @traced("pdf.extract")
     def extract_text_from_file(self, file_path: Union[str, Path]) -> Optional[str]:
         """Extract text from a PDF file on disk"""
         try:
@@ -34,6 +36,7 @@ class PDFProcessor:
             logger.error(f"Error processing PDF file {file_path}: {str(e)}")
             return None
     
+    @traced("pdf.extract")
     def extract_text_from_uploaded_file(self, uploaded_file) -> Optional[str]:
         """Extract text from a Streamlit uploaded file object"""
         try:
@@ -81,6 +84,7 @@ class PDFProcessor:
             # Basic text cleaning
             full_text = self._clean_text(full_text)
             
+            annotate(pages=len(pdf_reader.pages), chars=len(full_text))
             logger.info(f"Successfully extracted {len(full_text)} characters from PDF")
             return full_text
             
@@ -111,6 +115,7 @@ class PDFProcessor:
         
         return cleaned_text
     
+    @traced("pdf.save")
     def save_uploaded_file(self, uploaded_file, filename: Optional[str] = None) -> Optional[Path]:
         """Save uploaded file to uploads directory"""
         try:
@@ -2,6 +2,7 @@
 import logging
 from typing import List, Dict, Any
 from src.config import Config
+from src.utils.tracing import traced, annotate
 
 logger = logging.getLogger(__name__)
 
@@ -12,6 +13,7 @@ class TextChunker:
         self.chunk_size = chunk_size or Config.CHUNK_SIZE
         self.chunk_overlap = chunk_overlap or Config.CHUNK_OVERLAP
     
+    @traced("chunker.chunk")
     def chunk_text(self, text: str, metadata: Dict[str, Any] = None) -> List[Dict[str, Any]]:
         """Split text into chunks with metadata"""
         if not text or not text.strip():
@@ -42,6 +44,7 @@ class TextChunker:
                     "metadata": chunk_metadata
                 })
         
+        annotate(chunks=len(chunks), chars=len(text))
         logger.info(f"Created {len(chunks)} chunks from text of length {len(text)}")
         return chunks
     
@@ -0,0 +1,131 @@
+# src/rag/context_builder.py
+import logging
+from typing import List, Dict, Any, Optional
+from src.utils.tokens import count_tokens, truncate_to_tokens
+
+logger = logging.getLogger(__name__)
+
+SPAN_SEPARATOR = "\n\n"
+
+class ContextBuilder:
+    """Assemble retrieved chunks into a deduplicated, token-budgeted context"""
+    
+    def build(self, chunks: List[Dict[str, Any]], token_budget: Optional[int] = None) -> Dict[str, Any]:
+        """Merge adjacent chunks into spans, keep the best-ranked ones within budget, order by position"""
+        spans = self._merge_spans(chunks)
+        
+        # Spend the budget on the best-ranked spans first
+        spans.sort(key=lambda span: span["rank"])
+        selected = []
+        used_tokens = 0
+        separator_tokens = count_tokens(SPAN_SEPARATOR)
+        
+        for span in spans:
+            span_tokens = count_tokens(span["text"])
+            cost = span_tokens + (separator_tokens if selected else 0)
+            
+            if token_budget is not None and used_tokens + cost > token_budget:
+                if not selected:
+                    # Never return an empty context just because the top span is long
+                    span["text"] = truncate_to_tokens(span["text"], token_budget)
+                    span["truncated"] = True
+                    span_tokens = count_tokens(span["text"])
+                    selected.append(span)
+                    used_tokens = span_tokens
+                break
+            
+            span["tokens"] = span_tokens
+            selected.append(span)
+            used_tokens += cost
+        
+        # Documents in order of their best hit, spans within a document in reading order
+        document_rank = {}
+        for span in selected:
+            document_rank.setdefault(span["source"], span["rank"])
+        selected.sort(key=lambda span: (document_rank[span["source"]], span["start_char"]))
+        
+        context = SPAN_SEPARATOR.join(span["text"] for span in selected)
+        included_ids = {chunk_id for span in selected for chunk_id in span["chunk_ids"]}
+        
+        logger.info(
+            f"Assembled context: {len(chunks)} chunks -> {len(spans)} spans, "
+            f"{len(selected)} kept, ~{used_tokens} tokens"
+            + (f" (budget {token_budget})" if token_budget is not None else "")
+        )
+        
+        return {
+            "context": context,
+            "spans": selected,
+            "tokens": used_tokens,
+            "included_chunk_ids": included_ids,
+            "dropped_spans": len(spans) - len(selected)
+        }
+    
+    def _merge_spans(self, chunks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Merge chunks of the same document whose character ranges touch or overlap"""
+        by_document: Dict[str, List[Dict[str, Any]]] = {}
+        for rank, chunk in enumerate(chunks):
+            chunk = dict(chunk, rank=rank)
+            by_document.setdefault(chunk.get("source", "Unknown"), []).append(chunk)
+        
+        spans = []
+        for source, document_chunks in by_document.items():
+            # Without offsets a chunk can only stand alone
+            positioned = [chunk for chunk in document_chunks if chunk.get("start_char") is not None]
+            unpositioned = [chunk for chunk in document_chunks if chunk.get("start_char") is None]
+            positioned.sort(key=lambda chunk: chunk["start_char"])
+            
+            current = None
+            for chunk in positioned:
+                if current is not None and chunk["start_char"] <= current["end_char"]:
+                    if chunk["end_char"] > current["end_char"]:
+                        current["text"] = self._append_without_overlap(
+                            current["text"],
+                            chunk["text"],
+                            current["end_char"] - chunk["start_char"]
+                        )
+                        current["end_char"] = chunk["end_char"]
+                    current["rank"] = min(current["rank"], chunk["rank"])
+                    current["chunk_ids"].append(chunk.get("id"))
+                    continue
+                
+                if current is not None:
+                    spans.append(current)
+                current = self._new_span(source, chunk)
+            
+            if current is not None:
+                spans.append(current)
+            
+            for chunk in unpositioned:
+                span = self._new_span(source, chunk)
+                span["start_char"] = float("inf")
+                spans.append(span)
+        
+        return spans
+    
+    @staticmethod
+    def _new_span(source: str, chunk: Dict[str, Any]) -> Dict[str, Any]:
+        """Start a span from a single chunk"""
+        return {
+            "source": source,
+            "text": chunk["text"],
+            "start_char": chunk.get("start_char"),
+            "end_char": chunk.get("end_char"),
+            "rank": chunk["rank"],
+            "chunk_ids": [chunk.get("id")]
+        }
+    
+    @staticmethod
+    def _append_without_overlap(left: str, right: str, overlap_chars: int) -> str:
+        """Join two neighbouring chunk texts, dropping the characters they share"""
+        if overlap_chars <= 0:
+            return f"{left} {right}"
+        
+        # Chunk texts are whitespace-stripped, so the shared part may be a little
+        # shorter than the nominal overlap; find the longest exact match
+        shortest = max(1, overlap_chars // 2)
+        for length in range(min(overlap_chars, len(left), len(right)), shortest - 1, -1):
+            if left.endswith(right[:length]):
+                return left + right[length:]
+        
+        return left + right[overlap_chars:]
@@ -1,86 +1,332 @@
 # src/rag/generator.py
+import asyncio
 import logging
-from typing import Dict, Any, Optional, List
+import time
+from typing import Dict, Any, Optional, List, Iterator
+from src.config import Config
 from src.models.llm_handler import LLMManager
 from src.rag.retriever import Retriever
-from src.storage.document_store import DocumentStore
+from src.rag.semantic_cache import get_semantic_cache
+from src.storage.document_store import create_document_store
+from src.utils.metrics import get_histogram, get_slow_request_log
+from src.utils.tracing import span, start_span, activate, traced, annotate, trace_stream, run_in_context, current_request_id
 
 logger = logging.getLogger(__name__)
 
 class RAGGenerator:
     """Handle RAG generation pipeline"""
     
-    def __init__(self):
-        self.llm_manager = LLMManager()
-        self.retriever = Retriever()
-        self.document_store = DocumentStore()
+    def __init__(self, llm_manager: LLMManager = None, retriever: Retriever = None, document_store=None,
+                 save_history: bool = True):
+        self.llm_manager = llm_manager or LLMManager()
+        self.retriever = retriever or Retriever()
+        self.document_store = document_store or create_document_store()
+        # Batch runs turn this off so they do not flood the chat history
+        self.save_history = save_history
+        self.semantic_cache = get_semantic_cache() if Config.SEMANTIC_CACHE_ENABLED else None
     
-    def generate_response(self, query: str, llm_name: str = None, k: int = 5) -> Dict[str, Any]:
+    @traced("rag.query")
+    def generate_response(self, query: str, llm_name: str = None, k: int = 5, use_cache: bool = True,
+                          **retrieval_options) -> Dict[str, Any]:
         """Generate response using RAG pipeline"""
+        annotate(query=query[:80], k=k, stream=False)
+        
         try:
-            # Check if LLM is available
-            if not self.llm_manager.is_any_available():
-                return {
-                    "answer": "No language model is currently available. Please configure OpenAi API key or ensure Ollama is running.",
-                    "sources": [],
-                    "chunks": [],
-                    "error": "No LLM available"
-                }
-            
-            # Retrieve relevant documents
-            retrieval_result = self.retriever.retrieve_with_sources(query, k)
+            state = self._prepare(query, llm_name, k, retrieval_options, use_cache)
             
-            if not retrieval_result["chunks"]:
-                # No relevant documents found
-                fallback_response = self.llm_manager.generate_response(
-                    prompt=query,
-                    context="",
-                    handler_name=llm_name
-                )
-                
-                return {
-                    "answer": fallback_response or "I don't have any relevant documents to answer your question.",
-                    "sources": [],
-                    "chunks": [],
-                    "note": "No relevant documents found in the knowledge base."
-                }
+            if "response" in state:
+                return state["response"]
             
             # Generate response with context
-            context = retrieval_result["context"]
+            stage_start = time.perf_counter()
             answer = self.llm_manager.generate_response(
                 prompt=query,
-                context=context,
-                handler_name=llm_name
+                context=state["retrieval_result"]["context"],
+                handler_name=llm_name,
+                use_cache=use_cache
             )
+            state["timings"]["generation_ms"] = (time.perf_counter() - stage_start) * 1000
             
-            if not answer:
-                return {
-                    "answer": "Sorry, I couldn't generate a response. There might be an issue with the language model.",
-                    "sources": retrieval_result["sources"],
-                    "chunks": retrieval_result["chunks"],
-                    "error": "LLM generation failed"
-                }
+            return self._finalize(query, answer, state)
+        
+        except Exception as e:
+            logger.error(f"Error in RAG generation: {str(e)}")
+            return self._error_response(e)
+    
+    async def agenerate_response(self, query: str, llm_name: str = None, k: int = 5, use_cache: bool = True,
+                                 **retrieval_options) -> Dict[str, Any]:
+        """Async variant of generate_response
+        
+        Embedding, vector search and history writes run in the loop's executor;
+        the LLM call is awaited on the async HTTP client, so a single worker can
+        keep many requests in flight.
+        """
+        loop = asyncio.get_running_loop()
+        
+        with span("rag.query", query=query[:80], k=k, stream=False):
+            try:
+                state = await loop.run_in_executor(
+                    None,
+                    run_in_context(self._prepare, query, llm_name, k, retrieval_options, use_cache)
+                )
+                
+                if "response" in state:
+                    return state["response"]
+                
+                stage_start = time.perf_counter()
+                answer = await self.llm_manager.agenerate_response(
+                    prompt=query,
+                    context=state["retrieval_result"]["context"],
+                    handler_name=llm_name,
+                    use_cache=use_cache
+                )
+                state["timings"]["generation_ms"] = (time.perf_counter() - stage_start) * 1000
+                
+                return await loop.run_in_executor(
+                    None,
+                    run_in_context(self._finalize, query, answer, state)
+                )
             
-            # Save to chat history
-            self._save_chat_interaction(query, answer, retrieval_result)
+            except Exception as e:
+                logger.error(f"Error in RAG generation: {str(e)}")
+                return self._error_response(e)
+    
+    def generate_response_stream(self, query: str, llm_name: str = None, k: int = 5, use_cache: bool = True,
+                                 **retrieval_options) -> Dict[str, Any]:
+        """Run retrieval, then return the response with an "answer_stream" iterator of answer pieces
+        
+        Once the stream is exhausted the dict is completed in place: "answer" holds
+        the full text and "timings" the time to first token and total generation time.
+        Cached and error responses come back with "answer" set and no stream.
+        The request's "rag.query" span ends with the stream.
+        """
+        query_span = start_span("rag.query", query=query[:80], k=k, stream=True)
+        
+        with activate(query_span):
+            try:
+                state = self._prepare(query, llm_name, k, retrieval_options, use_cache)
+                
+                if "response" in state:
+                    query_span.end()
+                    return state["response"]
+                
+                response = {
+                    "answer": "",
+                    "sources": state["retrieval_result"]["sources"],
+                    "chunks": state["retrieval_result"]["chunks"],
+                    "timings": state["timings"],
+                    "request_id": query_span.request_id
+                }
+                response["answer_stream"] = trace_stream(
+                    query_span,
+                    self._stream_answer(query, llm_name, state, response, use_cache)
+                )
+                return response
             
-            return {
-                "answer": answer,
-                "sources": retrieval_result["sources"],
-                "chunks": retrieval_result["chunks"]
-            }
+            except Exception as e:
+                logger.error(f"Error in RAG generation: {str(e)}")
+                response = self._error_response(e)
+                query_span.end()
+                return response
+    
+    def _stream_answer(self, query: str, llm_name: Optional[str], state: Dict[str, Any],
+                       response: Dict[str, Any], use_cache: bool = True) -> Iterator[str]:
+        """Relay LLM pieces, recording time to first token, then finalize the response"""
+        pieces = []
+        timings = state["timings"]
+        stage_start = time.perf_counter()
+        
+        try:
+            stream = self.llm_manager.stream_response(
+                prompt=query,
+                context=state["retrieval_result"]["context"],
+                handler_name=llm_name,
+                use_cache=use_cache
+            )
             
+            for piece in stream or []:
+                if not pieces:
+                    timings["ttft_ms"] = (time.perf_counter() - stage_start) * 1000
+                    logger.info(f"Time to first token: {timings['ttft_ms']:.0f} ms")
+                pieces.append(piece)
+                yield piece
+        
         except Exception as e:
-            logger.error(f"Error in RAG generation: {str(e)}")
+            logger.error(f"Error streaming RAG response: {str(e)}")
+        
+        finally:
+            timings["generation_ms"] = (time.perf_counter() - stage_start) * 1000
+            final = self._finalize(query, "".join(pieces).strip() or None, state)
+            response.pop("answer_stream", None)
+            response.update(final)
+    
+    def _prepare(self, query: str, llm_name: Optional[str], k: int, retrieval_options: Dict[str, Any],
+                 use_cache: bool = True) -> Dict[str, Any]:
+        """Run the steps before generation
+        
+        Returns {"response": ...} when the request can be answered without the
+        LLM, otherwise the state generation and _finalize need. With use_cache
+        False cached answers are skipped, though fresh ones are still stored.
+        """
+        started = time.perf_counter()
+        timings = {}
+        
+        # Serve paraphrases of recent questions from the semantic cache
+        query_embedding = None
+        cache_namespace = None
+        collection_generation = None
+        
+        if self.semantic_cache:
+            query_embedding = self.retriever.embedding_handler.embed_query(query)
+            timings["embed_ms"] = (time.perf_counter() - started) * 1000
+            cache_namespace = self._cache_namespace(llm_name, k, retrieval_options)
+            collection_generation = self.retriever.vector_store.get_generation()
+            
+            if query_embedding is not None and use_cache:
+                cached = self.semantic_cache.lookup(query_embedding, cache_namespace, collection_generation)
+                if cached:
+                    response = dict(cached["response"])
+                    response["cached"] = True
+                    response["cache_similarity"] = cached["similarity"]
+                    response["request_id"] = current_request_id()
+                    annotate(cached=True)
+                    self._save_chat_interaction(query, response["answer"], response)
+                    return {"response": response}
+        
+        # Check if LLM is available
+        if not self.llm_manager.is_any_available():
+            return {"response": {
+                "answer": "No language model is currently available. Please configure OpenAi API key or ensure Ollama is running.",
+                "sources": [],
+                "chunks": [],
+                "error": "No LLM available",
+                "request_id": current_request_id()
+            }}
+        
+        # Retrieve relevant documents
+        stage_start = time.perf_counter()
+        retrieval_result = self.retriever.retrieve_with_sources(
+            query,
+            k,
+            token_budget=self.llm_manager.get_context_budget(llm_name, query),
+            query_embedding=query_embedding,
+            **retrieval_options
+        )
+        timings["retrieval_ms"] = (time.perf_counter() - stage_start) * 1000
+        
+        if retrieval_result.get("rerank"):
+            timings["rerank_ms"] = retrieval_result["rerank"]["latency_ms"]
+        
+        return {
+            "retrieval_result": retrieval_result,
+            "timings": timings,
+            "query_embedding": query_embedding,
+            "cache_namespace": cache_namespace,
+            "collection_generation": collection_generation,
+            "llm_name": llm_name,
+            "started": started
+        }
+    
+    @staticmethod
+    def _record_timings(query: str, timings: Dict[str, float]):
+        """Feed the per-stage latencies of an LLM-answered query to the Status tab"""
+        for stage, value in timings.items():
+            get_histogram(f"query.{stage}").record(value)
+        
+        if timings["total_ms"] >= Config.SLOW_QUERY_MS:
+            get_slow_request_log().record("query", query[:80], timings["total_ms"], timings, current_request_id())
+    
+    def _finalize(self, query: str, answer: Optional[str], state: Dict[str, Any]) -> Dict[str, Any]:
+        """Build the response for a generated answer, saving and caching it"""
+        retrieval_result = state["retrieval_result"]
+        timings = state["timings"]
+        timings["total_ms"] = (time.perf_counter() - state["started"]) * 1000
+        self._record_timings(query, timings)
+        
+        if not retrieval_result["chunks"]:
+            # No relevant documents found, the LLM answered without context
             return {
-                "answer": f"An error occurred while processing your question: {str(e)}",
+                "answer": answer or "I don't have any relevant documents to answer your question.",
                 "sources": [],
                 "chunks": [],
-                "error": str(e)
+                "timings": timings,
+                "note": "No relevant documents found in the knowledge base.",
+                "request_id": current_request_id()
+            }
+        
+        if not answer:
+            return {
+                "answer": "Sorry, I couldn't generate a response. There might be an issue with the language model.",
+                "sources": retrieval_result["sources"],
+                "chunks": retrieval_result["chunks"],
+                "timings": timings,
+                "error": "LLM generation failed",
+                "request_id": current_request_id()
             }
+        
+        usage = self.llm_manager.get_token_usage(query, retrieval_result["context"], answer, state.get("llm_name"))
+        if usage:
+            usage["chunks_trimmed"] = sum(1 for chunk in retrieval_result["chunks"] if not chunk.get("in_context", True))
+            logger.info(
+                f"Token usage: {usage['prompt_tokens']} prompt ({usage['context_tokens']} context), "
+                f"{usage['completion_tokens']} completion, {usage['chunks_trimmed']} chunks trimmed"
+            )
+            annotate(
+                prompt_tokens=usage["prompt_tokens"],
+                context_tokens=usage["context_tokens"],
+                completion_tokens=usage["completion_tokens"]
+            )
+        
+        # Save to chat history
+        self._save_chat_interaction(query, answer, retrieval_result, usage)
+        
+        response = {
+            "answer": answer,
+            "sources": retrieval_result["sources"],
+            "chunks": retrieval_result["chunks"],
+            "rerank": retrieval_result.get("rerank"),
+            "adaptive": retrieval_result.get("adaptive"),
+            "context_tokens": retrieval_result.get("context_tokens"),
+            "usage": usage,
+            "timings": timings,
+            "request_id": current_request_id()
+        }
+        
+        if self.semantic_cache and state["query_embedding"] is not None:
+            self.semantic_cache.store(
+                state["query_embedding"],
+                state["cache_namespace"],
+                chunk_ids=[chunk["id"] for chunk in retrieval_result["chunks"]],
+                document_names=retrieval_result["sources"],
+                response=response,
+                generation=state["collection_generation"]
+            )
+        
+        return response
+    
+    def _error_response(self, error: Exception) -> Dict[str, Any]:
+        """Build the response for an unexpected pipeline error"""
+        annotate(error=str(error))
+        return {
+            "answer": f"An error occurred while processing your question: {str(error)}",
+            "sources": [],
+            "chunks": [],
+            "error": str(error),
+            "request_id": current_request_id()
+        }
+    
+    def _cache_namespace(self, llm_name: Optional[str], k: int, retrieval_options: Dict[str, Any]) -> str:
+        """Cached answers are only reused for the same model and retrieval settings"""
+        options = ",".join(f"{key}={retrieval_options[key]}" for key in sorted(retrieval_options))
+        return f"{llm_name or self.llm_manager.default_handler}|k={k}|{options}"
     
-    def _save_chat_interaction(self, query: str, answer: str, retrieval_result: Dict[str, Any]):
+    @traced("history.save")
+    def _save_chat_interaction(self, query: str, answer: str, retrieval_result: Dict[str, Any],
+                               usage: Optional[Dict[str, Any]] = None):
         """Save chat interaction to history"""
+        if not self.save_history:
+            return
+        
         try:
             message = {
                 "type": "interaction",
@@ -90,8 +336,14 @@ class RAGGenerator:
                 "num_chunks": len(retrieval_result["chunks"])
             }
             
-            self.document_store.save_chat_message(message)
+            if usage:
+                message["usage"] = usage
+            
+            # Links the interaction to its trace
+            message["request_id"] = current_request_id()
             
+            self.document_store.save_chat_message(message)
+        
         except Exception as e:
             logger.error(f"Error saving chat interaction: {str(e)}")
     
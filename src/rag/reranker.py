@@ -0,0 +1,123 @@
+# src/rag/reranker.py
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Dict, Any, Tuple
+from src.config import Config
+
+logger = logging.getLogger(__name__)
+
+# Cross-encoder models are loaded once per process and shared
+_models = {}
+_models_lock = threading.Lock()
+
+
+def _get_cross_encoder(model_name: str):
+    """Return the process-wide cross-encoder for a model name"""
+    with _models_lock:
+        if model_name not in _models:
+            from sentence_transformers import CrossEncoder
+            
+            logger.info(f"Loading cross-encoder: {model_name}")
+            _models[model_name] = CrossEncoder(model_name)
+        return _models[model_name]
+
+class Reranker:
+    """Rerank retrieved chunks with a local cross-encoder"""
+    
+    def __init__(self, model_name: str = None, batch_size: int = None,
+                 max_candidates: int = None, cache_size: int = None):
+        self.model_name = model_name or Config.RERANKER_MODEL
+        self.batch_size = batch_size or Config.RERANK_BATCH_SIZE
+        self.max_candidates = max_candidates or Config.RERANK_MAX_CANDIDATES
+        self.cache_size = cache_size or Config.RERANK_CACHE_SIZE
+        
+        # (query hash, chunk id) -> score, kept in LRU order
+        self._score_cache: "OrderedDict[Tuple[str, str], float]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+    
+    def rerank(self, query: str, results: List[Dict[str, Any]], k: int) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """Score up to max_candidates results against the query and keep the best k"""
+        start_time = time.perf_counter()
+        candidates = results[:self.max_candidates]
+        stats = {
+            "candidates": len(candidates),
+            "scored": 0,
+            "cache_hits": 0,
+            "latency_ms": 0.0
+        }
+        
+        if not candidates:
+            return [], stats
+        
+        query_hash = hashlib.sha1(query.encode("utf-8")).hexdigest()
+        scores: Dict[str, float] = {}
+        to_score = []
+        
+        with self._cache_lock:
+            for result in candidates:
+                key = (query_hash, result["id"])
+                if key in self._score_cache:
+                    self._score_cache.move_to_end(key)
+                    scores[result["id"]] = self._score_cache[key]
+                else:
+                    to_score.append(result)
+        
+        stats["cache_hits"] = len(candidates) - len(to_score)
+        
+        if to_score:
+            try:
+                model = _get_cross_encoder(self.model_name)
+                predicted = model.predict(
+                    [(query, result["text"]) for result in to_score],
+                    batch_size=self.batch_size,
+                    show_progress_bar=False
+                )
+            
+            except Exception as e:
+                logger.error(f"Error reranking with cross-encoder: {str(e)}")
+                stats["error"] = str(e)
+                stats["latency_ms"] = (time.perf_counter() - start_time) * 1000
+                return results[:k], stats
+            
+            stats["scored"] = len(to_score)
+            
+            with self._cache_lock:
+                for result, score in zip(to_score, predicted):
+                    scores[result["id"]] = float(score)
+                    self._score_cache[(query_hash, result["id"])] = float(score)
+                
+                while len(self._score_cache) > self.cache_size:
+                    self._score_cache.popitem(last=False)
+        
+        reranked = []
+        for result in candidates:
+            result = dict(result)
+            result["rerank_score"] = scores[result["id"]]
+            reranked.append(result)
+        
+        reranked.sort(key=lambda result: result["rerank_score"], reverse=True)
+        
+        stats["latency_ms"] = (time.perf_counter() - start_time) * 1000
+        logger.info(
+            f"Reranked {stats['candidates']} candidates in {stats['latency_ms']:.1f} ms "
+            f"({stats['cache_hits']} cached, {stats['scored']} scored)"
+        )
+        
+        return reranked[:k], stats
+
+# The score cache is only useful if it outlives a single Streamlit rerun
+_reranker = None
+_reranker_lock = threading.Lock()
+
+
+def get_reranker() -> Reranker:
+    """Return the process-wide reranker"""
+    global _reranker
+    
+    with _reranker_lock:
+        if _reranker is None:
+            _reranker = Reranker()
+        return _reranker
@@ -1,68 +1,345 @@
 # src/rag/retriever.py
+import asyncio
 import logging
-from typing import List, Dict, Any, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple
+import numpy as np
+from src.models.embedding_handler import EmbeddingHandler
+from src.rag.context_builder import ContextBuilder
+from src.rag.reranker import get_reranker
 from src.storage.vector_store import VectorStore
 from src.config import Config
+from src.utils.tracing import traced, annotate, span, run_in_context
 
 logger = logging.getLogger(__name__)
 
+# Shared pool so the vector and keyword searches of a hybrid query run side by side
+_search_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="retriever")
+
+
+def maximal_marginal_relevance(query_embedding, embeddings, k: int, lambda_mult: float = 0.5) -> List[int]:
+    """Select k diverse candidate indices with MMR over a precomputed similarity matrix"""
+    candidates = np.asarray(embeddings, dtype=np.float32)
+    query = np.asarray(query_embedding, dtype=np.float32)
+    
+    if candidates.ndim != 2 or len(candidates) == 0:
+        return []
+    
+    k = min(k, len(candidates))
+    
+    # Normalise so dot products are cosine similarities
+    candidates = candidates / np.maximum(np.linalg.norm(candidates, axis=1, keepdims=True), 1e-12)
+    query = query / max(float(np.linalg.norm(query)), 1e-12)
+    
+    relevance = candidates @ query
+    similarity = candidates @ candidates.T
+    
+    first = int(np.argmax(relevance))
+    selected = [first]
+    is_selected = np.zeros(len(candidates), dtype=bool)
+    is_selected[first] = True
+    
+    # Highest similarity of each candidate to anything already selected
+    max_similarity = similarity[first].copy()
+    
+    while len(selected) < k:
+        scores = lambda_mult * relevance - (1 - lambda_mult) * max_similarity
+        scores[is_selected] = -np.inf
+        
+        best = int(np.argmax(scores))
+        selected.append(best)
+        is_selected[best] = True
+        np.maximum(max_similarity, similarity[best], out=max_similarity)
+    
+    return selected
+
 class Retriever:
     """Handle document retrieval for RAG"""
     
     def __init__(self, vector_store: VectorStore = None):
         self.vector_store = vector_store or VectorStore()
+        self.embedding_handler = EmbeddingHandler()
+        self.context_builder = ContextBuilder()
         self.default_k = 5  # Number of chunks to retrieve
+        self.search_type = Config.RETRIEVAL_SEARCH_TYPE
     
-    def retrieve(self, query: str, k: int = None, filter_metadata: Dict = None) -> List[Dict[str, Any]]:
-        """Retrieve relevant documents for a query"""
+    @traced("retriever.search")
+    def retrieve(self, query: str, k: int = None, filter_metadata: Dict = None,
+                 search_type: str = None, mmr_lambda: float = None,
+                 fetch_multiplier: int = None, query_embedding=None) -> List[Dict[str, Any]]:
+        """Retrieve relevant documents for a query, reusing query_embedding if already computed"""
         k = k or self.default_k
+        search_type = search_type or self.search_type
         
         try:
-            results = self.vector_store.search(
-                query=query,
-                n_results=k,
-                filter_metadata=filter_metadata
-            )
+            if search_type == "hybrid":
+                results = self._hybrid_search(query, k, filter_metadata, query_embedding)
+            elif search_type == "mmr":
+                results = self._mmr_search(
+                    query,
+                    k,
+                    filter_metadata,
+                    Config.MMR_LAMBDA if mmr_lambda is None else mmr_lambda,
+                    fetch_multiplier or Config.MMR_FETCH_MULTIPLIER,
+                    query_embedding
+                )
+            else:
+                results = self._vector_search(query, k, filter_metadata, query_embedding)
             
-            logger.info(f"Retrieved {len(results)} chunks for query")
+            annotate(search_type=search_type, k=k, results=len(results))
+            logger.info(f"Retrieved {len(results)} chunks for query ({search_type})")
             return results
             
         except Exception as e:
             logger.error(f"Error during retrieval: {str(e)}")
             return []
     
-    def retrieve_with_sources(self, query: str, k: int = None) -> Dict[str, Any]:
-        """Retrieve documents with source information"""
-        results = self.retrieve(query, k)
+    async def aretrieve(self, query: str, k: int = None, **retrieval_options) -> List[Dict[str, Any]]:
+        """Async variant of retrieve; the blocking vector search runs in an executor"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            None,
+            run_in_context(self.retrieve, query, k, **retrieval_options)
+        )
+    
+    async def aretrieve_with_sources(self, query: str, k: int = None, **retrieval_options) -> Dict[str, Any]:
+        """Async variant of retrieve_with_sources"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            None,
+            run_in_context(self.retrieve_with_sources, query, k, **retrieval_options)
+        )
+    
+    def _vector_search(self, query: str, k: int, filter_metadata: Dict = None,
+                       query_embedding=None) -> List[Dict[str, Any]]:
+        """Dense search, skipping the query embedding step when it is already known"""
+        if query_embedding is not None:
+            return self.vector_store.search_by_embedding(query_embedding, k, filter_metadata)
+        
+        return self.vector_store.search(
+            query=query,
+            n_results=k,
+            filter_metadata=filter_metadata
+        )
+    
+    def _hybrid_search(self, query: str, k: int, filter_metadata: Dict = None,
+                       query_embedding=None) -> List[Dict[str, Any]]:
+        """Run vector and BM25 search in parallel and fuse the rankings"""
+        n_candidates = k * Config.HYBRID_CANDIDATE_MULTIPLIER
+        
+        # Run in a copy of this context so the searches' spans stay children of the query
+        vector_future = _search_executor.submit(
+            run_in_context(self._vector_search, query, n_candidates, filter_metadata, query_embedding)
+        )
+        keyword_future = _search_executor.submit(
+            run_in_context(self.vector_store.keyword_search, query, n_candidates, filter_metadata)
+        )
+        
+        return self._reciprocal_rank_fusion(
+            [
+                (vector_future.result(), Config.HYBRID_VECTOR_WEIGHT),
+                (keyword_future.result(), Config.HYBRID_KEYWORD_WEIGHT)
+            ],
+            k
+        )
+    
+    def _mmr_search(self, query: str, k: int, filter_metadata: Dict,
+                    mmr_lambda: float, fetch_multiplier: int, query_embedding=None) -> List[Dict[str, Any]]:
+        """Over-fetch candidates and keep k diverse ones with MMR"""
+        if query_embedding is None:
+            query_embedding = self.embedding_handler.embed_query(query)
+        
+        if query_embedding is None:
+            logger.warning("Query embedding failed, falling back to plain vector search")
+            return self.vector_store.search(query, k, filter_metadata)
+        
+        candidates = self.vector_store.search_by_embedding(
+            query_embedding,
+            n_results=k * fetch_multiplier,
+            filter_metadata=filter_metadata,
+            include_embeddings=True
+        )
+        
+        if len(candidates) > k:
+            selected = maximal_marginal_relevance(
+                query_embedding,
+                [candidate["embedding"] for candidate in candidates],
+                k,
+                mmr_lambda
+            )
+            candidates = [candidates[i] for i in selected]
+        
+        # Embeddings are only needed for selection
+        for candidate in candidates:
+            candidate.pop("embedding", None)
+        
+        return candidates
+    
+    def _reciprocal_rank_fusion(self, ranked_lists: List, k: int) -> List[Dict[str, Any]]:
+        """Fuse ranked result lists with weighted reciprocal rank fusion"""
+        fused: Dict[str, Dict[str, Any]] = {}
+        
+        for results, weight in ranked_lists:
+            for rank, result in enumerate(results, start=1):
+                entry = fused.get(result["id"])
+                if entry is None:
+                    entry = dict(result)
+                    entry["score"] = 0.0
+                    fused[result["id"]] = entry
+                else:
+                    # Keep whichever side knows the vector distance / keyword score
+                    for key, value in result.items():
+                        if entry.get(key) is None:
+                            entry[key] = value
+                
+                entry["score"] += weight / (Config.HYBRID_RRF_K + rank)
+        
+        ranked = sorted(fused.values(), key=lambda entry: entry["score"], reverse=True)
+        return ranked[:k]
+    
+    @traced("retriever.retrieve")
+    def retrieve_with_sources(self, query: str, k: int = None, rerank: bool = None,
+                              rerank_candidates: int = None, token_budget: int = None,
+                              adaptive: bool = None, **retrieval_options) -> Dict[str, Any]:
+        """Retrieve documents with source information and a token-budgeted context
+        
+        In adaptive mode k is an upper bound: candidates are over-fetched and
+        cut at a distance threshold or the largest score gap, so anywhere from
+        0 to k chunks are returned.
+        """
+        k = k or self.default_k
+        rerank = Config.RERANK_ENABLED if rerank is None else rerank
+        adaptive = Config.ADAPTIVE_K_ENABLED if adaptive is None else adaptive
+        rerank_stats = None
+        adaptive_stats = None
+        
+        # Number of results to carry into the cutoff step
+        n_keep = k * Config.ADAPTIVE_FETCH_MULTIPLIER if adaptive else k
+        
+        if rerank:
+            # Over-fetch so the cross-encoder has candidates to choose from
+            reranker = get_reranker()
+            n_candidates = min(
+                max(n_keep, rerank_candidates or Config.RERANK_CANDIDATES),
+                reranker.max_candidates
+            )
+            results = self.retrieve(query, n_candidates, **retrieval_options)
+            with span("retriever.rerank", candidates=len(results), keep=n_keep):
+                results, rerank_stats = reranker.rerank(query, results, n_keep)
+        else:
+            results = self.retrieve(query, n_keep, **retrieval_options)
+        
+        if adaptive:
+            results, adaptive_stats = self._adaptive_cutoff(results, k)
         
         if not results:
+            annotate(k=k, chunks=0)
             return {
                 "chunks": [],
                 "sources": [],
-                "context": ""
+                "context": "",
+                "context_tokens": 0,
+                "rerank": rerank_stats,
+                "adaptive": adaptive_stats
             }
         
-        # Extract unique sources
-        sources = set()
         chunks = []
         
         for result in results:
             metadata = result.get("metadata", {})
-            document_name = metadata.get("document_name", "Unknown")
-            sources.add(document_name)
             
             chunks.append({
+                "id": result.get("id"),
                 "text": result["text"],
-                "source": document_name,
+                "source": metadata.get("document_name", "Unknown"),
                 "chunk_index": metadata.get("chunk_index", 0),
-                "distance": result.get("distance")
+                "start_char": metadata.get("start_char"),
+                "end_char": metadata.get("end_char"),
+                "distance": result.get("distance"),
+                "rerank_score": result.get("rerank_score")
             })
         
-        # Create context from chunks
-        context = "\n\n".join([chunk["text"] for chunk in chunks])
+        # Merge overlapping neighbours and fit the context to the LLM's budget
+        assembled = self.context_builder.build(chunks, token_budget)
+        
+        for chunk in chunks:
+            chunk["in_context"] = chunk["id"] in assembled["included_chunk_ids"]
+        
+        # Extract unique sources of the chunks that made it into the context
+        sources = []
+        for context_span in assembled["spans"]:
+            if context_span["source"] not in sources:
+                sources.append(context_span["source"])
+        
+        annotate(
+            k=k,
+            chunks=len(chunks),
+            chunks_in_context=len(assembled["included_chunk_ids"]),
+            context_tokens=assembled["tokens"],
+            sources=len(sources)
+        )
         
         return {
             "chunks": chunks,
-            "sources": list(sources),
-            "context": context
-        }
\ No newline at end of file
+            "sources": sources,
+            "context": assembled["context"],
+            "context_tokens": assembled["tokens"],
+            "rerank": rerank_stats,
+            "adaptive": adaptive_stats
+        }
+    
+    def _adaptive_cutoff(self, results: List[Dict[str, Any]], k_max: int) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """Drop candidates past the distance threshold or after the largest relevance gap"""
+        stats = {
+            "candidates": len(results),
+            "k_max": k_max,
+            "max_distance": Config.ADAPTIVE_MAX_DISTANCE
+        }
+        
+        # Keyword-only hybrid hits have no distance; they matched exact terms, so keep them
+        kept = [
+            result for result in results
+            if result.get("distance") is None or result["distance"] <= Config.ADAPTIVE_MAX_DISTANCE
+        ]
+        stats["after_threshold"] = len(kept)
+        
+        # Only the first k_max + 1 candidates matter for where to cut
+        window = kept[:k_max + 1]
+        relevance = [self._relevance(result) for result in window]
+        gap_cut = None
+        
+        if len(relevance) >= 3 and None not in relevance:
+            gaps = np.diff(np.asarray(relevance, dtype=np.float64)) * -1
+            largest = int(np.argmax(gaps))
+            other_gaps = np.delete(gaps, largest)
+            typical_gap = max(float(np.mean(other_gaps)), 1e-9)
+            
+            stats["largest_gap"] = float(gaps[largest])
+            stats["gap_ratio"] = float(gaps[largest]) / typical_gap
+            
+            if stats["gap_ratio"] >= Config.ADAPTIVE_GAP_RATIO:
+                gap_cut = largest + 1
+        
+        kept = kept[:gap_cut] if gap_cut is not None else kept
+        kept = kept[:k_max]
+        
+        stats["gap_cut"] = gap_cut
+        stats["kept"] = len(kept)
+        
+        logger.info(
+            "Adaptive cutoff: "
+            + ", ".join(f"{key}={value:.3f}" if isinstance(value, float) else f"{key}={value}"
+                        for key, value in stats.items())
+        )
+        return kept, stats
+    
+    @staticmethod
+    def _relevance(result: Dict[str, Any]) -> Optional[float]:
+        """Higher-is-better score of whichever stage ordered the results last"""
+        if result.get("rerank_score") is not None:
+            return result["rerank_score"]
+        if result.get("score") is not None:
+            return result["score"]
+        if result.get("distance") is not None:
+            return -result["distance"]
+        return None
\ No newline at end of file
@@ -0,0 +1,215 @@
+# src/rag/semantic_cache.py
+import copy
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional
+import numpy as np
+from src.config import Config
+from src.storage.vector_store import VectorStore
+
+logger = logging.getLogger(__name__)
+
+class SemanticCache:
+    """Cache RAG answers by query embedding similarity
+    
+    Entries belong to one generation of the vector store collection. Changes
+    made in this process arrive through the VectorStore listener and only
+    drop the entries they affect; a generation the cache was not told about
+    means another process changed the collection, so everything is dropped.
+    """
+    
+    def __init__(self, threshold: float = None, max_entries: int = None, ttl_seconds: float = None):
+        self.threshold = Config.SEMANTIC_CACHE_THRESHOLD if threshold is None else threshold
+        self.max_entries = max_entries or Config.SEMANTIC_CACHE_MAX_ENTRIES
+        self.ttl_seconds = Config.SEMANTIC_CACHE_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+        
+        # entry_id -> entry, oldest first so eviction is LRU
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        
+        # Stacked, normalised query embeddings, rebuilt lazily after changes
+        self._matrix = None
+        self._matrix_ids: List[str] = []
+        
+        # Collection generation the entries were built against
+        self._generation: Optional[int] = None
+        
+        self.hits = 0
+        self.misses = 0
+    
+    def lookup(self, query_embedding, namespace: str, generation: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """Return the cached entry for the most similar stored query above the threshold
+        
+        generation is the collection's current generation; entries from an
+        older one are dropped first.
+        """
+        query = self._normalize(query_embedding)
+        
+        with self._lock:
+            self._sync_generation(generation)
+            self._expire()
+            
+            if not self._entries:
+                self.misses += 1
+                return None
+            
+            if self._matrix is None:
+                self._rebuild_matrix()
+            
+            similarities = self._matrix @ query
+            best_similarity = -1.0
+            best_entry = None
+            
+            # Scan from most to least similar until one matches the namespace
+            for index in np.argsort(-similarities):
+                similarity = float(similarities[index])
+                if similarity < self.threshold:
+                    break
+                
+                entry = self._entries[self._matrix_ids[index]]
+                if entry["namespace"] == namespace:
+                    best_similarity = similarity
+                    best_entry = entry
+                    break
+            
+            if best_entry is None:
+                self.misses += 1
+                return None
+            
+            self._entries.move_to_end(best_entry["id"])
+            self.hits += 1
+        
+        logger.info(f"Semantic cache hit (similarity {best_similarity:.3f})")
+        return {
+            "response": copy.deepcopy(best_entry["response"]),
+            "chunk_ids": best_entry["chunk_ids"],
+            "similarity": best_similarity
+        }
+    
+    def store(self, query_embedding, namespace: str, chunk_ids: List[str],
+              document_names: List[str], response: Dict[str, Any], generation: Optional[int] = None) -> None:
+        """Store a copy of a generated answer with the chunks and documents it was built from
+        
+        Answers retrieved from an older collection generation than the current
+        one are not stored.
+        """
+        entry_id = str(uuid.uuid4())
+        
+        with self._lock:
+            if generation is not None and self._generation is not None and generation != self._generation:
+                return
+            
+            self._entries[entry_id] = {
+                "id": entry_id,
+                "namespace": namespace,
+                "embedding": self._normalize(query_embedding),
+                "chunk_ids": list(chunk_ids),
+                "documents": set(document_names),
+                "response": copy.deepcopy(response),
+                "created_at": time.time()
+            }
+            
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            
+            self._matrix = None
+    
+    def invalidate_documents(self, document_names: Optional[List[str]] = None) -> int:
+        """Drop entries built from the given documents, or every entry if None"""
+        with self._lock:
+            if document_names is None:
+                removed = len(self._entries)
+                self._entries.clear()
+            else:
+                names = set(document_names)
+                stale = [entry_id for entry_id, entry in self._entries.items() if entry["documents"] & names]
+                for entry_id in stale:
+                    del self._entries[entry_id]
+                removed = len(stale)
+            
+            if removed:
+                self._matrix = None
+        
+        if removed:
+            logger.info(f"Invalidated {removed} semantic cache entries")
+        return removed
+    
+    def clear(self) -> None:
+        """Remove every entry"""
+        self.invalidate_documents(None)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache size and hit statistics"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0
+            }
+    
+    def _on_collection_change(self, event: str, document_names: Optional[List[str]], generation: int) -> None:
+        """VectorStore listener: newly ingested chunks can outrank cached ones, so drop everything"""
+        with self._lock:
+            # A gap means another process changed the collection too
+            missed_change = self._generation is not None and generation != self._generation + 1
+            self._generation = generation
+        
+        if event == "delete" and not missed_change:
+            self.invalidate_documents(document_names)
+        else:
+            self.invalidate_documents(None)
+    
+    def _sync_generation(self, generation: Optional[int]) -> None:
+        """Drop every entry if the collection changed without this process being told (caller holds the lock)"""
+        if generation is None or generation == self._generation:
+            return
+        
+        if self._entries:
+            logger.info(f"Vector store changed elsewhere (generation {self._generation} -> {generation}), clearing semantic cache")
+            self._entries.clear()
+            self._matrix = None
+        self._generation = generation
+    
+    def _expire(self) -> None:
+        """Remove entries older than the TTL (caller holds the lock)"""
+        if self.ttl_seconds <= 0:
+            return
+        
+        cutoff = time.time() - self.ttl_seconds
+        expired = [entry_id for entry_id, entry in self._entries.items() if entry["created_at"] < cutoff]
+        for entry_id in expired:
+            del self._entries[entry_id]
+        
+        if expired:
+            self._matrix = None
+    
+    def _rebuild_matrix(self) -> None:
+        """Stack entry embeddings for a single matrix-vector similarity pass"""
+        self._matrix_ids = list(self._entries)
+        self._matrix = np.vstack([self._entries[entry_id]["embedding"] for entry_id in self._matrix_ids])
+    
+    @staticmethod
+    def _normalize(embedding) -> np.ndarray:
+        """Convert an embedding to a unit-length float32 vector"""
+        vector = np.asarray(embedding, dtype=np.float32)
+        return vector / max(float(np.linalg.norm(vector)), 1e-12)
+
+# Shared across reruns and sessions so cached answers are actually reused
+_semantic_cache = None
+_semantic_cache_lock = threading.Lock()
+
+
+def get_semantic_cache() -> SemanticCache:
+    """Return the process-wide semantic cache, registering its invalidation hook"""
+    global _semantic_cache
+    
+    with _semantic_cache_lock:
+        if _semantic_cache is None:
+            _semantic_cache = SemanticCache()
+            VectorStore.add_change_listener(_semantic_cache._on_collection_change)
+        return _semantic_cache
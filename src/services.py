@@ -0,0 +1,58 @@
+# src/services.py
+import logging
+import threading
+import time
+from typing import Optional
+from src.processing.pdf_processor import PDFProcessor
+from src.processing.text_chunker import TextChunker
+from src.processing.ingestion import IngestionPipeline
+from src.storage.vector_store import VectorStore
+from src.storage.document_store import create_document_store
+from src.models.llm_handler import LLMManager
+from src.rag.retriever import Retriever
+from src.rag.generator import RAGGenerator
+
+logger = logging.getLogger(__name__)
+
+class Services:
+    """Long-lived pipeline components shared by every session in the process
+    
+    One VectorStore backs both ingestion and retrieval, so there is a single
+    ChromaDB client, and the LLM manager probes its backends once rather than
+    on every Streamlit rerun.
+    """
+    
+    def __init__(self):
+        start = time.perf_counter()
+        
+        self.pdf_processor = PDFProcessor()
+        self.text_chunker = TextChunker()
+        self.vector_store = VectorStore()
+        self.document_store = create_document_store()
+        self.rag_generator = RAGGenerator(
+            llm_manager=LLMManager(),
+            retriever=Retriever(self.vector_store),
+            document_store=self.document_store
+        )
+        self.ingestion = IngestionPipeline(
+            self.pdf_processor,
+            self.text_chunker,
+            self.vector_store,
+            self.document_store
+        )
+        
+        self.init_ms = (time.perf_counter() - start) * 1000
+        logger.info(f"Initialized pipeline services in {self.init_ms:.0f} ms")
+
+_services: Optional[Services] = None
+_services_lock = threading.Lock()
+
+
+def get_services() -> Services:
+    """Return the process-wide pipeline services, creating them on first use"""
+    global _services
+    
+    with _services_lock:
+        if _services is None:
+            _services = Services()
+        return _services
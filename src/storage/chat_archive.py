@@ -0,0 +1,197 @@
+# src/storage/chat_archive.py
+import gzip
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Messages per gzip member; a range search decompresses whole members only
+ARCHIVE_BLOCK_MESSAGES = 100
+
+class ChatArchive:
+    """Gzip-compressed segments of rotated chat messages with a JSON index
+    
+    Each segment is a series of independent gzip members of up to block_size
+    messages, so it still reads as one file with zcat. The index records every
+    member's byte range and timestamp span; searches by date range only
+    decompress the members that overlap the range.
+    """
+    
+    def __init__(self, archive_dir: Path, block_size: int = ARCHIVE_BLOCK_MESSAGES):
+        self.archive_dir = Path(archive_dir)
+        self.index_path = self.archive_dir / "index.json"
+        self.block_size = block_size
+        
+        self._lock = threading.RLock()
+    
+    def append_segment(self, messages: List[Dict[str, Any]]) -> Optional[str]:
+        """Write messages (oldest first) as a new segment; returns its file name"""
+        if not messages:
+            return None
+        
+        with self._lock:
+            index = self._load_index()
+            name = f"segment-{index['next_segment']:06d}.jsonl.gz"
+            
+            data = bytearray()
+            blocks = []
+            for start in range(0, len(messages), self.block_size):
+                block = messages[start:start + self.block_size]
+                payload = "".join(json.dumps(message, ensure_ascii=False) + "\n" for message in block)
+                compressed = gzip.compress(payload.encode("utf-8"))
+                
+                blocks.append({
+                    "offset": len(data),
+                    "length": len(compressed),
+                    "count": len(block),
+                    "first_timestamp": block[0].get("timestamp", ""),
+                    "last_timestamp": block[-1].get("timestamp", "")
+                })
+                data += compressed
+            
+            self.archive_dir.mkdir(parents=True, exist_ok=True)
+            self._write_atomic(self.archive_dir / name, bytes(data))
+            
+            index["segments"].append({
+                "file": name,
+                "count": len(messages),
+                "bytes": len(data),
+                "first_timestamp": blocks[0]["first_timestamp"],
+                "last_timestamp": blocks[-1]["last_timestamp"],
+                "blocks": blocks
+            })
+            index["next_segment"] += 1
+            self._write_atomic(self.index_path, json.dumps(index, indent=2).encode("utf-8"))
+            
+            logger.info(f"Archived {len(messages)} chat messages to {name}")
+            return name
+    
+    def search(self, start: Optional[str] = None, end: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Archived messages with start <= timestamp < end (ISO strings), oldest first"""
+        with self._lock:
+            index = self._load_index()
+            
+            messages = []
+            for segment in index["segments"]:
+                if not self._overlaps(segment, start, end):
+                    continue
+                
+                for block in segment["blocks"]:
+                    if not self._overlaps(block, start, end):
+                        continue
+                    
+                    messages.extend(
+                        message for message in self._read_block(segment["file"], block)
+                        if self._in_range(message.get("timestamp", ""), start, end)
+                    )
+            return messages
+    
+    def newest_before(self, position: Optional[int], limit: int) -> Tuple[List[Dict[str, Any]], int]:
+        """Up to limit archived messages before a position, and the position of the first one
+        
+        Positions number archived messages oldest first from 0 and never change,
+        since segments are only ever appended; None means the end of the
+        archive. Older messages remain while the returned position is above 0.
+        """
+        with self._lock:
+            blocks = [
+                (segment["file"], block)
+                for segment in self._load_index()["segments"]
+                for block in segment["blocks"]
+            ]
+            
+            total = sum(block["count"] for _, block in blocks)
+            end = total if position is None else min(position, total)
+            start = max(0, end - max(limit, 0))
+            
+            messages: List[Dict[str, Any]] = []
+            block_start = 0
+            for file_name, block in blocks:
+                if block_start >= end:
+                    break
+                block_end = block_start + block["count"]
+                if block_end > start:
+                    messages.extend(self._read_block(file_name, block)[max(0, start - block_start):end - block_start])
+                block_start = block_end
+            
+            return messages, start
+    
+    def count(self) -> int:
+        """Number of archived messages"""
+        with self._lock:
+            return sum(segment["count"] for segment in self._load_index()["segments"])
+    
+    def clear(self) -> None:
+        """Delete every segment and the index"""
+        with self._lock:
+            index = self._load_index()
+            for segment in index["segments"]:
+                (self.archive_dir / segment["file"]).unlink(missing_ok=True)
+            self.index_path.unlink(missing_ok=True)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get the number of segments, archived messages and compressed bytes"""
+        with self._lock:
+            segments = self._load_index()["segments"]
+            return {
+                "segments": len(segments),
+                "messages": sum(segment["count"] for segment in segments),
+                "bytes": sum(segment["bytes"] for segment in segments),
+                "oldest": segments[0]["first_timestamp"] if segments else None
+            }
+    
+    def _read_block(self, file_name: str, block: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Decompress one gzip member of a segment"""
+        with open(self.archive_dir / file_name, "rb") as f:
+            f.seek(block["offset"])
+            data = gzip.decompress(f.read(block["length"]))
+        return [json.loads(line) for line in data.splitlines() if line.strip()]
+    
+    def _load_index(self) -> Dict[str, Any]:
+        """Read the index, or an empty one if nothing was archived yet"""
+        if not self.index_path.exists():
+            return {"next_segment": 1, "segments": []}
+        with open(self.index_path, "r") as f:
+            return json.load(f)
+    
+    @staticmethod
+    def _write_atomic(path: Path, data: bytes) -> None:
+        """Write a file so readers never see it half written"""
+        temp_path = path.with_suffix(path.suffix + ".tmp")
+        with open(temp_path, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    
+    @staticmethod
+    def _overlaps(span: Dict[str, Any], start: Optional[str], end: Optional[str]) -> bool:
+        """Check whether a segment or block's timestamp span overlaps [start, end)"""
+        if end is not None and span["first_timestamp"] >= end:
+            return False
+        if start is not None and span["last_timestamp"] < start:
+            return False
+        return True
+    
+    @staticmethod
+    def _in_range(timestamp: str, start: Optional[str], end: Optional[str]) -> bool:
+        """Check whether a timestamp falls in [start, end)"""
+        return (start is None or timestamp >= start) and (end is None or timestamp < end)
+
+# Every store in the process appends through the same archive and lock
+_archives: Dict[str, ChatArchive] = {}
+_archives_lock = threading.Lock()
+
+
+def get_chat_archive(archive_dir: Path) -> ChatArchive:
+    """Return the process-wide chat archive for a directory"""
+    key = str(Path(archive_dir).resolve())
+    
+    with _archives_lock:
+        if key not in _archives:
+            _archives[key] = ChatArchive(archive_dir)
+        return _archives[key]
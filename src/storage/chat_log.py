@@ -0,0 +1,252 @@
+# src/storage/chat_log.py
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Tuple
+from src.storage.chat_archive import ChatArchive
+from src.utils.file_lock import file_lock
+
+logger = logging.getLogger(__name__)
+
+class ChatLog:
+    """Append-only JSON Lines chat log with an in-memory line offset index
+    
+    Appends write a single line; reading the last n messages seeks straight to
+    their offsets. Once the log is compact_slack messages past max_messages, or
+    larger than rotate_bytes, the oldest messages are rotated into the archive,
+    so the hot file stays small while the full history is kept.
+    
+    Appends, rotation and clearing hold a lock file next to the log, so
+    processes sharing it (the UI, the API server, batch_qa --save-history)
+    never lose a line appended while another one rewrites the file.
+    """
+    
+    def __init__(self, log_path: Path, max_messages: int, compact_slack: int,
+                 rotate_bytes: int, archive: ChatArchive):
+        self.log_path = Path(log_path)
+        self.max_messages = max_messages
+        self.compact_slack = compact_slack
+        self.rotate_bytes = rotate_bytes
+        self.archive = archive
+        self.lock_path = self.log_path.with_suffix(self.log_path.suffix + ".lock")
+        
+        self._lock = threading.RLock()
+        # Byte offset of the start of every complete line
+        self._offsets: List[int] = []
+        # Bytes of the file covered by the index, and the file it was built from
+        self._indexed_size = 0
+        self._indexed_inode = None
+    
+    def append(self, message: Dict[str, Any]) -> None:
+        """Append one message, rotating when the log is well past its limits"""
+        line = (json.dumps(message, ensure_ascii=False) + "\n").encode("utf-8")
+        
+        with self._lock, file_lock(self.lock_path):
+            self._refresh_index()
+            
+            with open(self.log_path, "ab") as f:
+                offset = f.tell()
+                f.write(line)
+            
+            # Only extend the index if nobody else appended in between
+            if offset == self._indexed_size:
+                self._offsets.append(offset)
+                self._indexed_size = offset + len(line)
+            
+            if len(self._offsets) > self.max_messages + self.compact_slack or self._indexed_size > self.rotate_bytes:
+                self._rotate()
+    
+    def tail(self, limit: int) -> List[Dict[str, Any]]:
+        """Read the last limit messages, oldest first"""
+        if limit <= 0:
+            return []
+        
+        with self._lock:
+            self._refresh_index()
+            if not self._offsets:
+                return []
+            
+            start = self._offsets[-limit] if limit < len(self._offsets) else 0
+            return self._read_from(start, self._indexed_size)
+    
+    def read_all(self) -> List[Dict[str, Any]]:
+        """Read every message, oldest first"""
+        with self._lock:
+            self._refresh_index()
+            return self._read_from(0, self._indexed_size)
+    
+    def page(self, before: Optional[str], limit: int) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Read up to limit messages before the cursor, oldest first
+        
+        Cursors are message positions counted from the oldest archived
+        message, so rotation never moves a message and messages sharing a
+        timestamp are never skipped. Returns the messages and the cursor for
+        the next older page, or None when there are no older messages.
+        """
+        if limit <= 0:
+            return [], before
+        
+        # The file lock keeps the archive and the log from changing between reads
+        with self._lock, file_lock(self.lock_path):
+            self._refresh_index()
+            
+            archived = self.archive.count()
+            total = archived + len(self._offsets)
+            end = total if before is None else min(int(before), total)
+            start = max(0, end - limit)
+            
+            messages = []
+            if end > archived:
+                first, last = max(start, archived) - archived, end - archived
+                end_offset = self._offsets[last] if last < len(self._offsets) else self._indexed_size
+                messages = self._read_from(self._offsets[first], end_offset)
+            
+            # The rest of the page comes from rotated messages older than the hot log
+            if start < archived:
+                older, _ = self.archive.newest_before(min(end, archived), min(end, archived) - start)
+                messages = older + messages
+            
+            return messages, str(start) if start > 0 else None
+    
+    def end_cursor(self) -> Optional[str]:
+        """Cursor for paging back from the newest message, or None if there are none"""
+        with self._lock, file_lock(self.lock_path):
+            self._refresh_index()
+            total = self.archive.count() + len(self._offsets)
+            return str(total) if total else None
+    
+    def search(self, start: Optional[str] = None, end: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Messages with start <= timestamp < end (ISO strings) from the archive and the log, oldest first"""
+        with self._lock:
+            messages = self.archive.search(start, end)
+            messages.extend(
+                message for message in self.read_all()
+                if (start is None or message.get("timestamp", "") >= start)
+                and (end is None or message.get("timestamp", "") < end)
+            )
+            return messages
+    
+    def count(self) -> int:
+        """Number of messages in the log"""
+        with self._lock:
+            self._refresh_index()
+            return len(self._offsets)
+    
+    def rotate(self) -> int:
+        """Move all but the newest messages into the archive; returns messages rotated
+        
+        Keeps at most max_messages, and at most half of rotate_bytes so the
+        next append does not rotate again straight away.
+        """
+        with self._lock, file_lock(self.lock_path):
+            return self._rotate()
+    
+    def _rotate(self) -> int:
+        """rotate() for a caller holding both locks"""
+        self._refresh_index()
+        rotated = max(0, len(self._offsets) - self.max_messages)
+        while rotated < len(self._offsets) and self._indexed_size - self._offsets[rotated] > self.rotate_bytes // 2:
+            rotated += 1
+        if rotated <= 0:
+            return 0
+        
+        split = self._offsets[rotated] if rotated < len(self._offsets) else self._indexed_size
+        with open(self.log_path, "rb") as f:
+            f.seek(split)
+            kept = f.read(self._indexed_size - split)
+        
+        # Archive first: a crash before the log is rewritten duplicates messages instead of losing them
+        self.archive.append_segment(self._read_from(0, split))
+        self._replace_contents(kept)
+        
+        logger.info(f"Rotated {rotated} oldest chat messages into the archive")
+        return rotated
+    
+    def clear(self) -> None:
+        """Remove every message, including archived ones"""
+        with self._lock, file_lock(self.lock_path):
+            self._replace_contents(b"")
+            self.archive.clear()
+    
+    def _replace_contents(self, data: bytes) -> None:
+        """Atomically swap in new log contents and rebuild the index (caller holds both locks)"""
+        temp_path = self.log_path.with_suffix(self.log_path.suffix + ".tmp")
+        with open(temp_path, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.log_path)
+        
+        self._offsets = []
+        self._indexed_size = 0
+        self._indexed_inode = None
+        self._refresh_index()
+    
+    def _read_from(self, start: int, end: int) -> List[Dict[str, Any]]:
+        """Parse the complete lines between two offsets, skipping corrupt ones"""
+        if end <= start:
+            return []
+        
+        with open(self.log_path, "rb") as f:
+            f.seek(start)
+            data = f.read(end - start)
+        
+        messages = []
+        for line in data.splitlines():
+            if not line.strip():
+                continue
+            try:
+                messages.append(json.loads(line))
+            except json.JSONDecodeError:
+                logger.warning("Skipping corrupt chat log line")
+        return messages
+    
+    def _refresh_index(self) -> None:
+        """Index lines appended since the last call, or rebuild if the file was replaced"""
+        try:
+            stat = os.stat(self.log_path)
+        except FileNotFoundError:
+            self._offsets = []
+            self._indexed_size = 0
+            self._indexed_inode = None
+            return
+        
+        if stat.st_ino != self._indexed_inode or stat.st_size < self._indexed_size:
+            self._offsets = []
+            self._indexed_size = 0
+            self._indexed_inode = stat.st_ino
+        
+        if stat.st_size == self._indexed_size:
+            return
+        
+        with open(self.log_path, "rb") as f:
+            f.seek(self._indexed_size)
+            data = f.read(stat.st_size - self._indexed_size)
+        
+        # A partially written last line is picked up on a later refresh
+        position = 0
+        while True:
+            newline = data.find(b"\n", position)
+            if newline < 0:
+                break
+            self._offsets.append(self._indexed_size + position)
+            position = newline + 1
+        
+        self._indexed_size += position
+
+# Offsets and locks only help if every store in the process shares them
+_chat_logs: Dict[str, ChatLog] = {}
+_chat_logs_lock = threading.Lock()
+
+
+def get_chat_log(log_path: Path, max_messages: int, compact_slack: int,
+                 rotate_bytes: int, archive: ChatArchive) -> ChatLog:
+    """Return the process-wide chat log for a path"""
+    key = str(Path(log_path).resolve())
+    
+    with _chat_logs_lock:
+        if key not in _chat_logs:
+            _chat_logs[key] = ChatLog(log_path, max_messages, compact_slack, rotate_bytes, archive)
+        return _chat_logs[key]
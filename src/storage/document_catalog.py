@@ -0,0 +1,119 @@
+# src/storage/document_catalog.py
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+class DocumentCatalog:
+    """In-memory copy of documents.json, reloaded only when the file changes on disk
+    
+    Reads are served from memory and checked against the file's mtime, size and
+    inode, so another process writing the file is picked up on the next call.
+    Writes go through the catalog: the file is replaced atomically and the cache
+    updated under the same lock, bumping version.
+    
+    Only the JSON backend (DOCUMENT_STORE_BACKEND=json) uses the catalog. The
+    default SQLite store answers the same reads with indexed queries and
+    has_document with a primary-key lookup, so it needs no file cache.
+    """
+    
+    def __init__(self, catalog_path: Path):
+        self.catalog_path = Path(catalog_path)
+        self.version = 0
+        
+        self._lock = threading.RLock()
+        self._documents: Dict[str, Any] = {}
+        # (mtime_ns, size, inode) of the file the cache was loaded from
+        self._stamp: Optional[Tuple[int, int, int]] = None
+    
+    def get_all(self) -> Dict[str, Any]:
+        """All document metadata keyed by name"""
+        with self._lock:
+            self._refresh()
+            return dict(self._documents)
+    
+    def contains(self, name: str) -> bool:
+        """Check whether a document is in the catalog"""
+        with self._lock:
+            self._refresh()
+            return name in self._documents
+    
+    def put_many(self, document_infos: List[Dict[str, Any]]) -> None:
+        """Add or replace several documents with one write"""
+        with self._lock:
+            self._refresh()
+            documents = dict(self._documents)
+            for document_info in document_infos:
+                documents[document_info["name"]] = document_info
+            self._write(documents)
+    
+    def remove(self, name: str) -> bool:
+        """Remove a document; returns False if it was not in the catalog"""
+        with self._lock:
+            self._refresh()
+            if name not in self._documents:
+                return False
+            
+            documents = dict(self._documents)
+            del documents[name]
+            self._write(documents)
+            return True
+    
+    def clear(self) -> None:
+        """Remove every document"""
+        with self._lock:
+            self._write({})
+    
+    def _write(self, documents: Dict[str, Any]) -> None:
+        """Atomically replace the file and the cache (caller holds the lock)"""
+        temp_path = self.catalog_path.with_suffix(self.catalog_path.suffix + ".tmp")
+        with open(temp_path, "w") as f:
+            json.dump(documents, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.catalog_path)
+        
+        self._documents = documents
+        self._stamp = self._stat()
+        self.version += 1
+    
+    def _refresh(self) -> None:
+        """Reload the file if it changed since it was cached (caller holds the lock)"""
+        stamp = self._stat()
+        if stamp == self._stamp:
+            return
+        
+        documents = {}
+        if stamp is not None:
+            with open(self.catalog_path, "r") as f:
+                documents = json.load(f)
+        
+        self._documents = documents
+        self._stamp = stamp
+        self.version += 1
+    
+    def _stat(self) -> Optional[Tuple[int, int, int]]:
+        """Identify the file's current contents without reading it"""
+        try:
+            stat = os.stat(self.catalog_path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+# One cache per file so every DocumentStore in the process shares it
+_catalogs: Dict[str, DocumentCatalog] = {}
+_catalogs_lock = threading.Lock()
+
+
+def get_document_catalog(catalog_path: Path) -> DocumentCatalog:
+    """Return the process-wide catalog for a path"""
+    key = str(Path(catalog_path).resolve())
+    
+    with _catalogs_lock:
+        if key not in _catalogs:
+            _catalogs[key] = DocumentCatalog(catalog_path)
+        return _catalogs[key]
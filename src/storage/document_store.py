@@ -1,10 +1,15 @@
 # src/storage/document_store.py
 import logging
-from typing import List, Dict, Any, Optional
+import threading
+from contextlib import contextmanager
+from typing import List, Dict, Any, Optional, Iterator
 import json
 from pathlib import Path
 from datetime import datetime
 from src.config import Config
+from src.storage.chat_archive import get_chat_archive
+from src.storage.chat_log import get_chat_log
+from src.storage.document_catalog import get_document_catalog
 
 logger = logging.getLogger(__name__)
 
@@ -13,27 +18,62 @@ class DocumentStore:
     
     def __init__(self):
         self.documents_file = Config.CHAT_HISTORY_DIR / "documents.json"
-        self.chat_history_file = Config.CHAT_HISTORY_DIR / "chat_history.json"
+        self.catalog = get_document_catalog(self.documents_file)
+        self.chat_history_file = Config.CHAT_HISTORY_DIR / "chat_history.jsonl"
+        self.chat_log = get_chat_log(
+            self.chat_history_file,
+            Config.CHAT_HISTORY_MAX_MESSAGES,
+            Config.CHAT_HISTORY_COMPACT_SLACK,
+            Config.CHAT_HISTORY_ROTATE_BYTES,
+            get_chat_archive(Config.CHAT_HISTORY_ARCHIVE_DIR)
+        )
+        self._migrate_legacy_chat_history()
+        
+        # Metadata saved inside batch(), written out together when it ends. Kept
+        # per thread because one store is shared by every session and API worker
+        self._local = threading.local()
+    
+    @property
+    def _pending(self) -> Optional[Dict[str, Any]]:
+        return getattr(self._local, "pending", None)
+    
+    @_pending.setter
+    def _pending(self, pending: Optional[Dict[str, Any]]):
+        self._local.pending = pending
+    
+    @contextmanager
+    def batch(self) -> Iterator[None]:
+        """Buffer document metadata saves during a bulk ingest and write them in one go"""
+        self._pending = {}
+        try:
+            yield
+        finally:
+            pending, self._pending = self._pending, None
+            if pending:
+                self.save_documents_metadata(list(pending.values()))
     
     def save_document_metadata(self, document_info: Dict[str, Any]) -> bool:
         """Save document metadata"""
-        try:
-            # Load existing documents
-            documents = self.load_documents()
-            
-            # Add timestamp
+        if self._pending is not None:
             document_info["added_at"] = datetime.now().isoformat()
+            self._pending[document_info["name"]] = document_info
+            return True
+        
+        return self.save_documents_metadata([document_info])
+    
+    def save_documents_metadata(self, document_infos: List[Dict[str, Any]]) -> bool:
+        """Save metadata for several documents with a single write"""
+        try:
+            for document_info in document_infos:
+                # Add timestamp
+                document_info.setdefault("added_at", datetime.now().isoformat())
             
-            # Add or update document
-            documents[document_info["name"]] = document_info
-            
-            # Save back to file
-            with open(self.documents_file, 'w') as f:
-                json.dump(documents, f, indent=2)
+            # Updates the cached catalog and replaces the file atomically
+            self.catalog.put_many(document_infos)
             
-            logger.info(f"Saved metadata for document: {document_info['name']}")
+            logger.info(f"Saved metadata for documents: {', '.join(info['name'] for info in document_infos)}")
             return True
-            
+        
         except Exception as e:
             logger.error(f"Error saving document metadata: {str(e)}")
             return False
@@ -41,58 +81,64 @@ class DocumentStore:
     def load_documents(self) -> Dict[str, Any]:
         """Load all document metadata"""
         try:
-            if self.documents_file.exists():
-                with open(self.documents_file, 'r') as f:
-                    return json.load(f)
-            return {}
+            documents = self.catalog.get_all()
             
+            if self._pending:
+                documents.update(self._pending)
+            return documents
+        
         except Exception as e:
             logger.error(f"Error loading documents: {str(e)}")
             return {}
     
+    def has_document(self, document_name: str) -> bool:
+        """Check whether a document has metadata, without loading the whole catalog"""
+        try:
+            if self._pending and document_name in self._pending:
+                return True
+            return self.catalog.contains(document_name)
+        
+        except Exception as e:
+            logger.error(f"Error checking document: {str(e)}")
+            return False
+    
     def remove_document(self, document_name: str) -> bool:
         """Remove document metadata"""
         try:
-            documents = self.load_documents()
-            
-            if document_name in documents:
-                del documents[document_name]
-                
-                with open(self.documents_file, 'w') as f:
-                    json.dump(documents, f, indent=2)
-                
+            if self.catalog.remove(document_name):
                 logger.info(f"Removed metadata for document: {document_name}")
                 return True
             else:
                 logger.warning(f"Document not found: {document_name}")
                 return False
-                
+        
         except Exception as e:
             logger.error(f"Error removing document: {str(e)}")
             return False
     
+    def clear_documents(self) -> bool:
+        """Remove all document metadata"""
+        try:
+            self.catalog.clear()
+            
+            logger.info("Cleared document metadata")
+            return True
+        
+        except Exception as e:
+            logger.error(f"Error clearing document metadata: {str(e)}")
+            return False
+    
     def save_chat_message(self, message: Dict[str, Any]) -> bool:
         """Save a chat message"""
         try:
-            # Load existing chat history
-            chat_history = self.load_chat_history()
-            
             # Add timestamp
             message["timestamp"] = datetime.now().isoformat()
             
-            # Add to history
-            chat_history.append(message)
-            
-            # Keep only last 1000 messages to prevent file from growing too large
-            if len(chat_history) > 1000:
-                chat_history = chat_history[-1000:]
-            
-            # Save back to file
-            with open(self.chat_history_file, 'w') as f:
-                json.dump(chat_history, f, indent=2)
+            # One line appended; old messages are rotated into the archive periodically
+            self.chat_log.append(message)
             
             return True
-            
+        
         except Exception as e:
             logger.error(f"Error saving chat message: {str(e)}")
             return False
@@ -100,11 +146,8 @@ class DocumentStore:
     def load_chat_history(self) -> List[Dict[str, Any]]:
         """Load chat history"""
         try:
-            if self.chat_history_file.exists():
-                with open(self.chat_history_file, 'r') as f:
-                    return json.load(f)
-            return []
-            
+            return self.chat_log.read_all()
+        
         except Exception as e:
             logger.error(f"Error loading chat history: {str(e)}")
             return []
@@ -112,12 +155,11 @@ class DocumentStore:
     def clear_chat_history(self) -> bool:
         """Clear all chat history"""
         try:
-            with open(self.chat_history_file, 'w') as f:
-                json.dump([], f)
+            self.chat_log.clear()
             
             logger.info("Cleared chat history")
             return True
-            
+        
         except Exception as e:
             logger.error(f"Error clearing chat history: {str(e)}")
             return False
@@ -125,9 +167,71 @@ class DocumentStore:
     def get_recent_chat_history(self, limit: int = 10) -> List[Dict[str, Any]]:
         """Get recent chat messages"""
         try:
-            history = self.load_chat_history()
-            return history[-limit:] if history else []
-            
+            return self.chat_log.tail(limit)
+        
         except Exception as e:
             logger.error(f"Error getting recent chat history: {str(e)}")
-            return []
\ No newline at end of file
+            return []
+    
+    def get_chat_history_page(self, before: Optional[str] = None, limit: int = 20) -> Dict[str, Any]:
+        """Get a page of chat messages saved before a cursor, oldest first
+        
+        Cursors are opaque strings from get_chat_history_cursor or a previous
+        page; before=None starts from the newest message. Pass the returned
+        next_cursor as before to fetch the page before it; next_cursor is None
+        once the oldest message has been returned.
+        """
+        try:
+            messages, next_cursor = self.chat_log.page(before, limit)
+            return {"messages": messages, "next_cursor": next_cursor}
+        
+        except Exception as e:
+            logger.error(f"Error getting chat history page: {str(e)}")
+            return {"messages": [], "next_cursor": None}
+    
+    def get_chat_history_cursor(self) -> Optional[str]:
+        """Get a cursor for paging back from the newest saved message, or None if there are none"""
+        try:
+            return self.chat_log.end_cursor()
+        
+        except Exception as e:
+            logger.error(f"Error getting chat history cursor: {str(e)}")
+            return None
+    
+    def search_chat_history(self, start: Optional[str] = None, end: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Get messages saved in [start, end), ISO timestamps, including archived ones"""
+        try:
+            return self.chat_log.search(start, end)
+        
+        except Exception as e:
+            logger.error(f"Error searching chat history: {str(e)}")
+            return []
+    
+    def _migrate_legacy_chat_history(self):
+        """Move messages from the old chat_history.json into the JSON Lines log once"""
+        legacy_file = Config.CHAT_HISTORY_DIR / "chat_history.json"
+        
+        if not legacy_file.exists() or self.chat_history_file.exists():
+            return
+        
+        try:
+            with open(legacy_file, 'r') as f:
+                messages = json.load(f)
+            
+            for message in messages:
+                self.chat_log.append(message)
+            
+            legacy_file.rename(legacy_file.with_suffix(".json.migrated"))
+            logger.info(f"Migrated {len(messages)} chat messages to {self.chat_history_file.name}")
+        
+        except Exception as e:
+            logger.error(f"Error migrating chat history: {str(e)}")
+
+
+def create_document_store():
+    """Create the document store for the configured backend"""
+    if Config.DOCUMENT_STORE_BACKEND == "sqlite":
+        from src.storage.sqlite_document_store import SQLiteDocumentStore
+        return SQLiteDocumentStore()
+    
+    return DocumentStore()
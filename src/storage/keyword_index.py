@@ -0,0 +1,346 @@
+# src/storage/keyword_index.py
+import gzip
+import json
+import logging
+import math
+import os
+import re
+import threading
+from contextlib import nullcontext
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple, Set, Any
+from src.utils.file_lock import file_lock
+
+logger = logging.getLogger(__name__)
+
+# Compound tokens such as part numbers ("ab-1234", "v2.1") are kept whole
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[-_./][a-z0-9]+)*")
+SUBTOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+class KeywordIndex:
+    """Inverted index with BM25 scoring for exact-token retrieval
+    
+    On disk the index is a gzip JSON snapshot plus an append-only journal of
+    the adds and removes made since; the journal is folded into a new
+    snapshot once it outgrows it. Writers hold a file lock and catch up with
+    other processes' changes before appending, and readers replay new
+    journal lines on their next search.
+    """
+    
+    FORMAT_VERSION = 1
+    # The journal is compacted once it is larger than this and the snapshot
+    JOURNAL_COMPACT_MIN_BYTES = 1024 * 1024
+    
+    def __init__(self, index_path: Optional[Path] = None, k1: float = 1.5, b: float = 0.75):
+        self.index_path = Path(index_path) if index_path else None
+        if self.index_path:
+            stem = self.index_path.name.split(".")[0]
+            self.journal_path = self.index_path.with_name(f"{stem}.journal.jsonl")
+            self.lock_path = self.index_path.with_name(f"{stem}.lock")
+        self.k1 = k1
+        self.b = b
+        
+        # term -> {chunk_id: term frequency}
+        self.postings: Dict[str, Dict[str, int]] = {}
+        # chunk_id -> {term: term frequency}, needed to unindex a chunk
+        self.doc_terms: Dict[str, Dict[str, int]] = {}
+        self.doc_lengths: Dict[str, int] = {}
+        self.total_length = 0
+        
+        self._lock = threading.RLock()
+        # Signature of the snapshot loaded and bytes of the journal applied on top of it
+        self._snapshot_signature = None
+        self._journal_offset = 0
+        self._stale_format = False
+        self._load()
+    
+    @staticmethod
+    def tokenize(text: str) -> List[str]:
+        """Split text into lowercase terms, adding the parts of compound tokens"""
+        tokens = []
+        for token in TOKEN_PATTERN.findall(text.lower()):
+            tokens.append(token)
+            parts = SUBTOKEN_PATTERN.findall(token)
+            if len(parts) > 1:
+                tokens.extend(parts)
+        return tokens
+    
+    def __len__(self) -> int:
+        return len(self.doc_lengths)
+    
+    def add(self, chunk_ids: List[str], texts: List[str]) -> None:
+        """Index chunks and append them to the journal"""
+        with self._lock, self._file_lock():
+            self.reload_if_changed()
+            
+            chunks = {}
+            for chunk_id, text in zip(chunk_ids, texts):
+                self._index_chunk(chunk_id, text)
+                chunks[chunk_id] = self.doc_terms[chunk_id]
+            self._append({"op": "add", "chunks": chunks})
+        
+        logger.info(f"Indexed {len(chunk_ids)} chunks for keyword search")
+    
+    def remove(self, chunk_ids: Iterable[str]) -> int:
+        """Remove chunks from the index and append the removal to the journal"""
+        removed = []
+        
+        with self._lock, self._file_lock():
+            self.reload_if_changed()
+            
+            for chunk_id in chunk_ids:
+                if self._unindex_chunk(chunk_id):
+                    removed.append(chunk_id)
+            if removed:
+                self._append({"op": "remove", "ids": removed})
+        
+        logger.info(f"Removed {len(removed)} chunks from keyword index")
+        return len(removed)
+    
+    def clear(self) -> None:
+        """Drop every indexed chunk"""
+        with self._lock, self._file_lock():
+            self.postings = {}
+            self.doc_terms = {}
+            self.doc_lengths = {}
+            self.total_length = 0
+            self._write_snapshot()
+    
+    def search(self, query: str, n_results: int = 5, candidate_ids: Optional[Set[str]] = None) -> List[Tuple[str, float]]:
+        """Return (chunk_id, bm25_score) pairs, best first
+        
+        With candidate_ids only those chunks are scored, so a metadata filter
+        applied by the caller does not eat into the top n_results.
+        """
+        self.reload_if_changed()
+        
+        with self._lock:
+            num_docs = len(self.doc_lengths)
+            if num_docs == 0:
+                return []
+            
+            avg_length = self.total_length / num_docs
+            scores: Dict[str, float] = {}
+            
+            for term in set(self.tokenize(query)):
+                postings = self.postings.get(term)
+                if not postings:
+                    continue
+                
+                df = len(postings)
+                idf = math.log(1 + (num_docs - df + 0.5) / (df + 0.5))
+                
+                for chunk_id, tf in postings.items():
+                    if candidate_ids is not None and chunk_id not in candidate_ids:
+                        continue
+                    length_norm = 1 - self.b + self.b * self.doc_lengths[chunk_id] / avg_length
+                    score = idf * tf * (self.k1 + 1) / (tf + self.k1 * length_norm)
+                    scores[chunk_id] = scores.get(chunk_id, 0.0) + score
+        
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        return ranked[:n_results]
+    
+    def save(self) -> bool:
+        """Fold the journal into a fresh gzip JSON snapshot"""
+        if not self.index_path:
+            return True
+        
+        with self._lock, self._file_lock():
+            self.reload_if_changed()
+            return self._write_snapshot()
+    
+    def reload_if_changed(self) -> None:
+        """Catch up with changes another process or store instance made on disk"""
+        if not self.index_path:
+            return
+        
+        with self._lock:
+            try:
+                if self._signature(self.index_path) != self._snapshot_signature:
+                    self._load()
+                elif not self._replay_journal():
+                    # The journal was compacted under us; start again from the new snapshot
+                    self._load()
+            except OSError as e:
+                logger.error(f"Error reloading keyword index: {str(e)}")
+    
+    def _file_lock(self):
+        """Cross-process lock held while changing the files"""
+        return file_lock(self.lock_path) if self.index_path else nullcontext()
+    
+    def _append(self, entry: Dict[str, Any]) -> None:
+        """Append a change to the journal, compacting it once it outgrows the snapshot (caller holds both locks)"""
+        if not self.index_path:
+            return
+        
+        try:
+            self.index_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.journal_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, separators=(",", ":")) + "\n")
+                f.flush()
+                self._journal_offset = f.tell()
+            
+            snapshot_size = self.index_path.stat().st_size if self.index_path.exists() else 0
+            if self._stale_format or self._journal_offset > max(self.JOURNAL_COMPACT_MIN_BYTES, snapshot_size):
+                self._write_snapshot()
+        
+        except Exception as e:
+            logger.error(f"Error writing keyword index journal: {str(e)}")
+    
+    def _write_snapshot(self) -> bool:
+        """Write the whole index as gzip-compressed JSON and empty the journal (caller holds both locks)"""
+        if not self.index_path:
+            return True
+        
+        try:
+            # Store a forward index against a shared vocabulary; postings
+            # are rebuilt on load, which keeps the file small
+            vocabulary: Dict[str, int] = {}
+            documents = {}
+            for chunk_id, terms in self.doc_terms.items():
+                encoded = []
+                for term, tf in terms.items():
+                    term_id = vocabulary.setdefault(term, len(vocabulary))
+                    encoded.extend((term_id, tf))
+                documents[chunk_id] = encoded
+            
+            payload = {
+                "version": self.FORMAT_VERSION,
+                "vocabulary": list(vocabulary),
+                "documents": documents,
+                "lengths": self.doc_lengths
+            }
+            
+            self.index_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.index_path.with_suffix(".tmp")
+            with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+                json.dump(payload, f, separators=(",", ":"))
+            os.replace(tmp_path, self.index_path)
+            
+            # Readers that loaded the old snapshot see the journal shrink and reload
+            open(self.journal_path, "w").close()
+            self._snapshot_signature = self._signature(self.index_path)
+            self._journal_offset = 0
+            self._stale_format = False
+            return True
+        
+        except Exception as e:
+            logger.error(f"Error saving keyword index: {str(e)}")
+            return False
+    
+    def _load(self) -> None:
+        """Load the snapshot, if present, and replay the journal on top of it"""
+        if not self.index_path:
+            return
+        
+        with self._lock:
+            self.postings = {}
+            self.doc_terms = {}
+            self.doc_lengths = {}
+            self.total_length = 0
+            self._snapshot_signature = None
+            self._journal_offset = 0
+            self._stale_format = False
+            
+            try:
+                if self.index_path.exists():
+                    signature = self._signature(self.index_path)
+                    with gzip.open(self.index_path, "rt", encoding="utf-8") as f:
+                        payload = json.load(f)
+                    
+                    self._snapshot_signature = signature
+                    if payload.get("version") != self.FORMAT_VERSION:
+                        # The next write replaces it with a snapshot in the current format
+                        logger.warning("Keyword index format changed, ignoring stored index")
+                        self._stale_format = True
+                        return
+                    
+                    vocabulary = payload["vocabulary"]
+                    self.doc_lengths = dict(payload["lengths"])
+                    self.total_length = sum(self.doc_lengths.values())
+                    
+                    for chunk_id, encoded in payload["documents"].items():
+                        terms = {vocabulary[encoded[i]]: encoded[i + 1] for i in range(0, len(encoded), 2)}
+                        self.doc_terms[chunk_id] = terms
+                        for term, tf in terms.items():
+                            self.postings.setdefault(term, {})[chunk_id] = tf
+                
+                self._replay_journal()
+                logger.info(f"Loaded keyword index with {len(self.doc_lengths)} chunks")
+            
+            except Exception as e:
+                logger.error(f"Error loading keyword index: {str(e)}")
+    
+    def _replay_journal(self) -> bool:
+        """Apply journal lines written since the last replay; False if the journal shrank"""
+        if not self.journal_path.exists():
+            return self._journal_offset == 0
+        
+        with open(self.journal_path, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            if f.tell() < self._journal_offset:
+                return False
+            
+            f.seek(self._journal_offset)
+            for line in f:
+                # A line without its newline is still being written
+                if not line.endswith(b"\n"):
+                    break
+                
+                entry = json.loads(line)
+                if entry["op"] == "add":
+                    for chunk_id, terms in entry["chunks"].items():
+                        self._index_terms(chunk_id, terms)
+                elif entry["op"] == "remove":
+                    for chunk_id in entry["ids"]:
+                        self._unindex_chunk(chunk_id)
+                
+                self._journal_offset += len(line)
+        
+        return True
+    
+    @staticmethod
+    def _signature(path: Path) -> Optional[Tuple[int, int, int]]:
+        """Modification time, size and inode of a file, or None if it does not exist"""
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size, stat.st_ino
+    
+    def _index_chunk(self, chunk_id: str, text: str) -> None:
+        """Add a single chunk to the in-memory index"""
+        terms: Dict[str, int] = {}
+        for token in self.tokenize(text):
+            terms[token] = terms.get(token, 0) + 1
+        
+        self._index_terms(chunk_id, terms)
+    
+    def _index_terms(self, chunk_id: str, terms: Dict[str, int]) -> None:
+        """Add a chunk's term frequencies to the in-memory index, replacing any earlier entry"""
+        self._unindex_chunk(chunk_id)
+        
+        length = sum(terms.values())
+        self.doc_terms[chunk_id] = terms
+        self.doc_lengths[chunk_id] = length
+        self.total_length += length
+        
+        for term, tf in terms.items():
+            self.postings.setdefault(term, {})[chunk_id] = tf
+    
+    def _unindex_chunk(self, chunk_id: str) -> bool:
+        """Remove a single chunk from the in-memory index"""
+        terms = self.doc_terms.pop(chunk_id, None)
+        if terms is None:
+            return False
+        
+        for term in terms:
+            postings = self.postings.get(term)
+            if postings is not None:
+                postings.pop(chunk_id, None)
+                if not postings:
+                    del self.postings[term]
+        
+        self.total_length -= self.doc_lengths.pop(chunk_id, 0)
+        return True
@@ -0,0 +1,386 @@
+# src/storage/sqlite_document_store.py
+import json
+import logging
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Iterator
+from src.config import Config
+from src.storage.chat_archive import get_chat_archive
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    name TEXT PRIMARY KEY,
+    added_at TEXT NOT NULL,
+    info TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS documents_added_at ON documents (added_at);
+
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp TEXT NOT NULL,
+    type TEXT,
+    body TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS messages_timestamp ON messages (timestamp);
+"""
+
+class SQLiteDocumentStore:
+    """Document metadata and chat history in SQLite, safe for concurrent sessions and processes
+    
+    Same public API as DocumentStore. WAL mode lets readers run alongside a
+    writer, and each write is a single short transaction instead of a full
+    file rewrite. Old chat messages are rotated into the same gzip archive
+    the JSON Lines log uses.
+    """
+    
+    _initialized_paths = set()
+    _init_lock = threading.Lock()
+    
+    def __init__(self, db_path: Path = None):
+        self.db_path = Path(db_path or Config.DOCUMENT_DB_PATH)
+        self.max_messages = Config.CHAT_HISTORY_MAX_MESSAGES
+        self.compact_slack = Config.CHAT_HISTORY_COMPACT_SLACK
+        self.archive = get_chat_archive(Config.CHAT_HISTORY_ARCHIVE_DIR)
+        
+        # Connections and batches are per thread; sqlite3 connections must not be shared
+        self._local = threading.local()
+        self._initialize()
+    
+    def _connection(self) -> sqlite3.Connection:
+        """Get this thread's connection"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.db_path), timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+    
+    def _initialize(self):
+        """Create the schema and import the JSON files once per database"""
+        with self._init_lock:
+            key = str(self.db_path.resolve())
+            if key in self._initialized_paths:
+                return
+            
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = self._connection()
+            conn.executescript(SCHEMA)
+            conn.commit()
+            
+            self._migrate_from_json()
+            self._initialized_paths.add(key)
+    
+    @contextmanager
+    def batch(self) -> Iterator[None]:
+        """Buffer document metadata saves during a bulk ingest and insert them in one transaction"""
+        self._local.pending = {}
+        try:
+            yield
+        finally:
+            pending, self._local.pending = self._local.pending, None
+            if pending:
+                self.save_documents_metadata(list(pending.values()))
+    
+    def save_document_metadata(self, document_info: Dict[str, Any]) -> bool:
+        """Save document metadata"""
+        pending = getattr(self._local, "pending", None)
+        if pending is not None:
+            document_info["added_at"] = datetime.now().isoformat()
+            pending[document_info["name"]] = document_info
+            return True
+        
+        return self.save_documents_metadata([document_info])
+    
+    def save_documents_metadata(self, document_infos: List[Dict[str, Any]]) -> bool:
+        """Save metadata for several documents in one transaction"""
+        try:
+            rows = []
+            for document_info in document_infos:
+                document_info.setdefault("added_at", datetime.now().isoformat())
+                rows.append((document_info["name"], document_info["added_at"], json.dumps(document_info)))
+            
+            conn = self._connection()
+            with conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO documents (name, added_at, info) VALUES (?, ?, ?)",
+                    rows
+                )
+            
+            logger.info(f"Saved metadata for documents: {', '.join(row[0] for row in rows)}")
+            return True
+        
+        except Exception as e:
+            logger.error(f"Error saving document metadata: {str(e)}")
+            return False
+    
+    def load_documents(self) -> Dict[str, Any]:
+        """Load all document metadata"""
+        try:
+            rows = self._connection().execute("SELECT name, info FROM documents ORDER BY added_at").fetchall()
+            documents = {name: json.loads(info) for name, info in rows}
+            
+            pending = getattr(self._local, "pending", None)
+            if pending:
+                documents.update(pending)
+            return documents
+        
+        except Exception as e:
+            logger.error(f"Error loading documents: {str(e)}")
+            return {}
+    
+    def has_document(self, document_name: str) -> bool:
+        """Check whether a document has metadata"""
+        try:
+            pending = getattr(self._local, "pending", None)
+            if pending and document_name in pending:
+                return True
+            return self._connection().execute(
+                "SELECT 1 FROM documents WHERE name = ?", (document_name,)
+            ).fetchone() is not None
+        
+        except Exception as e:
+            logger.error(f"Error checking document: {str(e)}")
+            return False
+    
+    def remove_document(self, document_name: str) -> bool:
+        """Remove document metadata"""
+        try:
+            conn = self._connection()
+            with conn:
+                removed = conn.execute("DELETE FROM documents WHERE name = ?", (document_name,)).rowcount
+            
+            if removed:
+                logger.info(f"Removed metadata for document: {document_name}")
+                return True
+            
+            logger.warning(f"Document not found: {document_name}")
+            return False
+        
+        except Exception as e:
+            logger.error(f"Error removing document: {str(e)}")
+            return False
+    
+    def clear_documents(self) -> bool:
+        """Remove all document metadata"""
+        try:
+            conn = self._connection()
+            with conn:
+                conn.execute("DELETE FROM documents")
+            
+            logger.info("Cleared document metadata")
+            return True
+        
+        except Exception as e:
+            logger.error(f"Error clearing document metadata: {str(e)}")
+            return False
+    
+    def save_chat_message(self, message: Dict[str, Any]) -> bool:
+        """Save a chat message"""
+        try:
+            message["timestamp"] = datetime.now().isoformat()
+            
+            conn = self._connection()
+            with conn:
+                message_id = conn.execute(
+                    "INSERT INTO messages (timestamp, type, body) VALUES (?, ?, ?)",
+                    (message["timestamp"], message.get("type"), json.dumps(message))
+                ).lastrowid
+            
+            # Rotate every compact_slack inserts rather than on every write
+            if self.compact_slack == 0 or message_id % self.compact_slack == 0:
+                self._rotate_messages()
+            
+            return True
+        
+        except Exception as e:
+            logger.error(f"Error saving chat message: {str(e)}")
+            return False
+    
+    def load_chat_history(self) -> List[Dict[str, Any]]:
+        """Load chat history"""
+        try:
+            rows = self._connection().execute("SELECT body FROM messages ORDER BY id").fetchall()
+            return [json.loads(body) for (body,) in rows]
+        
+        except Exception as e:
+            logger.error(f"Error loading chat history: {str(e)}")
+            return []
+    
+    def clear_chat_history(self) -> bool:
+        """Clear all chat history"""
+        try:
+            conn = self._connection()
+            with conn:
+                conn.execute("DELETE FROM messages")
+            self.archive.clear()
+            
+            logger.info("Cleared chat history")
+            return True
+        
+        except Exception as e:
+            logger.error(f"Error clearing chat history: {str(e)}")
+            return False
+    
+    def get_recent_chat_history(self, limit: int = 10) -> List[Dict[str, Any]]:
+        """Get recent chat messages"""
+        try:
+            rows = self._connection().execute(
+                "SELECT body FROM messages ORDER BY id DESC LIMIT ?", (limit,)
+            ).fetchall()
+            return [json.loads(body) for (body,) in reversed(rows)]
+        
+        except Exception as e:
+            logger.error(f"Error getting recent chat history: {str(e)}")
+            return []
+    
+    def get_chat_history_page(self, before: Optional[str] = None, limit: int = 20) -> Dict[str, Any]:
+        """Get a page of chat messages saved before a cursor, oldest first
+        
+        Cursors are opaque strings from get_chat_history_cursor or a previous
+        page; before=None starts from the newest message. "db:<id>" pages the
+        messages table by row id, which is unique and follows insertion order
+        like the archive, so messages sharing a timestamp are never skipped;
+        "archive:<position>" continues into rotated messages. Pass the returned
+        next_cursor as before to fetch the page before it; next_cursor is None
+        once the oldest message has been returned.
+        """
+        try:
+            rows = []
+            archive_position = None
+            if before is not None and before.startswith("archive:"):
+                archive_position = int(before[len("archive:"):])
+            else:
+                # One extra row tells whether an older page exists
+                before_id = int(before[len("db:"):]) if before is not None else None
+                rows = self._connection().execute(
+                    "SELECT id, body FROM messages WHERE ? IS NULL OR id < ? ORDER BY id DESC LIMIT ?",
+                    (before_id, before_id, limit + 1)
+                ).fetchall()
+                
+                if len(rows) > limit:
+                    rows = rows[:limit]
+                    return {
+                        "messages": [json.loads(body) for _, body in reversed(rows)],
+                        "next_cursor": f"db:{rows[-1][0]}"
+                    }
+            
+            # The rest of the page comes from messages rotated into the archive
+            messages = [json.loads(body) for _, body in reversed(rows)]
+            archived, start = self.archive.newest_before(archive_position, limit - len(messages))
+            messages = archived + messages
+            
+            return {
+                "messages": messages,
+                "next_cursor": f"archive:{start}" if start > 0 else None
+            }
+        
+        except Exception as e:
+            logger.error(f"Error getting chat history page: {str(e)}")
+            return {"messages": [], "next_cursor": None}
+    
+    def get_chat_history_cursor(self) -> Optional[str]:
+        """Get a cursor for paging back from the newest saved message, or None if there are none"""
+        try:
+            newest_id = self._connection().execute("SELECT MAX(id) FROM messages").fetchone()[0]
+            if newest_id is not None:
+                return f"db:{newest_id + 1}"
+            
+            archived = self.archive.count()
+            return f"archive:{archived}" if archived else None
+        
+        except Exception as e:
+            logger.error(f"Error getting chat history cursor: {str(e)}")
+            return None
+    
+    def search_chat_history(self, start: Optional[str] = None, end: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Get messages saved in [start, end), ISO timestamps, including archived ones"""
+        try:
+            rows = self._connection().execute(
+                "SELECT body FROM messages WHERE timestamp >= ? AND timestamp < ? ORDER BY timestamp, id",
+                (start or "", end or "\uffff")
+            ).fetchall()
+            return self.archive.search(start, end) + [json.loads(body) for (body,) in rows]
+        
+        except Exception as e:
+            logger.error(f"Error searching chat history: {str(e)}")
+            return []
+    
+    def _rotate_messages(self):
+        """Move all but the newest max_messages into the archive
+        
+        Holds the database write lock while archiving so two processes never
+        archive the same rows.
+        """
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = conn.execute(
+                "SELECT id, body FROM messages WHERE id <= (SELECT MAX(id) FROM messages) - ? ORDER BY id",
+                (self.max_messages,)
+            ).fetchall()
+            
+            if rows:
+                # Archive first: a failure before the delete duplicates messages instead of losing them
+                self.archive.append_segment([json.loads(body) for _, body in rows])
+                conn.execute("DELETE FROM messages WHERE id <= ?", (rows[-1][0],))
+            
+            conn.commit()
+        
+        except Exception:
+            conn.rollback()
+            raise
+    
+    def _migrate_from_json(self):
+        """Import documents.json and the chat log into an empty database, keeping the files as backups"""
+        conn = self._connection()
+        has_documents = conn.execute("SELECT 1 FROM documents LIMIT 1").fetchone()
+        has_messages = conn.execute("SELECT 1 FROM messages LIMIT 1").fetchone()
+        
+        documents_file = Config.CHAT_HISTORY_DIR / "documents.json"
+        if documents_file.exists() and not has_documents:
+            try:
+                with open(documents_file, 'r') as f:
+                    documents = json.load(f)
+                
+                self.save_documents_metadata(list(documents.values()))
+                documents_file.rename(documents_file.with_suffix(".json.migrated"))
+                logger.info(f"Migrated {len(documents)} documents to {self.db_path.name}")
+            
+            except Exception as e:
+                logger.error(f"Error migrating document metadata: {str(e)}")
+        
+        for history_file in [Config.CHAT_HISTORY_DIR / "chat_history.jsonl", Config.CHAT_HISTORY_DIR / "chat_history.json"]:
+            if not history_file.exists() or has_messages:
+                continue
+            
+            try:
+                messages = self._read_history_file(history_file)
+                with conn:
+                    conn.executemany(
+                        "INSERT INTO messages (timestamp, type, body) VALUES (?, ?, ?)",
+                        [
+                            (message.get("timestamp", ""), message.get("type"), json.dumps(message))
+                            for message in messages
+                        ]
+                    )
+                
+                history_file.rename(history_file.with_suffix(history_file.suffix + ".migrated"))
+                logger.info(f"Migrated {len(messages)} chat messages to {self.db_path.name}")
+                has_messages = bool(messages)
+            
+            except Exception as e:
+                logger.error(f"Error migrating chat history: {str(e)}")
+    
+    @staticmethod
+    def _read_history_file(history_file: Path) -> List[Dict[str, Any]]:
+        """Read a JSON array or JSON Lines chat history file"""
+        with open(history_file, 'r') as f:
+            if history_file.suffix == ".json":
+                return json.load(f)
+            return [json.loads(line) for line in f if line.strip()]
@@ -1,9 +1,17 @@
 # src/storage/vector_store.py
 import logging
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Optional, Tuple, Callable
 import chromadb
 from chromadb.config import Settings
 from src.config import Config
+from src.storage.keyword_index import KeywordIndex
+from src.models.embedding_handler import EmbeddingHandler
+from src.utils.metrics import get_histogram
+from src.utils.tracing import traced, annotate, span
+from src.utils.file_lock import file_lock
+import os
+import threading
+import time
 import uuid
 import json
 
@@ -12,12 +20,23 @@ logger = logging.getLogger(__name__)
 class VectorStore:
     """Handle ChromaDB vector storage operations"""
     
+    # Callbacks run after any instance in this process changes the collection
+    _change_listeners: List[Callable[[str, Optional[List[str]], int], None]] = []
+    
+    # Generation of in-memory collections, which never outlive the process
+    _memory_generation = 0
+    _memory_generation_lock = threading.Lock()
+    
     def __init__(self, storage_type: str = None):
         self.storage_type = storage_type or Config.STORAGE_TYPE
         self.collection_name = "pdf_documents"
         self.client = None
         self.collection = None
+        self.keyword_index = None
+        # Bumped on every change; persisted so other processes can tell their caches are stale
+        self.generation_path = Config.VECTOR_DB_PATH / "collection_generation" if self.storage_type != "memory" else None
         self._initialize_client()
+        self._initialize_keyword_index()
     
     def _initialize_client(self):
         """Initialize ChromaDB client based on storage type"""
@@ -38,11 +57,66 @@ class VectorStore:
             )
             
             logger.info(f"Initialized collection: {self.collection_name}")
-            
+        
         except Exception as e:
             logger.error(f"Error initializing ChromaDB client: {str(e)}")
             raise
     
+    def _initialize_keyword_index(self):
+        """Load the keyword index, rebuilding it from the collection if missing"""
+        index_path = Config.KEYWORD_INDEX_PATH if self.storage_type != "memory" else None
+        self.keyword_index = KeywordIndex(index_path)
+        
+        try:
+            count = self.collection.count()
+            if count > 0 and len(self.keyword_index) == 0:
+                logger.info(f"Building keyword index for {count} existing chunks")
+                existing = self.collection.get(include=["documents"])
+                self.keyword_index.add(existing["ids"], existing["documents"])
+        
+        except Exception as e:
+            logger.error(f"Error building keyword index: {str(e)}")
+    
+    @classmethod
+    def add_change_listener(cls, callback: Callable[[str, Optional[List[str]], int], None]):
+        """Register a callback(event, document_names, generation) for add/delete/clear events"""
+        if callback not in cls._change_listeners:
+            cls._change_listeners.append(callback)
+    
+    def get_generation(self) -> int:
+        """Counter bumped by every change to the collection, by any process sharing it"""
+        if not self.generation_path:
+            return self._memory_generation
+        
+        try:
+            return int(self.generation_path.read_text() or 0)
+        except (FileNotFoundError, ValueError):
+            return 0
+    
+    def _bump_generation(self) -> int:
+        """Advance the generation counter and return the new value"""
+        if not self.generation_path:
+            with VectorStore._memory_generation_lock:
+                VectorStore._memory_generation += 1
+                return VectorStore._memory_generation
+        
+        with file_lock(self.generation_path.with_suffix(".lock")):
+            generation = self.get_generation() + 1
+            temp_path = self.generation_path.with_suffix(".tmp")
+            temp_path.write_text(str(generation))
+            os.replace(temp_path, self.generation_path)
+            return generation
+    
+    def _notify_change(self, event: str, document_names: Optional[List[str]] = None):
+        """Bump the generation and tell registered listeners that the collection changed"""
+        generation = self._bump_generation()
+        for callback in list(self._change_listeners):
+            try:
+                callback(event, document_names, generation)
+            except Exception as e:
+                logger.error(f"Error in vector store change listener: {str(e)}")
+    
+    @traced("vector_store.add")
     def add_documents(self, chunks: List[Dict[str, Any]]) -> bool:
         """Add document chunks to the vector store"""
         if not chunks:
@@ -69,20 +143,40 @@ class VectorStore:
                 flat_metadata = self._flatten_metadata(metadata)
                 metadatas.append(flat_metadata)
             
+            # Embed explicitly (same model the collection uses) so embedding and index insert are timed apart
+            stage_start = time.perf_counter()
+            embeddings = EmbeddingHandler().embed_texts(documents)
+            if embeddings is None:
+                return False
+            get_histogram("ingest.embed_ms").record((time.perf_counter() - stage_start) * 1000)
+            
             # Add to collection
-            self.collection.add(
-                documents=documents,
-                metadatas=metadatas,
-                ids=ids
+            stage_start = time.perf_counter()
+            with span("vector_store.insert", chunks=len(ids)):
+                self.collection.add(
+                    documents=documents,
+                    embeddings=embeddings,
+                    metadatas=metadatas,
+                    ids=ids
+                )
+            get_histogram("ingest.insert_ms").record((time.perf_counter() - stage_start) * 1000)
+            
+            # Keep the keyword index in step with the collection
+            self.keyword_index.add(ids, documents)
+            self._notify_change(
+                "add",
+                sorted({metadata.get("document_name", "Unknown") for metadata in metadatas})
             )
             
+            annotate(chunks=len(chunks))
             logger.info(f"Added {len(chunks)} chunks to vector store")
             return True
-            
+        
         except Exception as e:
             logger.error(f"Error adding documents to vector store: {str(e)}")
             return False
     
+    @traced("vector_store.search")
     def search(self, query: str, n_results: int = 5, filter_metadata: Dict = None) -> List[Dict[str, Any]]:
         """Search for similar documents"""
         try:
@@ -106,13 +200,95 @@ class VectorStore:
                     }
                     formatted_results.append(result)
             
+            annotate(n_results=n_results, results=len(formatted_results))
             logger.info(f"Found {len(formatted_results)} results for query")
             return formatted_results
-            
+        
         except Exception as e:
             logger.error(f"Error searching vector store: {str(e)}")
             return []
     
+    @traced("vector_store.search")
+    def search_by_embedding(self, query_embedding: List[float], n_results: int = 5,
+                            filter_metadata: Dict = None, include_embeddings: bool = False) -> List[Dict[str, Any]]:
+        """Search with a precomputed query embedding, optionally returning chunk embeddings"""
+        try:
+            include = ["documents", "metadatas", "distances"]
+            if include_embeddings:
+                include.append("embeddings")
+            
+            results = self.collection.query(
+                query_embeddings=[query_embedding],
+                n_results=n_results,
+                where=filter_metadata,
+                include=include
+            )
+            
+            # Format results
+            formatted_results = []
+            
+            if results['documents'] and results['documents'][0]:
+                for i in range(len(results['documents'][0])):
+                    result = {
+                        "id": results['ids'][0][i],
+                        "text": results['documents'][0][i],
+                        "metadata": results['metadatas'][0][i],
+                        "distance": results['distances'][0][i] if results.get('distances') else None
+                    }
+                    if include_embeddings:
+                        result["embedding"] = results['embeddings'][0][i]
+                    formatted_results.append(result)
+            
+            annotate(n_results=n_results, results=len(formatted_results))
+            logger.info(f"Found {len(formatted_results)} results for query embedding")
+            return formatted_results
+        
+        except Exception as e:
+            logger.error(f"Error searching vector store by embedding: {str(e)}")
+            return []
+    
+    @traced("vector_store.keyword_search")
+    def keyword_search(self, query: str, n_results: int = 5, filter_metadata: Dict = None) -> List[Dict[str, Any]]:
+        """Search chunks by BM25 keyword score"""
+        try:
+            # Restrict scoring to chunks that pass the filter, so filtering does not cut into the top n_results
+            candidate_ids = None
+            if filter_metadata:
+                candidate_ids = set(self.collection.get(where=filter_metadata, include=[])["ids"])
+            
+            ranked = self.keyword_index.search(query, n_results, candidate_ids)
+            
+            if not ranked:
+                return []
+            
+            scores = dict(ranked)
+            results = self.collection.get(
+                ids=list(scores),
+                include=["documents", "metadatas"]
+            )
+            
+            # Format results, restoring BM25 order
+            formatted_results = []
+            
+            for i, chunk_id in enumerate(results['ids']):
+                formatted_results.append({
+                    "id": chunk_id,
+                    "text": results['documents'][i],
+                    "metadata": results['metadatas'][i],
+                    "distance": None,
+                    "keyword_score": scores[chunk_id]
+                })
+            
+            formatted_results.sort(key=lambda result: result["keyword_score"], reverse=True)
+            
+            annotate(n_results=n_results, results=len(formatted_results))
+            logger.info(f"Found {len(formatted_results)} keyword results for query")
+            return formatted_results
+        
+        except Exception as e:
+            logger.error(f"Error during keyword search: {str(e)}")
+            return []
+    
     def delete_by_document(self, document_name: str) -> bool:
         """Delete all chunks from a specific document"""
         try:
@@ -126,12 +302,14 @@ class VectorStore:
             if results['ids'] and results['ids'][0]:
                 ids_to_delete = results['ids'][0]
                 self.collection.delete(ids=ids_to_delete)
+                self.keyword_index.remove(ids_to_delete)
+                self._notify_change("delete", [document_name])
                 logger.info(f"Deleted {len(ids_to_delete)} chunks from document: {document_name}")
                 return True
             else:
                 logger.info(f"No chunks found for document: {document_name}")
                 return True
-                
+        
         except Exception as e:
             logger.error(f"Error deleting document chunks: {str(e)}")
             return False
@@ -160,7 +338,7 @@ class VectorStore:
                 "unique_documents": len(documents),
                 "document_names": list(documents)
             }
-            
+        
         except Exception as e:
             logger.error(f"Error getting collection info: {str(e)}")
             return {"error": str(e)}
@@ -174,9 +352,11 @@ class VectorStore:
                 name=self.collection_name,
                 metadata={"description": "PDF document chunks for RAG"}
             )
+            self.keyword_index.clear()
+            self._notify_change("clear")
             logger.info("Cleared all documents from collection")
             return True
-            
+        
         except Exception as e:
             logger.error(f"Error clearing collection: {str(e)}")
             return False
@@ -1,5 +1,44 @@
 # src/utils/__init__.py
 
 from .logger import setup_logging
+from .tokens import count_tokens, truncate_to_tokens
+from .metrics import (
+    LatencyHistogram, ThroughputMeter, SlowRequestLog,
+    get_histogram, get_histograms, get_throughput, get_slow_request_log
+)
+from .concurrency import ConcurrencyLimiter, get_concurrency_limiter
+from .resilience import CircuitBreaker, get_circuit_breaker, backoff_delay, parse_retry_after
+from .tracing import (
+    Span, span, start_span, activate, traced, annotate, trace_stream, run_in_context,
+    current_span, current_request_id, get_trace_exporter
+)
 
-__all__ = ["setup_logging"]
\ No newline at end of file
+__all__ = [
+    "setup_logging",
+    "count_tokens",
+    "truncate_to_tokens",
+    "LatencyHistogram",
+    "get_histogram",
+    "get_histograms",
+    "ThroughputMeter",
+    "SlowRequestLog",
+    "get_throughput",
+    "get_slow_request_log",
+    "ConcurrencyLimiter",
+    "get_concurrency_limiter",
+    "CircuitBreaker",
+    "get_circuit_breaker",
+    "backoff_delay",
+    "parse_retry_after",
+    "Span",
+    "span",
+    "start_span",
+    "activate",
+    "traced",
+    "annotate",
+    "trace_stream",
+    "run_in_context",
+    "current_span",
+    "current_request_id",
+    "get_trace_exporter"
+]
\ No newline at end of file
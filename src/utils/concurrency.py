@@ -0,0 +1,99 @@
+# src/utils/concurrency.py
+import logging
+import threading
+import time
+from collections import deque
+from typing import Dict, Any, Optional
+from src.utils.metrics import get_histogram
+
+logger = logging.getLogger(__name__)
+
+class ConcurrencyLimiter:
+    """Cap in-flight requests to a backend, with a bounded FIFO wait queue"""
+    
+    def __init__(self, name: str, max_concurrent: int, max_queue: int):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        # One event per waiting caller, oldest first; release() hands its slot to the head
+        self._waiters: "deque[threading.Event]" = deque()
+        
+        self.rejected = 0
+        self.timed_out = 0
+        self.wait_histogram = get_histogram(f"{name}.queue_wait_ms")
+    
+    def acquire(self, timeout: Optional[float] = None) -> bool:
+        """Take a slot, waiting in line up to timeout seconds
+        
+        Returns False straight away when the queue is full, or after timeout.
+        """
+        start_time = time.perf_counter()
+        
+        with self._lock:
+            if self._in_flight < self.max_concurrent and not self._waiters:
+                self._in_flight += 1
+                self.wait_histogram.record(0.0)
+                return True
+            
+            if len(self._waiters) >= self.max_queue:
+                self.rejected += 1
+                logger.warning(
+                    f"{self.name} is busy ({self._in_flight} in flight, {len(self._waiters)} queued), rejecting request"
+                )
+                return False
+            
+            turn = threading.Event()
+            self._waiters.append(turn)
+        
+        granted = turn.wait(timeout)
+        
+        with self._lock:
+            if not granted and not turn.is_set():
+                self._waiters.remove(turn)
+                self.timed_out += 1
+                logger.warning(f"Gave up waiting for {self.name} after {timeout:.0f}s")
+                return False
+        
+        self.wait_histogram.record((time.perf_counter() - start_time) * 1000)
+        return True
+    
+    def release(self) -> None:
+        """Return a slot, passing it to the longest-waiting caller if any"""
+        with self._lock:
+            if self._waiters:
+                # The slot changes hands without ever being free, so newcomers cannot jump the queue
+                self._waiters.popleft().set()
+            else:
+                self._in_flight -= 1
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get current load, rejections and queue wait percentiles"""
+        with self._lock:
+            stats = {
+                "in_flight": self._in_flight,
+                "queued": len(self._waiters),
+                "max_concurrent": self.max_concurrent,
+                "max_queue": self.max_queue,
+                "rejected": self.rejected,
+                "timed_out": self.timed_out
+            }
+        
+        wait = self.wait_histogram.snapshot()
+        stats["wait_p50_ms"] = wait["p50"]
+        stats["wait_p95_ms"] = wait["p95"]
+        return stats
+
+# Limits only work if every session in the process shares them
+_limiters: Dict[str, ConcurrencyLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_concurrency_limiter(name: str, max_concurrent: int, max_queue: int) -> ConcurrencyLimiter:
+    """Return the process-wide limiter for a name, creating it on first use"""
+    with _limiters_lock:
+        if name not in _limiters:
+            _limiters[name] = ConcurrencyLimiter(name, max_concurrent, max_queue)
+        return _limiters[name]
@@ -4,6 +4,7 @@ import logging
 import sys
 from pathlib import Path
 from src.config import Config
+from src.utils.tracing import RequestIdFilter
 
 def setup_logging(level: str = "INFO") -> logging.Logger:
     """Setup application logging"""
@@ -17,8 +18,10 @@ def setup_logging(level: str = "INFO") -> logging.Logger:
     
     # Create formatter
     formatter = logging.Formatter(
-        '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+        '%(asctime)s - %(name)s - %(levelname)s - [%(request_id)s] %(message)s'
     )
+    # Tag each line with the tracing request ID so it can be matched to its trace
+    request_id_filter = RequestIdFilter()
     
     # Setup root logger
     root_logger = logging.getLogger()
@@ -32,12 +35,14 @@ def setup_logging(level: str = "INFO") -> logging.Logger:
     console_handler = logging.StreamHandler(sys.stdout)
     console_handler.setLevel(log_level)
     console_handler.setFormatter(formatter)
+    console_handler.addFilter(request_id_filter)
     root_logger.addHandler(console_handler)
     
     # File handler
     file_handler = logging.FileHandler(log_dir / "app.log")
     file_handler.setLevel(log_level)
     file_handler.setFormatter(formatter)
+    file_handler.addFilter(request_id_filter)
     root_logger.addHandler(file_handler)
     
     # Suppress some noisy loggers
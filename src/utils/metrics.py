@@ -0,0 +1,139 @@
+# src/utils/metrics.py
+import math
+import threading
+import time
+from collections import deque
+from typing import Dict, Any, Optional, List
+
+# Recent samples kept per histogram; old ones fall out so percentiles follow current load
+DEFAULT_WINDOW = 500
+
+class LatencyHistogram:
+    """Sliding window of latency samples with percentile queries"""
+    
+    def __init__(self, window: int = DEFAULT_WINDOW):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.total_count = 0
+    
+    def record(self, value_ms: float) -> None:
+        """Add a sample in milliseconds"""
+        with self._lock:
+            self._samples.append(value_ms)
+            self.total_count += 1
+    
+    def count(self) -> int:
+        """Number of samples in the window"""
+        with self._lock:
+            return len(self._samples)
+    
+    def percentile(self, p: float) -> Optional[float]:
+        """Nearest-rank percentile of the window, or None without samples"""
+        with self._lock:
+            samples = sorted(self._samples)
+        
+        if not samples:
+            return None
+        
+        rank = max(1, math.ceil(p / 100 * len(samples)))
+        return samples[rank - 1]
+    
+    def snapshot(self) -> Dict[str, Any]:
+        """Get the sample count and common percentiles"""
+        return {
+            "count": self.count(),
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99)
+        }
+
+class ThroughputMeter:
+    """Sliding window of (amount, seconds) pairs, e.g. chunks embedded per document"""
+    
+    def __init__(self, window: int = DEFAULT_WINDOW):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.total_amount = 0
+    
+    def record(self, amount: float, seconds: float) -> None:
+        """Add amount units of work that took seconds"""
+        with self._lock:
+            self._samples.append((amount, seconds))
+            self.total_amount += amount
+    
+    def snapshot(self) -> Dict[str, Any]:
+        """Get the samples in the window and their combined rate per busy second"""
+        with self._lock:
+            amount = sum(sample[0] for sample in self._samples)
+            seconds = sum(sample[1] for sample in self._samples)
+            count = len(self._samples)
+        
+        return {
+            "count": count,
+            "amount": amount,
+            "total_amount": self.total_amount,
+            "rate": amount / seconds if seconds > 0 else None
+        }
+
+class SlowRequestLog:
+    """The most recent requests that crossed a latency threshold, newest first"""
+    
+    def __init__(self, max_entries: int = 20):
+        self._entries = deque(maxlen=max_entries)
+        self._lock = threading.Lock()
+    
+    def record(self, kind: str, label: str, duration_ms: float, timings: Optional[Dict[str, float]] = None,
+               request_id: Optional[str] = None) -> None:
+        """Remember a slow request with its per-stage timings and trace request ID"""
+        with self._lock:
+            self._entries.appendleft({
+                "time": time.strftime("%H:%M:%S"),
+                "kind": kind,
+                "label": label,
+                "duration_ms": duration_ms,
+                "timings": dict(timings or {}),
+                "request_id": request_id
+            })
+    
+    def recent(self) -> List[Dict[str, Any]]:
+        """Get the logged requests, newest first"""
+        with self._lock:
+            return list(self._entries)
+
+# Histograms are process-wide so they survive Streamlit reruns
+_histograms: Dict[str, LatencyHistogram] = {}
+_histograms_lock = threading.Lock()
+
+
+def get_histogram(name: str) -> LatencyHistogram:
+    """Return the process-wide histogram for a name, creating it on first use"""
+    with _histograms_lock:
+        if name not in _histograms:
+            _histograms[name] = LatencyHistogram()
+        return _histograms[name]
+
+
+def get_histograms() -> Dict[str, LatencyHistogram]:
+    """Get every registered histogram by name"""
+    with _histograms_lock:
+        return dict(_histograms)
+
+
+_throughputs: Dict[str, ThroughputMeter] = {}
+_throughputs_lock = threading.Lock()
+
+
+def get_throughput(name: str) -> ThroughputMeter:
+    """Return the process-wide throughput meter for a name, creating it on first use"""
+    with _throughputs_lock:
+        if name not in _throughputs:
+            _throughputs[name] = ThroughputMeter()
+        return _throughputs[name]
+
+
+_slow_requests = SlowRequestLog()
+
+
+def get_slow_request_log() -> SlowRequestLog:
+    """Return the process-wide log of slow requests"""
+    return _slow_requests
@@ -0,0 +1,118 @@
+# src/utils/resilience.py
+import email.utils
+import logging
+import random
+import threading
+import time
+from typing import Dict, Any, Optional, Mapping
+
+logger = logging.getLogger(__name__)
+
+def parse_retry_after(headers: Optional[Mapping[str, str]]) -> Optional[float]:
+    """Seconds to wait according to Retry-After (seconds or HTTP date) or retry-after-ms headers"""
+    if not headers:
+        return None
+    
+    retry_after_ms = headers.get("retry-after-ms")
+    if retry_after_ms:
+        try:
+            return max(0.0, float(retry_after_ms) / 1000)
+        except ValueError:
+            pass
+    
+    retry_after = headers.get("retry-after")
+    if not retry_after:
+        return None
+    
+    try:
+        return max(0.0, float(retry_after))
+    except ValueError:
+        pass
+    
+    try:
+        retry_at = email.utils.parsedate_to_datetime(retry_after)
+        return max(0.0, retry_at.timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+def backoff_delay(attempt: int, base_delay: float, max_delay: float) -> float:
+    """Exponential backoff with full jitter for the given zero-based retry attempt"""
+    return random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+
+class CircuitBreaker:
+    """Stop sending requests to a backend after repeated consecutive failures
+    
+    After failure_threshold failures in a row the breaker opens and rejects
+    requests for reset_timeout seconds. It then goes half-open: requests are
+    let through, the next success closes it and the next failure reopens it.
+    """
+    
+    def __init__(self, name: str, failure_threshold: int, reset_timeout: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self.times_opened = 0
+    
+    @property
+    def state(self) -> str:
+        """'closed', 'open' or 'half_open'"""
+        with self._lock:
+            return self._state()
+    
+    def allow_request(self) -> bool:
+        """Check whether a request may be sent"""
+        return self.state != "open"
+    
+    def record_success(self) -> None:
+        """Reset the failure count and close the breaker"""
+        with self._lock:
+            if self._opened_at is not None:
+                logger.info(f"Circuit for {self.name} closed")
+            self._failures = 0
+            self._opened_at = None
+    
+    def record_failure(self) -> None:
+        """Count a failure, opening (or reopening) the breaker at the threshold"""
+        with self._lock:
+            self._failures += 1
+            
+            if self._state() == "half_open" or (self._opened_at is None and self._failures >= self.failure_threshold):
+                self._opened_at = time.monotonic()
+                self.times_opened += 1
+                logger.warning(
+                    f"Circuit for {self.name} opened after {self._failures} consecutive failures, "
+                    f"pausing requests for {self.reset_timeout:.0f}s"
+                )
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get the state, current failure streak and how often the breaker opened"""
+        with self._lock:
+            return {
+                "state": self._state(),
+                "consecutive_failures": self._failures,
+                "times_opened": self.times_opened
+            }
+    
+    def _state(self) -> str:
+        """Current state (caller holds the lock)"""
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at < self.reset_timeout:
+            return "open"
+        return "half_open"
+
+# Breakers are shared by every handler instance in the process
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(name: str, failure_threshold: int, reset_timeout: float) -> CircuitBreaker:
+    """Return the process-wide circuit breaker for a name, creating it on first use"""
+    with _breakers_lock:
+        if name not in _breakers:
+            _breakers[name] = CircuitBreaker(name, failure_threshold, reset_timeout)
+        return _breakers[name]
@@ -0,0 +1,32 @@
+# src/utils/tokens.py
+import re
+
+# Words and individual punctuation marks, the units BPE tokenizers start from
+TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+# Subword tokenizers split long words; about one token per this many characters
+CHARS_PER_WORD_TOKEN = 6
+
+def count_tokens(text: str) -> int:
+    """Estimate the number of LLM tokens in text without loading a tokenizer"""
+    if not text:
+        return 0
+    
+    return sum(
+        (len(piece) + CHARS_PER_WORD_TOKEN - 1) // CHARS_PER_WORD_TOKEN
+        for piece in TOKEN_PATTERN.findall(text)
+    )
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cut text so that count_tokens(result) <= max_tokens"""
+    if max_tokens <= 0:
+        return ""
+    
+    tokens = 0
+    for match in TOKEN_PATTERN.finditer(text):
+        piece_tokens = (len(match.group()) + CHARS_PER_WORD_TOKEN - 1) // CHARS_PER_WORD_TOKEN
+        if tokens + piece_tokens > max_tokens:
+            return text[:match.start()].rstrip()
+        tokens += piece_tokens
+    
+    return text
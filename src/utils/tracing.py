@@ -0,0 +1,234 @@
+# src/utils/tracing.py
+"""Lightweight tracing spans for the ingest and query pipelines.
+
+    with span("retriever.search", k=k):
+        ...
+        annotate(results=len(results))
+
+Spans nest through a context variable, so a span opened while another is
+current becomes its child and shares its request ID. Finished spans are
+appended to Config.TRACE_FILE as JSON Lines: one Chrome trace event object
+per line, with no enclosing array, so every line parses on its own and
+`grep <request_id>` pulls out a single request. Trace viewers expect a JSON
+array of events; `jq -s . traces.jsonl > trace.json` gives one that
+ui.perfetto.dev and chrome://tracing open.
+"""
+import contextvars
+import functools
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Any, Optional, Iterator, Callable
+from src.config import Config
+
+logger = logging.getLogger(__name__)
+
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("current_span", default=None)
+
+class Span:
+    """One timed operation within a request"""
+    
+    def __init__(self, name: str, parent: Optional["Span"] = None, request_id: Optional[str] = None,
+                 attributes: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.parent_id = parent.span_id if parent else None
+        self.request_id = parent.request_id if parent else (request_id or uuid.uuid4().hex[:16])
+        self.span_id = uuid.uuid4().hex[:8]
+        self.attributes = dict(attributes or {})
+        self.thread_id = threading.get_native_id()
+        self.start_us = time.time_ns() // 1000
+        self._start = time.perf_counter()
+        self.duration_ms: Optional[float] = None
+    
+    def set(self, **attributes) -> None:
+        """Attach sizes, counts or outcomes to the span"""
+        self.attributes.update(attributes)
+    
+    def end(self) -> None:
+        """Finish the span and export it; later calls do nothing"""
+        if self.duration_ms is not None:
+            return
+        
+        self.duration_ms = (time.perf_counter() - self._start) * 1000
+        get_trace_exporter().export(self)
+    
+    def to_event(self) -> Dict[str, Any]:
+        """Chrome trace event ("complete" phase) for the finished span"""
+        return {
+            "name": self.name,
+            "cat": self.name.split(".")[0],
+            "ph": "X",
+            "ts": self.start_us,
+            "dur": round(self.duration_ms * 1000),
+            "pid": os.getpid(),
+            "tid": self.thread_id,
+            "args": {
+                "request_id": self.request_id,
+                "span_id": self.span_id,
+                "parent_id": self.parent_id,
+                **self.attributes
+            }
+        }
+
+class TraceExporter:
+    """Append finished spans to a JSON Lines trace-event file, rotating it at max_bytes"""
+    
+    def __init__(self, trace_path: Path, max_bytes: int, enabled: bool = True):
+        self.trace_path = Path(trace_path)
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self._file = None
+        self._lock = threading.Lock()
+    
+    def export(self, span: Span) -> None:
+        """Write one span; the file is flushed when a request's root span ends"""
+        if not self.enabled:
+            return
+        
+        line = json.dumps(span.to_event(), ensure_ascii=False, default=str) + "\n"
+        
+        try:
+            with self._lock:
+                if self._file is None:
+                    self._open()
+                elif self._file.tell() > self.max_bytes:
+                    self._rotate()
+                
+                self._file.write(line)
+                if span.parent_id is None:
+                    self._file.flush()
+        
+        except Exception as e:
+            # Tracing must never break the request it observes
+            logger.error(f"Error writing trace to {self.trace_path}: {str(e)}")
+    
+    def _open(self):
+        """Open the trace file for appending"""
+        self.trace_path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.trace_path, "a", encoding="utf-8")
+    
+    def _rotate(self):
+        """Keep one previous file so the current one stays small enough to open in a viewer"""
+        self._file.close()
+        os.replace(self.trace_path, self.trace_path.with_suffix(".1" + self.trace_path.suffix))
+        self._open()
+    
+    def flush(self) -> None:
+        """Write out buffered spans"""
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+
+_exporter: Optional[TraceExporter] = None
+_exporter_lock = threading.Lock()
+
+
+def get_trace_exporter() -> TraceExporter:
+    """Return the process-wide trace exporter"""
+    global _exporter
+    
+    with _exporter_lock:
+        if _exporter is None:
+            _exporter = TraceExporter(Config.TRACE_FILE, Config.TRACE_MAX_BYTES, Config.TRACING_ENABLED)
+        return _exporter
+
+
+def current_span() -> Optional[Span]:
+    """The span of the operation in progress, if any"""
+    return _current_span.get()
+
+
+def current_request_id() -> Optional[str]:
+    """The request ID of the operation in progress, if any"""
+    active = _current_span.get()
+    return active.request_id if active else None
+
+
+def start_span(name: str, request_id: Optional[str] = None, **attributes) -> Span:
+    """Start a child of the current span (or a new request) without making it current
+    
+    For work that outlives the calling frame, such as a stream; pair with
+    activate() or trace_stream() and end() it when done.
+    """
+    return Span(name, parent=_current_span.get(), request_id=request_id, attributes=attributes)
+
+
+@contextmanager
+def activate(active: Span) -> Iterator[Span]:
+    """Make a started span current for the duration of the block"""
+    token = _current_span.set(active)
+    try:
+        yield active
+    finally:
+        _current_span.reset(token)
+
+
+@contextmanager
+def span(name: str, request_id: Optional[str] = None, **attributes) -> Iterator[Span]:
+    """Time the block as a span, a child of the current one if any"""
+    active = start_span(name, request_id, **attributes)
+    try:
+        with activate(active):
+            yield active
+    except BaseException as e:
+        active.set(error=f"{type(e).__name__}: {str(e)}")
+        raise
+    finally:
+        active.end()
+
+
+def traced(name: str) -> Callable:
+    """Decorator running each call of a function in a span"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def annotate(**attributes) -> None:
+    """Attach attributes to the current span, if any"""
+    active = _current_span.get()
+    if active is not None:
+        active.set(**attributes)
+
+
+def trace_stream(active: Span, stream: Iterator) -> Iterator:
+    """Relay a stream, making the span current while the stream runs and ending it when done
+    
+    The span is only current inside each step, so the consumer's own spans
+    between pieces are not mistaken for children of the stream.
+    """
+    try:
+        while True:
+            with activate(active):
+                try:
+                    piece = next(stream)
+                except StopIteration:
+                    return
+            yield piece
+    
+    finally:
+        if hasattr(stream, "close"):
+            with activate(active):
+                stream.close()
+        active.end()
+
+
+def run_in_context(func: Callable, *args, **kwargs) -> Callable:
+    """Bind a callable to a copy of the current context, so spans in executor threads keep their parent"""
+    return functools.partial(contextvars.copy_context().run, func, *args, **kwargs)
+
+class RequestIdFilter(logging.Filter):
+    """Add the current request ID to log records as %(request_id)s"""
+    
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = current_request_id() or "-"
+        return True
@@ -0,0 +1,24 @@
+# tests/test_api.py
+import pytest
+import requests
+from src.api.server import create_server
+
+
+@pytest.fixture
+def api():
+    # Requests rejected by validation never reach the pipeline services
+    server = create_server(host="127.0.0.1", port=0, workers=1, services=object()).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.mark.parametrize("field, value", [
+    ("k", "abc"), ("k", None), ("k", 0), ("k", -1), ("k", [5]),
+    ("use_cache", "false"), ("use_cache", 0), ("use_cache", None)
+])
+def test_query_rejects_invalid_options(api, field, value):
+    response = requests.post(f"{api.url}/query", json={"query": "what?", field: value})
+    
+    assert response.status_code == 400
+    assert field in response.json()["error"]
@@ -0,0 +1,46 @@
+# tests/test_chat_log.py
+import multiprocessing
+from src.storage.chat_archive import ChatArchive
+from src.storage.chat_log import ChatLog
+
+
+def _chat_log(tmp_path):
+    archive = ChatArchive(tmp_path / "archive", block_size=8)
+    return ChatLog(tmp_path / "chat.jsonl", max_messages=5, compact_slack=3,
+                   rotate_bytes=1 << 20, archive=archive)
+
+
+def _append_messages(tmp_path, writer, count):
+    chat_log = _chat_log(tmp_path)
+    for i in range(count):
+        chat_log.append({"timestamp": f"2026-01-01T00:00:00.{i:06d}", "type": "user", "body": f"{writer}-{i}"})
+
+
+def test_concurrent_appends_survive_rotation(tmp_path):
+    writers = [
+        multiprocessing.Process(target=_append_messages, args=(tmp_path, writer, 60))
+        for writer in range(4)
+    ]
+    for process in writers:
+        process.start()
+    for process in writers:
+        process.join()
+    
+    chat_log = _chat_log(tmp_path)
+    bodies = [message["body"] for message in chat_log.archive.search() + chat_log.read_all()]
+    
+    assert len(bodies) == len(set(bodies)) == 240
+
+
+def test_pages_keep_messages_sharing_a_timestamp(tmp_path):
+    chat_log = _chat_log(tmp_path)
+    for i in range(23):
+        chat_log.append({"timestamp": "2026-01-01T00:00:00", "type": "user", "body": str(i)})
+    
+    assert chat_log.archive.count() > 0
+    messages, cursor = [], chat_log.end_cursor()
+    while cursor is not None:
+        page, cursor = chat_log.page(cursor, 4)
+        messages = page + messages
+    
+    assert [message["body"] for message in messages] == [str(i) for i in range(23)]
@@ -0,0 +1,57 @@
+# tests/test_llm_manager.py
+import asyncio
+from src.models.llm_handler import BaseLLMHandler, LLMManager
+from src.utils.concurrency import ConcurrencyLimiter
+from src.utils.resilience import CircuitBreaker
+
+
+class FakeHandler(BaseLLMHandler):
+    """Answers with its own name; saturated handlers have their only slot taken and no queue"""
+    
+    def __init__(self, name: str, saturated: bool = False):
+        self.health_key = name
+        self.model = f"{name}-model"
+        self.limiter = ConcurrencyLimiter(name, 1, 0)
+        self.breaker = CircuitBreaker(name, failure_threshold=1, reset_timeout=60)
+        if saturated:
+            self.limiter.acquire()
+    
+    def generate_response(self, prompt: str, context: str = "", **kwargs):
+        return f"answer from {self.health_key}"
+    
+    def check_health(self) -> bool:
+        return True
+    
+    def is_available(self) -> bool:
+        return True
+
+
+def _manager(*handlers):
+    manager = LLMManager.__new__(LLMManager)
+    manager.handlers = {handler.health_key: handler for handler in handlers}
+    manager.default_handler = handlers[0].health_key
+    manager.response_cache = None
+    return manager
+
+
+def test_saturated_handler_is_rerouted_without_tripping_its_breaker():
+    busy, spare = FakeHandler("busy", saturated=True), FakeHandler("spare")
+    manager = _manager(busy, spare)
+    
+    assert manager.generate_response("q") == "answer from spare"
+    assert "".join(manager.stream_response("q")) == "answer from spare"
+    assert asyncio.run(manager.agenerate_response("q")) == "answer from spare"
+    assert busy.breaker.state == "closed"
+    assert spare.limiter.get_stats()["in_flight"] == 0
+
+
+def test_saturated_single_handler_rejects_without_opening_its_circuit():
+    busy = FakeHandler("busy", saturated=True)
+    manager = _manager(busy)
+    
+    for _ in range(3):
+        assert manager.generate_response("q") is None
+        assert list(manager.stream_response("q")) == []
+    
+    assert busy.breaker.state == "closed"
+    assert busy.limiter.get_stats()["rejected"] == 6
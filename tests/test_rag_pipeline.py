@@ -0,0 +1,47 @@
+# tests/test_rag_pipeline.py
+from src.rag import retriever as retriever_module
+from src.rag.retriever import Retriever
+
+
+class FakeReranker:
+    """Reverses the candidates instead of scoring them with a cross-encoder"""
+    
+    max_candidates = 50
+    
+    def rerank(self, query, results, k):
+        reranked = list(reversed(results))[:k]
+        return reranked, {"candidates": len(results), "kept": len(reranked), "latency_ms": 1.0}
+
+
+def _results(n):
+    return [
+        {
+            "id": f"doc.pdf_{i}",
+            "text": f"chunk number {i}",
+            "metadata": {"document_name": "doc.pdf", "chunk_index": i, "start_char": i * 100, "end_char": i * 100 + 15},
+            "distance": 0.1 * i
+        }
+        for i in range(n)
+    ]
+
+
+def test_retrieve_with_sources_reranks(monkeypatch):
+    retriever = Retriever(vector_store=object())
+    monkeypatch.setattr(retriever_module, "get_reranker", lambda: FakeReranker())
+    monkeypatch.setattr(retriever, "retrieve", lambda query, k, **options: _results(k))
+    
+    result = retriever.retrieve_with_sources("what is in the document?", k=3, rerank=True, adaptive=False)
+    
+    assert result["rerank"]["kept"] == 3
+    assert [chunk["chunk_index"] for chunk in result["chunks"]] == [19, 18, 17]
+    assert result["sources"] == ["doc.pdf"]
+    assert result["context_tokens"] > 0
+
+
+def test_retrieve_with_sources_without_results(monkeypatch):
+    retriever = Retriever(vector_store=object())
+    monkeypatch.setattr(retriever, "retrieve", lambda query, k, **options: [])
+    
+    result = retriever.retrieve_with_sources("anything", k=3, rerank=False, adaptive=False)
+    
+    assert result["chunks"] == [] and result["context_tokens"] == 0
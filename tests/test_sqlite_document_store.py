@@ -0,0 +1,32 @@
+# tests/test_sqlite_document_store.py
+from datetime import datetime
+import src.storage.sqlite_document_store as sqlite_module
+from src.config import Config
+from src.storage.chat_archive import ChatArchive
+
+
+class FrozenDatetime(datetime):
+    @classmethod
+    def now(cls, tz=None):
+        return cls(2026, 1, 1)
+
+
+def test_chat_history_pages_keep_messages_sharing_a_timestamp(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "CHAT_HISTORY_DIR", tmp_path)
+    monkeypatch.setattr(Config, "CHAT_HISTORY_MAX_MESSAGES", 5)
+    monkeypatch.setattr(Config, "CHAT_HISTORY_COMPACT_SLACK", 3)
+    monkeypatch.setattr(sqlite_module, "get_chat_archive", lambda archive_dir: ChatArchive(tmp_path / "archive", block_size=4))
+    monkeypatch.setattr(sqlite_module, "datetime", FrozenDatetime)
+    
+    store = sqlite_module.SQLiteDocumentStore(tmp_path / "documents.db")
+    for i in range(23):
+        store.save_chat_message({"type": "user", "body": str(i)})
+    
+    assert store.archive.count() > 0
+    messages, cursor = [], store.get_chat_history_cursor()
+    while cursor is not None:
+        page = store.get_chat_history_page(before=cursor, limit=4)
+        messages = page["messages"] + messages
+        cursor = page["next_cursor"]
+    
+    assert [message["body"] for message in messages] == [str(i) for i in range(23)]
@@ -0,0 +1,23 @@
+# tests/test_tracing.py
+import json
+import src.utils.tracing as tracing_module
+from src.utils.tracing import TraceExporter, span
+
+
+def test_trace_files_are_json_lines_after_rotation(tmp_path, monkeypatch):
+    trace_path = tmp_path / "traces.jsonl"
+    exporter = TraceExporter(trace_path, max_bytes=2000)
+    monkeypatch.setattr(tracing_module, "_exporter", exporter)
+    
+    for i in range(40):
+        with span("query", question=i):
+            with span("retriever.search", k=5):
+                pass
+    exporter.flush()
+    
+    rotated_path = tmp_path / "traces.1.jsonl"
+    assert rotated_path.exists()
+    for path in [rotated_path, trace_path]:
+        events = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+        assert events and all(event["ph"] == "X" for event in events)
+        assert {event["name"] for event in events} == {"query", "retriever.search"}
@@ -2,5 +2,6 @@
 from .file_upload import FileUploadComponent
 from .chat_interface import ChatInterface
 from .settings import SettingsComponent
+from .latency_dashboard import LatencyDashboard
 
-__all__ = ["FileUploadComponent", "ChatInterface", "SettingsComponent"]
\ No newline at end of file
+__all__ = ["FileUploadComponent", "ChatInterface", "SettingsComponent", "LatencyDashboard"]
\ No newline at end of file
@@ -1,7 +1,8 @@
 # ui/components/chat_interface.py
 import streamlit as st
 import logging
-from typing import Dict, Any
+from typing import List, Dict, Any
+from src.config import Config
 
 logger = logging.getLogger(__name__)
 
@@ -10,6 +11,19 @@ class ChatInterface:
     
     def __init__(self, rag_generator):
         self.rag_generator = rag_generator
+        self.page_size = Config.CHAT_HISTORY_PAGE_SIZE
+        self._initialize_history_state()
+    
+    def _initialize_history_state(self):
+        """Set up the paging state for the chat view"""
+        if 'visible_messages' not in st.session_state:
+            st.session_state.visible_messages = self.page_size
+        
+        # Older conversations are fetched from the document store on demand,
+        # starting with those saved before this session began
+        if 'earlier_chat_history' not in st.session_state:
+            st.session_state.earlier_chat_history = []
+            st.session_state.chat_history_cursor = self.rag_generator.document_store.get_chat_history_cursor()
     
     def render(self):
         """Render the chat interface"""
@@ -33,32 +47,101 @@ class ChatInterface:
             
             # Retrieval settings
             st.subheader("🔍 Retrieval Settings")
+            adaptive = st.checkbox(
+                "Adaptive number of chunks",
+                value=Config.ADAPTIVE_K_ENABLED,
+                help="Drop weakly related chunks so short answers get short prompts"
+            )
+            
             k_chunks = st.slider(
-                "Number of chunks to retrieve",
+                "Maximum chunks to retrieve" if adaptive else "Number of chunks to retrieve",
                 min_value=1,
                 max_value=20,
                 value=5,
                 help="More chunks = more context but slower response"
             )
             
+            search_types = ["hybrid", "vector", "mmr"]
+            search_type = st.selectbox(
+                "Search type",
+                search_types,
+                index=search_types.index(Config.RETRIEVAL_SEARCH_TYPE) if Config.RETRIEVAL_SEARCH_TYPE in search_types else 0,
+                format_func=lambda x: {"hybrid": "Hybrid (BM25 + vector)", "vector": "Vector", "mmr": "Diverse (MMR)"}[x],
+                help="Hybrid matches exact terms such as part numbers; MMR avoids near-duplicate chunks"
+            )
+            retrieval_options = {"search_type": search_type, "adaptive": adaptive}
+            
+            if search_type == "mmr":
+                retrieval_options["mmr_lambda"] = st.slider(
+                    "Relevance vs. diversity",
+                    min_value=0.0,
+                    max_value=1.0,
+                    value=Config.MMR_LAMBDA,
+                    step=0.05,
+                    help="1.0 = pure relevance, 0.0 = maximum diversity"
+                )
+                retrieval_options["fetch_multiplier"] = st.slider(
+                    "Candidate multiplier",
+                    min_value=1,
+                    max_value=10,
+                    value=Config.MMR_FETCH_MULTIPLIER,
+                    help="Candidates fetched = chunks to retrieve × multiplier"
+                )
+            
+            retrieval_options["rerank"] = st.checkbox(
+                "Rerank with cross-encoder",
+                value=Config.RERANK_ENABLED,
+                help="Slower, but orders chunks by a more accurate relevance model"
+            )
+            
+            if retrieval_options["rerank"]:
+                retrieval_options["rerank_candidates"] = st.slider(
+                    "Candidates to rerank",
+                    min_value=k_chunks,
+                    max_value=max(k_chunks, Config.RERANK_MAX_CANDIDATES),
+                    value=min(max(k_chunks, Config.RERANK_CANDIDATES), max(k_chunks, Config.RERANK_MAX_CANDIDATES)),
+                    help="More candidates = better ordering but higher reranking latency"
+                )
+            
+            use_cache = st.checkbox(
+                "Reuse cached answers",
+                value=True,
+                help="Untick to regenerate answers to questions that were asked before"
+            )
+            
             # Clear chat button
             if st.button("🗑️ Clear Chat History"):
                 st.session_state.chat_history = []
+                st.session_state.earlier_chat_history = []
+                st.session_state.chat_history_cursor = None
+                st.session_state.visible_messages = self.page_size
                 st.rerun()
         
         # Display chat history
         self._display_chat_history()
         
         # Chat input
-        self._handle_chat_input(k_chunks)
+        self._handle_chat_input(k_chunks, retrieval_options, use_cache)
     
     def _display_chat_history(self):
-        """Display the chat conversation"""
-        if not st.session_state.chat_history:
+        """Display the most recent page of the conversation"""
+        messages = st.session_state.earlier_chat_history + st.session_state.chat_history
+        has_earlier = (
+            len(messages) > st.session_state.visible_messages
+            or st.session_state.chat_history_cursor is not None
+        )
+        
+        if has_earlier and st.button("⬆️ Load earlier messages"):
+            st.session_state.visible_messages += self.page_size
+            if st.session_state.visible_messages > len(messages):
+                self._load_earlier_messages()
+            st.rerun()
+        
+        if not messages:
             st.info("👋 Ask me anything about your documents!")
             return
         
-        for message in st.session_state.chat_history:
+        for message in messages[-st.session_state.visible_messages:]:
             if message["role"] == "user":
                 with st.chat_message("user"):
                     st.write(message["content"])
@@ -78,7 +161,35 @@ class ChatInterface:
                         chunks_info = message["chunks_info"]
                         st.caption(f"📊 Retrieved {len(chunks_info)} chunks")
     
-    def _handle_chat_input(self, k_chunks: int):
+    def _load_earlier_messages(self):
+        """Fetch the page of saved conversations before the oldest one shown"""
+        page = self.rag_generator.document_store.get_chat_history_page(
+            before=st.session_state.chat_history_cursor,
+            limit=self.page_size
+        )
+        
+        st.session_state.earlier_chat_history = (
+            self._to_chat_messages(page["messages"]) + st.session_state.earlier_chat_history
+        )
+        st.session_state.chat_history_cursor = page["next_cursor"]
+    
+    @staticmethod
+    def _to_chat_messages(saved_messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Turn saved interactions into the user/assistant messages the chat view renders"""
+        messages = []
+        for saved in saved_messages:
+            if saved.get("type") != "interaction":
+                continue
+            
+            messages.append({"role": "user", "content": saved["query"]})
+            messages.append({
+                "role": "assistant",
+                "content": saved["answer"],
+                "sources": saved.get("sources", [])
+            })
+        return messages
+    
+    def _handle_chat_input(self, k_chunks: int, retrieval_options: Dict[str, Any], use_cache: bool = True):
         """Handle user input and generate responses"""
         # Chat input
         if prompt := st.chat_input("Ask a question about your documents..."):
@@ -94,18 +205,43 @@ class ChatInterface:
             
             # Generate response
             with st.chat_message("assistant"):
-                with st.spinner("Thinking..."):
-                    response = self.rag_generator.generate_response(
+                with st.spinner("Searching documents..."):
+                    response = self.rag_generator.generate_response_stream(
                         query=prompt,
                         llm_name=st.session_state.current_llm,
-                        k=k_chunks
+                        k=k_chunks,
+                        use_cache=use_cache,
+                        **retrieval_options
                     )
                 
+                # Render tokens as they arrive; the response is completed once the stream ends
+                streamed = False
+                if response.get("answer_stream") is not None:
+                    st.write_stream(response["answer_stream"])
+                    streamed = not response.get("error")
+                
                 # Display response
                 if response.get("error"):
                     st.error(f"❌ {response['answer']}")
                 else:
-                    st.write(response["answer"])
+                    if not streamed:
+                        st.write(response["answer"])
+                    
+                    if response.get("timings", {}).get("ttft_ms") is not None:
+                        st.caption(
+                            f"⏱️ First token after {response['timings']['ttft_ms']:.0f} ms, "
+                            f"done after {response['timings']['generation_ms']:.0f} ms"
+                        )
+                    
+                    if response.get("adaptive"):
+                        adaptive_stats = response["adaptive"]
+                        st.caption(
+                            f"✂️ Adaptive cutoff kept {adaptive_stats['kept']} of "
+                            f"{adaptive_stats['candidates']} candidates"
+                        )
+                    
+                    if response.get("cached"):
+                        st.caption(f"⚡ Answered from cache (similarity {response['cache_similarity']:.2f})")
                     
                     # Show sources
                     if response.get("sources"):
@@ -118,6 +254,24 @@ class ChatInterface:
                         chunks_count = len(response["chunks"])
                         st.caption(f"📊 Retrieved {chunks_count} relevant chunks")
                         
+                        if response.get("context_tokens") is not None:
+                            in_context = sum(1 for chunk in response["chunks"] if chunk.get("in_context", True))
+                            st.caption(f"🧩 {in_context} chunks in context (~{response['context_tokens']} tokens)")
+                        
+                        if response.get("usage"):
+                            usage = response["usage"]
+                            st.caption(
+                                f"🔢 ~{usage['prompt_tokens']} prompt + {usage['completion_tokens']} completion tokens "
+                                f"of a {usage['context_window']} token window"
+                            )
+                        
+                        if response.get("rerank"):
+                            rerank_stats = response["rerank"]
+                            st.caption(
+                                f"🎯 Reranked {rerank_stats['candidates']} candidates in "
+                                f"{rerank_stats['latency_ms']:.0f} ms ({rerank_stats['cache_hits']} cached)"
+                            )
+                        
                         # Optional: Show chunk details
                         if chunks_count > 0:
                             with st.expander("🔍 Retrieved Chunks (Debug)"):
@@ -126,6 +280,8 @@ class ChatInterface:
                                     st.write(chunk["text"][:200] + "..." if len(chunk["text"]) > 200 else chunk["text"])
                                     if chunk.get("distance") is not None:
                                         st.caption(f"Similarity: {1 - chunk['distance']:.3f}")
+                                    if chunk.get("rerank_score") is not None:
+                                        st.caption(f"Rerank score: {chunk['rerank_score']:.3f}")
                                     st.divider()
                 
                 # Add assistant response to history
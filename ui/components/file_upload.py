@@ -2,6 +2,7 @@ import streamlit as st
 import logging
 from typing import Optional
 from pathlib import Path
+from src.processing.ingestion import IngestionPipeline
 
 logger = logging.getLogger(__name__)
 
@@ -13,6 +14,7 @@ class FileUploadComponent:
         self.text_chunker = text_chunker
         self.vector_store = vector_store
         self.document_store = document_store
+        self.ingestion = IngestionPipeline(pdf_processor, text_chunker, vector_store, document_store)
     
     def render(self):
         """Render the file upload interface"""
@@ -39,67 +41,21 @@ class FileUploadComponent:
         total_files = len(uploaded_files)
         processed_count = 0
         
-        for i, uploaded_file in enumerate(uploaded_files):
-            try:
+        # Metadata for the whole upload is written in one go when the batch ends
+        with self.document_store.batch():
+            for i, uploaded_file in enumerate(uploaded_files):
                 status_text.text(f"Processing {uploaded_file.name}...")
                 progress_bar.progress((i) / total_files)
                 
-                # Check if document already exists
-                existing_docs = self.document_store.load_documents()
-                if uploaded_file.name in existing_docs:
-                    st.warning(f"⚠️ {uploaded_file.name} already exists. Skipping.")
-                    continue
+                result = self.ingestion.ingest(uploaded_file)
                 
-                # Extract text from PDF
-                text = self.pdf_processor.extract_text_from_uploaded_file(uploaded_file)
-                
-                if not text:
-                    st.error(f"❌ Failed to extract text from {uploaded_file.name}")
-                    continue
-                
-                # Save file to uploads directory
-                saved_path = self.pdf_processor.save_uploaded_file(uploaded_file)
-                
-                if not saved_path:
-                    st.error(f"❌ Failed to save {uploaded_file.name}")
-                    continue
-                
-                # Chunk the text
-                chunks = self.text_chunker.chunk_document(
-                    text=text,
-                    document_name=uploaded_file.name,
-                    file_path=str(saved_path)
-                )
-                
-                if not chunks:
-                    st.error(f"❌ Failed to chunk {uploaded_file.name}")
-                    continue
-                
-                # Add to vector store
-                if self.vector_store.add_documents(chunks):
-                    # Save document metadata
-                    file_info = self.pdf_processor.get_file_info(saved_path)
-                    doc_metadata = {
-                        "name": uploaded_file.name,
-                        "file_path": str(saved_path),
-                        "size_mb": round(uploaded_file.size / (1024 * 1024), 2),
-                        "num_pages": file_info.get("num_pages", 0),
-                        "num_chunks": len(chunks),
-                        "chunk_size": self.text_chunker.chunk_size,
-                        "chunk_overlap": self.text_chunker.chunk_overlap
-                    }
-                    
-                    if self.document_store.save_document_metadata(doc_metadata):
-                        processed_count += 1
-                        st.success(f"✅ Processed {uploaded_file.name} ({len(chunks)} chunks)")
-                    else:
-                        st.error(f"❌ Failed to save metadata for {uploaded_file.name}")
+                if result["status"] == "ingested":
+                    processed_count += 1
+                    st.success(f"✅ {result['message']}")
+                elif result["status"] == "duplicate":
+                    st.warning(f"⚠️ {result['message']}")
                 else:
-                    st.error(f"❌ Failed to add {uploaded_file.name} to vector store")
-                
-            except Exception as e:
-                st.error(f"❌ Error processing {uploaded_file.name}: {str(e)}")
-                logger.error(f"Error processing {uploaded_file.name}: {str(e)}")
+                    st.error(f"❌ {result['message']}")
         
         # Final status
         progress_bar.progress(1.0)
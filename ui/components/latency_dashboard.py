@@ -0,0 +1,107 @@
+# ui/components/latency_dashboard.py
+import streamlit as st
+import logging
+from src.config import Config
+from src.utils.metrics import get_histogram, get_histograms, get_throughput, get_slow_request_log
+
+logger = logging.getLogger(__name__)
+
+# (label, histogram) for each pipeline stage, in the order a document or query passes through them
+INGEST_STAGES = [
+    ("PDF extraction", "ingest.extract_ms"),
+    ("Chunking", "ingest.chunk_ms"),
+    ("Embedding", "ingest.embed_ms"),
+    ("Index insert", "ingest.insert_ms"),
+    ("Ingest total", "ingest.total_ms")
+]
+
+QUERY_STAGES = [
+    ("Query embedding", "query.embed_ms"),
+    ("Retrieval", "query.retrieval_ms"),
+    ("Rerank", "query.rerank_ms"),
+    ("LLM time to first token", "query.ttft_ms"),
+    ("LLM generation", "query.generation_ms"),
+    ("Query total", "query.total_ms")
+]
+
+class LatencyDashboard:
+    """Per-stage latency percentiles, ingestion throughput and recent slow requests"""
+    
+    def render(self):
+        """Render the dashboard; it refreshes itself without rerunning the page"""
+        st.subheader("⏱️ Pipeline Latency")
+        st.caption(
+            f"Percentiles over the last samples in this process, refreshed every {Config.METRICS_REFRESH_SECONDS:.0f}s"
+        )
+        _render_live_metrics()
+
+@st.fragment(run_every=Config.METRICS_REFRESH_SECONDS)
+def _render_live_metrics():
+    """Render the metrics that change while the page is idle"""
+    rows = _stage_rows(INGEST_STAGES + QUERY_STAGES + _llm_stages())
+    if rows:
+        st.dataframe(rows, hide_index=True)
+    else:
+        st.info("No requests timed yet. Upload a document or ask a question.")
+    
+    pages = get_throughput("ingest.pages").snapshot()
+    chunks = get_throughput("ingest.chunks").snapshot()
+    if pages["count"]:
+        st.info(
+            f"📥 Ingestion throughput: {pages['rate']:.1f} pages/s · {chunks['rate']:.1f} chunks/s "
+            f"over the last {pages['count']} documents ({pages['total_amount']} pages, "
+            f"{chunks['total_amount']} chunks since start)"
+        )
+    
+    slow_requests = get_slow_request_log().recent()
+    if slow_requests:
+        st.write(
+            f"**Recent slow requests** (queries over {Config.SLOW_QUERY_MS:.0f} ms, "
+            f"ingests over {Config.SLOW_INGEST_MS:.0f} ms); find a request's spans in {Config.TRACE_FILE.name} by its ID"
+        )
+        st.dataframe(
+            [
+                {
+                    "time": entry["time"],
+                    "kind": entry["kind"],
+                    "request": entry["label"],
+                    "request ID": entry["request_id"],
+                    "total ms": round(entry["duration_ms"]),
+                    "stages": ", ".join(
+                        f"{stage[:-3]} {value:.0f}" for stage, value in entry["timings"].items()
+                        if stage != "total_ms"
+                    )
+                }
+                for entry in slow_requests
+            ],
+            hide_index=True
+        )
+
+def _llm_stages():
+    """Time to first token and total latency for each LLM backend that has served a request"""
+    keys = sorted({
+        name.split(".")[1] for name in get_histograms()
+        if name.startswith("llm.") and name.endswith((".ttft_ms", ".latency_ms"))
+    })
+    
+    stages = []
+    for key in keys:
+        stages.append((f"{key.title()} time to first token", f"llm.{key}.ttft_ms"))
+        stages.append((f"{key.title()} total", f"llm.{key}.latency_ms"))
+    return stages
+
+def _stage_rows(stages):
+    """One table row per stage with samples"""
+    rows = []
+    for label, name in stages:
+        stats = get_histogram(name).snapshot()
+        if not stats["count"]:
+            continue
+        rows.append({
+            "stage": label,
+            "samples": stats["count"],
+            "p50 ms": round(stats["p50"]),
+            "p95 ms": round(stats["p95"]),
+            "p99 ms": round(stats["p99"])
+        })
+    return rows
@@ -62,7 +62,7 @@ class SettingsComponent:
                     # Test connection
                     from src.models.llm_handler import OpenAIHandler
                     handler = OpenAIHandler()
-                    if handler.is_available():
+                    if handler.check_health():
                         st.success("✅ OpenAi/Openrouter connection successful!")
                     else:
                         st.error("❌ Failed to connect to OpenAi/Openrouter")
@@ -1,6 +1,7 @@
 # ui/streamlit_app.py
 import streamlit as st
 import logging
+import time
 from pathlib import Path
 import sys
 
@@ -10,27 +11,33 @@ sys.path.insert(0, str(project_root))
 
 from src.config import Config
 from src.utils.logger import setup_logging
-from src.processing.pdf_processor import PDFProcessor
-from src.processing.text_chunker import TextChunker
-from src.storage.vector_store import VectorStore
-from src.storage.document_store import DocumentStore
-from src.rag.generator import RAGGenerator
+from src.services import Services, get_services
+from src.models.llm_handler import get_health_monitor
+from src.utils.metrics import get_histogram
 from ui.components.file_upload import FileUploadComponent
 from ui.components.chat_interface import ChatInterface
 from ui.components.settings import SettingsComponent
+from ui.components.latency_dashboard import LatencyDashboard
 
 # Setup logging
 logger = setup_logging()
 
+@st.cache_resource(show_spinner="Loading pipeline...")
+def load_services() -> Services:
+    """Build the pipeline components once per process and share them across sessions and reruns"""
+    return get_services()
+
 class RAGPipelineApp:
     """Main Streamlit application for RAG Pipeline"""
     
-    def __init__(self):
-        self.pdf_processor = PDFProcessor()
-        self.text_chunker = TextChunker()
-        self.vector_store = VectorStore()
-        self.document_store = DocumentStore()
-        self.rag_generator = RAGGenerator()
+    def __init__(self, services: Services):
+        # Shared components; anything specific to one user lives in st.session_state
+        self.services = services
+        self.pdf_processor = services.pdf_processor
+        self.text_chunker = services.text_chunker
+        self.vector_store = services.vector_store
+        self.document_store = services.document_store
+        self.rag_generator = services.rag_generator
         
         # Initialize session state
         self._initialize_session_state()
@@ -149,6 +156,32 @@ class RAGPipelineApp:
         else:
             st.error("❌ No language models available")
         
+        health_status = get_health_monitor().get_status()
+        if health_status:
+            st.caption(
+                f"Health checked in the background every {Config.LLM_HEALTH_CHECK_INTERVAL:.0f}s · "
+                + " · ".join(f"{name}: {status['age_seconds']:.0f}s ago" for name, status in health_status.items())
+            )
+        
+        rerun_stats = get_histogram("ui.rerun_ms").snapshot()
+        if rerun_stats["count"]:
+            st.caption(
+                f"Page reruns: p50 {rerun_stats['p50']:.0f} ms · p95 {rerun_stats['p95']:.0f} ms "
+                f"over the last {rerun_stats['count']} · pipeline initialized once in {self.services.init_ms:.0f} ms"
+            )
+        
+        load_stats = self.rag_generator.llm_manager.get_load_stats()
+        for name, load in load_stats.items():
+            wait_p95 = f"{load['wait_p95_ms']:.0f} ms" if load["wait_p95_ms"] is not None else "n/a"
+            st.caption(
+                f"{name}: {load['in_flight']}/{load['max_concurrent']} in flight · "
+                f"{load['queued']}/{load['max_queue']} queued · queue wait p95 {wait_p95} · "
+                f"{load['rejected']} rejected, {load['timed_out']} timed out · circuit {load['circuit']['state']}"
+            )
+        
+        # Per-stage latency, throughput and slow requests
+        LatencyDashboard().render()
+        
         # Vector Store Status
         st.subheader("🗄️ Vector Store")
         collection_info = self.vector_store.get_collection_info()
@@ -165,6 +198,24 @@ class RAGPipelineApp:
                 for doc in collection_info['document_names']:
                     st.write(f"- {doc}")
         
+        # Semantic cache
+        if self.rag_generator.semantic_cache:
+            st.subheader("⚡ Semantic Cache")
+            cache_stats = self.rag_generator.semantic_cache.get_stats()
+            st.info(
+                f"Entries: {cache_stats['entries']} · Hits: {cache_stats['hits']} · "
+                f"Misses: {cache_stats['misses']} · Hit rate: {cache_stats['hit_rate']:.0%}"
+            )
+        
+        # LLM response cache
+        if self.rag_generator.llm_manager.response_cache:
+            st.subheader("💾 LLM Response Cache")
+            cache_stats = self.rag_generator.llm_manager.response_cache.get_stats()
+            st.info(
+                f"Entries: {cache_stats['entries']} · Hits: {cache_stats['hits']} · "
+                f"Misses: {cache_stats['misses']} · Hit rate: {cache_stats['hit_rate']:.0%}"
+            )
+        
         # Storage Paths
         st.subheader("📁 Storage Paths")
         st.code(f"Upload Directory: {Config.UPLOAD_DIR}")
@@ -178,7 +229,12 @@ class RAGPipelineApp:
             "chunk_overlap": Config.CHUNK_OVERLAP,
             "max_file_size_mb": Config.MAX_FILE_SIZE_MB,
             "storage_type": Config.STORAGE_TYPE,
-            "embedding_model": Config.EMBEDDING_MODEL
+            "embedding_model": Config.EMBEDDING_MODEL,
+            "retrieval_search_type": Config.RETRIEVAL_SEARCH_TYPE,
+            "hybrid_weights": {
+                "vector": Config.HYBRID_VECTOR_WEIGHT,
+                "keyword": Config.HYBRID_KEYWORD_WEIGHT
+            }
         })
         
         # Clear data options
@@ -190,7 +246,7 @@ class RAGPipelineApp:
                 if st.checkbox("I understand this will delete all documents"):
                     if self.vector_store.clear_collection():
                         # Also clear document metadata
-                        self.document_store.documents_file.write_text("{}")
+                        self.document_store.clear_documents()
                         st.success("Vector store cleared!")
                         st.rerun()
         
@@ -198,6 +254,8 @@ class RAGPipelineApp:
             if st.button("💬 Clear Chat History", type="secondary"):
                 if self.document_store.clear_chat_history():
                     st.session_state.chat_history = []
+                    st.session_state.earlier_chat_history = []
+                    st.session_state.chat_history_cursor = None
                     st.success("Chat history cleared!")
                     st.rerun()
     
@@ -220,6 +278,7 @@ class RAGPipelineApp:
 
 def main():
     """Main entry point"""
+    rerun_start = time.perf_counter()
     try:
         # Validate configuration
         if not Config.validate_config():
@@ -227,9 +286,13 @@ def main():
             return
         
         # Run the app
-        app = RAGPipelineApp()
+        app = RAGPipelineApp(load_services())
         app.run()
         
+        rerun_ms = (time.perf_counter() - rerun_start) * 1000
+        get_histogram("ui.rerun_ms").record(rerun_ms)
+        logger.debug(f"Rerun took {rerun_ms:.0f} ms")
+    
     except Exception as e:
         st.error(f"❌ Application error: {str(e)}")
         logger.error(f"Application error: {str(e)}", exc_info=True)